@@ -11,11 +11,11 @@ MemoryManager - 三层记忆系统管理器
 import sys
 import os
 
-# 添加V1记忆系统路径
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'openclaw_async_architecture', 'mvp', 'src', 'common'))
+# 添加V2 MVP路径（按包导入，与Gateway/Worker共用Redis连接池与配置）
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'openclaw_async_architecture', 'mvp'))
 
 try:
-    from v1_memory_integration import V1MemorySystemIntegration
+    from src.common.v1_memory_integration import V1MemorySystemIntegration
     V1_AVAILABLE = True
 except ImportError:
     V1_AVAILABLE = False
@@ -269,10 +269,10 @@ class MemoryManager:
     async def clear_cache(self):
         """清空缓存层（L1: Redis）"""
         if self.mode == "full" and self.v1_memory:
-            # 清空Redis
+            # 清空Redis（只删记忆命名空间，不影响同实例上的任务队列）
             try:
-                self.v1_memory.redis_client.flushdb()
-                logger.info("✅ L1缓存已清空")
+                deleted = self.v1_memory.clear_cache()
+                logger.info(f"✅ L1缓存已清空（{deleted} 个键）")
             except Exception as e:
                 logger.error(f"清空缓存失败: {e}")
         else:
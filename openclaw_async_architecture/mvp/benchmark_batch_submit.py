@@ -0,0 +1,85 @@
+"""
+批量提交对比压测
+POST /tasks/batch（一次请求N个任务） vs POST /tasks（每个任务一次请求）
+
+用法：
+    python launcher.py gateway          # 终端1
+    python benchmark_batch_submit.py --tasks 10000 --chunk 1000 --concurrency 50
+
+注意：会向队列写入2×tasks个任务，建议在测试环境运行（Worker不启动时可事后清空队列）。
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import httpx
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+async def bench_per_task(client: httpx.AsyncClient, url: str, num_tasks: int, concurrency: int) -> float:
+    """逐个提交（concurrency个并发请求）"""
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def submit(i: int):
+        nonlocal failures
+        async with semaphore:
+            response = await client.post(f"{url}/tasks", json={"content": f"压测任务 {i}"})
+            if response.status_code != 200:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[submit(i) for i in range(num_tasks)])
+    elapsed = time.perf_counter() - start
+
+    if failures:
+        print(f"  逐个提交失败: {failures}")
+    return elapsed
+
+
+async def bench_batch(client: httpx.AsyncClient, url: str, num_tasks: int, chunk: int) -> float:
+    """批量提交（每个请求chunk个任务，请求顺序发送）"""
+    start = time.perf_counter()
+    for offset in range(0, num_tasks, chunk):
+        size = min(chunk, num_tasks - offset)
+        response = await client.post(f"{url}/tasks/batch", json={
+            "tasks": [{"content": f"压测任务 {offset + i}"} for i in range(size)]
+        })
+        if response.status_code != 200:
+            print(f"  批量提交失败: HTTP {response.status_code} {response.text[:100]}")
+            break
+        assert response.json()["count"] == size
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="批量提交对比压测")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--tasks", type=int, default=10000, help="任务数")
+    parser.add_argument("--chunk", type=int, default=1000, help="每个批量请求的任务数")
+    parser.add_argument("--concurrency", type=int, default=50, help="逐个提交的并发数")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"批量提交对比: {args.tasks} 个任务")
+    print("=" * 70)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+        await client.get(f"{args.url}/health")
+
+        per_task = await bench_per_task(client, args.url, args.tasks, args.concurrency)
+        print(f"逐个提交 (并发{args.concurrency}):   {per_task:>7.2f}s  {args.tasks / per_task:>8.0f} 任务/秒")
+
+        batch = await bench_batch(client, args.url, args.tasks, args.chunk)
+        print(f"批量提交 (每批{args.chunk}):  {batch:>7.2f}s  {args.tasks / batch:>8.0f} 任务/秒")
+
+    print(f"\n加速: {per_task / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
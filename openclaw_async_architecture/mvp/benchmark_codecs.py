@@ -0,0 +1,103 @@
+"""
+序列化编解码微基准
+对比各编码器在典型载荷上的体积（bytes/op）与编解码耗时（µs/op）：
+1. 队列消息：build_task_message（短指令 / 长上下文）
+2. 任务缓存：已完成的Task（含LLM结果），基线为pydantic model_dump_json / model_validate_json
+3. 工具结果缓存：{"result": 工具输出, "timestamp": ...}
+
+不需要Redis。未安装的编码器（msgpack等）自动跳过。
+
+用法：
+    python benchmark_codecs.py --repeat 20000
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from src.common.codec import CODECS, available_codecs, get_codec, loads, loads_task
+from src.common.models import Task
+from src.queue.redis_queue import build_task_message
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def build_payloads() -> dict:
+    """典型载荷"""
+    answer = "根据日志分析，Worker在高峰期的排队时间主要来自SQLite写锁争用。" * 20
+    task = Task(
+        content="分析最近24小时的Worker日志，找出排队时间超过5秒的任务并给出优化建议",
+        status="completed",
+        result=answer,
+        metadata={"provider": "zhipu", "model": "glm-4-flash", "tokens": 1834, "lane": "complex"},
+        created_at=datetime(2025, 1, 1, 12, 0, 0),
+        updated_at=datetime(2025, 1, 1, 12, 0, 9)
+    )
+    return {
+        "queue:short": build_task_message(task.id, "今天北京天气怎么样", "v1", "realtime"),
+        "queue:long": build_task_message(task.id, "请总结以下文档：" + answer, "v1", "bulk"),
+        "tool_result": {
+            "result": {"success": True, "output": [f"line {i}: ok" for i in range(50)], "elapsed_ms": 12.5},
+            "timestamp": datetime.now().isoformat()
+        },
+        "task": task
+    }
+
+
+def per_op_us(fn, repeat: int) -> float:
+    """平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def bench_codec(name: str, payload, repeat: int) -> tuple[int, float, float]:
+    """(bytes/op, 编码µs/op, 解码µs/op)"""
+    codec = get_codec(name)
+    if isinstance(payload, Task):
+        encode = lambda: codec.dump_model(payload)
+        data = encode()
+        decode = lambda: loads_task(data)
+    else:
+        encode = lambda: codec.dumps(payload)
+        data = encode()
+        decode = lambda: loads(data)
+    return len(data), per_op_us(encode, repeat), per_op_us(decode, repeat)
+
+
+def bench_pydantic(task: Task, repeat: int) -> tuple[int, float, float]:
+    """基线：pydantic JSON"""
+    data = task.model_dump_json()
+    encode_us = per_op_us(task.model_dump_json, repeat)
+    decode_us = per_op_us(lambda: Task.model_validate_json(data), repeat)
+    return len(data.encode("utf-8")), encode_us, decode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="序列化编解码微基准")
+    parser.add_argument("--repeat", type=int, default=20000, help="每项重复次数")
+    args = parser.parse_args()
+
+    codecs = available_codecs()
+    skipped = [name for name in CODECS if name not in codecs]
+
+    print("=" * 70)
+    print(f"序列化编解码: 每项 {args.repeat} 次" + (f"（未安装，跳过: {', '.join(skipped)}）" if skipped else ""))
+    print("=" * 70)
+    print(f"{'载荷':<16}{'编码器':<12}{'bytes/op':>10}{'编码µs/op':>12}{'解码µs/op':>12}")
+
+    for label, payload in build_payloads().items():
+        rows = []
+        if isinstance(payload, Task):
+            rows.append(("pydantic", bench_pydantic(payload, args.repeat)))
+        rows.extend((name, bench_codec(name, payload, args.repeat)) for name in codecs)
+        for name, (size, encode_us, decode_us) in rows:
+            print(f"{label:<16}{name:<12}{size:>10}{encode_us:>12.2f}{decode_us:>12.2f}")
+        print("-" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Gateway提交延迟压测
+验证 POST /tasks 在高并发下仍满足"<50ms"响应目标
+
+用法：
+    python launcher.py gateway          # 终端1
+    python benchmark_gateway_submit.py --clients 500 --requests 4
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import httpx
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """计算百分位（values需已排序）"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def client_loop(client: httpx.AsyncClient, url: str, client_id: int,
+                      requests_per_client: int, latencies: list[float], errors: list[str]):
+    """单个模拟客户端：顺序提交N个任务"""
+    for i in range(requests_per_client):
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                f"{url}/tasks",
+                json={"content": f"压测任务 client={client_id} seq={i}"}
+            )
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code == 200:
+                latencies.append(elapsed)
+            else:
+                errors.append(f"HTTP {response.status_code}")
+        except Exception as e:
+            errors.append(str(e))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Gateway提交延迟压测")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=500, help="并发客户端数")
+    parser.add_argument("--requests", type=int, default=4, help="每个客户端提交的任务数")
+    parser.add_argument("--target-ms", type=float, default=50.0, help="p99目标（毫秒）")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"Gateway提交压测: {args.clients}并发 × {args.requests}请求")
+    print("=" * 70)
+
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        # 预热（建立连接、初始化SQLite）
+        await client.get(f"{args.url}/health")
+
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            client_loop(client, args.url, i, args.requests, latencies, errors)
+            for i in range(args.clients)
+        ])
+        total = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = percentile(latencies, 99)
+
+    print(f"成功: {len(latencies)}  失败: {len(errors)}  总耗时: {total:.2f}s")
+    print(f"吞吐: {len(latencies) / total:.0f} req/s")
+    print(f"p50: {percentile(latencies, 50):.1f}ms")
+    print(f"p95: {percentile(latencies, 95):.1f}ms")
+    print(f"p99: {p99:.1f}ms")
+    print(f"max: {latencies[-1] if latencies else 0:.1f}ms")
+
+    if errors:
+        print(f"错误示例: {errors[:3]}")
+
+    if p99 < args.target_ms:
+        print(f"✓ p99 < {args.target_ms:.0f}ms（符合预期）")
+    else:
+        print(f"✗ p99 >= {args.target_ms:.0f}ms（需要优化）")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
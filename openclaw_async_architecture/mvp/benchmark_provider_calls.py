@@ -0,0 +1,190 @@
+"""
+模型API调用开销压测（本地模拟供应商）
+对比：
+1. 旧实现：每次requests.post新建连接（DNS/TCP握手每次都付）
+2. LoadBalancer.call_api：同步包装 + 连接池（keep-alive复用）
+3. LoadBalancer.call_api_async：并发调用（连接数不超过模型的max_concurrent）
+
+模拟供应商为本地HTTP/1.1服务（--latency-ms模拟模型耗时），统计单次调用耗时与服务端新建连接数。
+--tls时用临时自签名证书走HTTPS（需openssl命令行），与真实供应商一样每次新连接都要TLS握手；
+本机回环的TCP握手几乎不耗时，真实网络下每次还要多付DNS与跨网RTT。
+
+用法：
+    python benchmark_provider_calls.py --calls 500 --tls
+    python benchmark_provider_calls.py --calls 500 --latency-ms 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.common.load_balancer import LoadBalancer
+from src.common.provider_clients import ProviderClientPool
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+MODEL = "hunyuan"
+
+
+class MockProvider(ThreadingHTTPServer):
+    """OpenAI兼容的聊天接口，记录新建连接数"""
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), MockHandler)
+        self.latency = latency
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # keep-alive连接上头部与正文分两次写，不关Nagle会撞上客户端的延迟ACK（每次+40ms）
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps({
+            "choices": [{"message": {"content": "你好，我是模拟供应商。"}}],
+            "usage": {"prompt_tokens": 2, "completion_tokens": 10}
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_certificate() -> tuple[str, str]:
+    """生成127.0.0.1的临时自签名证书"""
+    cert_dir = Path(tempfile.mkdtemp())
+    cert, key = str(cert_dir / "cert.pem"), str(cert_dir / "key.pem")
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+        "-keyout", key, "-out", cert, "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"
+    ], check=True, capture_output=True)
+    return cert, key
+
+
+def api_configs(url: str) -> dict:
+    return {MODEL: {
+        "provider": "tencent", "url": url, "api_key": "mock", "model": "mock-chat",
+        "max_concurrent": 5, "enable_thinking": False
+    }}
+
+
+def summarize(name: str, latencies: list[float], elapsed: float, connections: int):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<28} 平均 {statistics.mean(latencies) * 1000:7.2f}ms  p95 {p95 * 1000:7.2f}ms  "
+          f"总耗时 {elapsed:6.2f}s  新建连接 {connections}")
+
+
+def bench_requests(url: str, calls: int) -> list[float]:
+    """旧实现：每次requests.post（不复用连接）"""
+    payload = {"model": "mock-chat", "messages": [{"role": "user", "content": "你好"}]}
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        response = requests.post(url, headers={"Authorization": "Bearer mock"}, json=payload, timeout=30)
+        response.json()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_sync(balancer: LoadBalancer, calls: int) -> list[float]:
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        assert balancer.call_api("你好", [MODEL])["success"]
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def bench_async(balancer: LoadBalancer, calls: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            assert (await balancer.call_api_async("你好", [MODEL]))["success"]
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    await balancer.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型API调用开销压测")
+    parser.add_argument("--calls", type=int, default=500, help="每种方式的调用次数")
+    parser.add_argument("--concurrency", type=int, default=5, help="异步并发调用数（超过模型并发上限的调用会失败）")
+    parser.add_argument("--latency-ms", type=float, default=0, help="模拟供应商处理耗时（毫秒）")
+    parser.add_argument("--tls", action="store_true", help="模拟供应商走HTTPS（自签名证书）")
+    args = parser.parse_args()
+
+    server = MockProvider(args.latency_ms / 1000)
+    scheme = "http"
+    if args.tls:
+        cert, key = make_certificate()
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        # requests / httpx均从环境变量读取信任的CA
+        os.environ["REQUESTS_CA_BUNDLE"] = os.environ["SSL_CERT_FILE"] = cert
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"{scheme}://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        balancer = LoadBalancer(api_configs(url), ProviderClientPool(http2=False))
+
+    print(f"调用次数: {args.calls}  模拟耗时: {args.latency_ms}ms  协议: {scheme}\n")
+
+    server.connections = 0
+    start = time.perf_counter()
+    latencies = bench_requests(url, args.calls)
+    summarize("requests.post（每次新连接）", latencies, time.perf_counter() - start, server.connections)
+
+    server.connections = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies = bench_sync(balancer, args.calls)
+    summarize("call_api（连接池）", latencies, time.perf_counter() - start, server.connections)
+
+    server.connections = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies = asyncio.run(bench_async(balancer, args.calls, args.concurrency))
+    summarize(f"call_api_async（并发{args.concurrency}）", latencies, time.perf_counter() - start, server.connections)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
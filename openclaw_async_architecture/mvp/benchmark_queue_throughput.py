@@ -0,0 +1,84 @@
+"""
+队列吞吐对比压测
+列表队列（Worker当前的BRPOP逐条循环） vs Streams队列（XREADGROUP批量 + XACK）
+
+使用独立的压测键，不影响线上队列。
+
+用法：
+    python benchmark_queue_throughput.py --tasks 20000 --batch 100
+"""
+import argparse
+import sys
+import time
+
+from src.queue.redis_queue import RedisTaskQueue
+from src.queue.stream_queue import RedisStreamTaskQueue
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def bench_list(num_tasks: int) -> float:
+    """列表队列：与worker/main.py相同的BRPOP逐条消费"""
+    queue = RedisTaskQueue()
+    queue.queue_key = "bench:openclaw_tasks_queue"
+    queue.clear()
+    queue.submit_batch([(f"list-{i}", "压测任务") for i in range(num_tasks)])
+
+    consumed = 0
+    start = time.perf_counter()
+    while consumed < num_tasks:
+        task_data = queue.get_task(timeout=1)
+        if not task_data:
+            break
+        queue.ack(task_data)
+        consumed += 1
+    elapsed = time.perf_counter() - start
+
+    queue.clear()
+    return consumed / elapsed
+
+
+def bench_stream(num_tasks: int, batch: int) -> float:
+    """Streams队列：XREADGROUP一次读batch条，逐条XACK"""
+    queue = RedisStreamTaskQueue(stream_key="bench:openclaw_tasks_stream", group="bench_workers")
+    queue.clear()
+    queue.submit_batch([(f"stream-{i}", "压测任务") for i in range(num_tasks)])
+
+    consumed = 0
+    start = time.perf_counter()
+    while consumed < num_tasks:
+        tasks = queue.get_tasks_batch(count=batch, timeout=1)
+        if not tasks:
+            break
+        for task_data in tasks:
+            queue.ack(task_data)
+        consumed += len(tasks)
+    elapsed = time.perf_counter() - start
+
+    queue.clear()
+    return consumed / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="队列吞吐对比压测")
+    parser.add_argument("--tasks", type=int, default=20000, help="任务数")
+    parser.add_argument("--batch", type=int, default=100, help="Streams每次读取条数")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"队列吞吐对比: {args.tasks} 个任务")
+    print("=" * 70)
+
+    list_rate = bench_list(args.tasks)
+    print(f"列表队列 BRPOP逐条:           {list_rate:>10.0f} 任务/秒")
+
+    stream_rate = bench_stream(args.tasks, args.batch)
+    print(f"Streams XREADGROUP(批={args.batch:<4}): {stream_rate:>10.0f} 任务/秒")
+
+    print(f"\n倍数: {stream_rate / list_rate:.2f}x（Streams额外提供ack与故障接管）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+SQLite并发读取压测
+共用写连接（原实现） vs 只读连接池，按线程数观察读吞吐
+
+使用临时数据库，不影响线上数据。
+
+用法：
+    python benchmark_sqlite_reads.py --rows 20000 --reads 20000 --threads 1,2,4,8
+    python benchmark_sqlite_reads.py --query stats --reads 200   # 聚合查询（get_statistics）
+
+按ID查询耗时很短，主要受GIL影响；聚合查询大部分时间在SQLite内部（释放GIL），
+多核机器上只读连接池的扩展性更明显。
+"""
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from src.common.connection_pool import SQLiteConnectionPool
+from src.common.models import Task
+from src.store.hybrid_store import SELECT_TASK_SQL, UPSERT_TASK_SQL, _task_params
+
+
+STATS_SQL = "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def populate(pool: SQLiteConnectionPool, rows: int) -> list[str]:
+    """写入rows个任务，返回任务ID列表"""
+    tasks = [Task(content=f"压测任务 {i}", result="结果" * 50) for i in range(rows)]
+    with pool.transaction() as conn:
+        conn.executemany(UPSERT_TASK_SQL, [_task_params(task) for task in tasks])
+    return [task.id for task in tasks]
+
+
+def run_threads(num_threads: int, reads: int, read_one) -> float:
+    """num_threads个线程共完成reads次读取，返回每秒读取数"""
+    per_thread = reads // num_threads
+
+    def worker():
+        for _ in range(per_thread):
+            read_one()
+
+    threads = [threading.Thread(target=worker) for _ in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return per_thread * num_threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite并发读取压测")
+    parser.add_argument("--rows", type=int, default=20000, help="任务行数")
+    parser.add_argument("--reads", type=int, default=20000, help="每轮读取次数")
+    parser.add_argument("--threads", default="1,2,4,8", help="线程数列表")
+    parser.add_argument("--query", choices=["point", "stats"], default="point", help="按ID查询 / 聚合统计")
+    args = parser.parse_args()
+
+    thread_counts = [int(n) for n in args.threads.split(",")]
+    db_path = str(Path(tempfile.mkdtemp()) / "bench_reads.db")
+    pool = SQLiteConnectionPool(db_path, read_pool_size=max(thread_counts))
+    task_ids = populate(pool, args.rows)
+
+    def query(conn):
+        if args.query == "stats":
+            conn.execute(STATS_SQL).fetchall()
+        else:
+            conn.execute(SELECT_TASK_SQL, (random.choice(task_ids),)).fetchone()
+
+    def read_shared():
+        query(pool.get_connection())
+
+    def read_pooled():
+        with pool.read_connection() as conn:
+            query(conn)
+
+    print("=" * 70)
+    print(f"SQLite并发读取: {args.rows} 行, 每轮 {args.reads} 次{'聚合统计' if args.query == 'stats' else '按ID查询'}")
+    print("=" * 70)
+    print(f"{'线程数':<8}{'共用写连接 读/秒':>18}{'只读连接池 读/秒':>18}")
+
+    for num_threads in thread_counts:
+        shared = run_threads(num_threads, args.reads, read_shared)
+        pooled = run_threads(num_threads, args.reads, read_pooled)
+        print(f"{num_threads:<8}{shared:>18.0f}{pooled:>18.0f}")
+
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+任务列表查询压测（默认100万行）
+1. 首页查询：无索引 vs (status, created_at, task_id)索引
+2. 深翻页：OFFSET vs 游标分页（list_tasks_page）
+
+使用临时数据库，不影响线上数据。
+
+用法：
+    python benchmark_task_listing.py --rows 1000000 --page 1000 --limit 50
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.common.connection_pool import SCHEMA_MIGRATIONS, SQLiteConnectionPool
+from src.store.hybrid_store import HybridTaskStore, encode_cursor
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+STATUSES = ["completed"] * 90 + ["failed"] * 8 + ["pending"] * 1 + ["running"] * 1
+
+LIST_SQL = '''
+    SELECT task_id, content, status, result, error, metadata, created_at, updated_at
+    FROM tasks WHERE status = ? ORDER BY created_at DESC, task_id DESC
+'''
+
+
+def populate(pool: SQLiteConnectionPool, rows: int):
+    """写入rows行历史任务（每秒一条，状态按线上比例分布）"""
+    start = datetime(2025, 1, 1)
+    chunk = 100_000
+    for offset in range(0, rows, chunk):
+        params = []
+        for i in range(offset, min(rows, offset + chunk)):
+            created_at = (start + timedelta(seconds=i)).isoformat(sep=' ')
+            params.append((str(uuid.uuid4()), f"历史任务 {i}", random.choice(STATUSES), "结果", created_at, created_at))
+        with pool.transaction() as conn:
+            conn.executemany('''
+                INSERT INTO tasks (task_id, content, status, result, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', params)
+
+
+def timed(fn, repeat: int) -> float:
+    """平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务列表查询压测")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="任务行数")
+    parser.add_argument("--page", type=int, default=1000, help="深翻页页码")
+    parser.add_argument("--limit", type=int, default=50, help="每页条数")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数")
+    args = parser.parse_args()
+
+    db_path = str(Path(tempfile.mkdtemp()) / "bench_listing.db")
+    pool = SQLiteConnectionPool(db_path)
+
+    print("=" * 70)
+    print(f"任务列表查询: {args.rows} 行, 第 {args.page} 页, 每页 {args.limit} 条")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    populate(pool, args.rows)
+    print(f"写入耗时: {time.perf_counter() - start:.1f}s\n")
+
+    conn = pool.get_connection()
+
+    def first_page(status: str):
+        return lambda: conn.execute(f"{LIST_SQL} LIMIT ?", (status, args.limit)).fetchall()
+
+    # 1. 首页：无索引 vs 索引
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_status_created")
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_created")
+    no_index = {status: timed(first_page(status), args.repeat) for status in ("completed", "pending")}
+
+    start = time.perf_counter()
+    for statement in SCHEMA_MIGRATIONS[0][1]:
+        conn.execute(statement)
+    print(f"建索引耗时: {time.perf_counter() - start:.1f}s\n")
+    indexed = {status: timed(first_page(status), args.repeat) for status in ("completed", "pending")}
+
+    print(f"{'首页查询':<24}{'无索引(ms)':>14}{'索引(ms)':>14}")
+    for status in ("completed", "pending"):
+        print(f"{'status=' + status:<24}{no_index[status]:>14.2f}{indexed[status]:>14.2f}")
+
+    # 2. 深翻页：OFFSET vs 游标
+    skip = args.page * args.limit
+    offset_ms = timed(
+        lambda: conn.execute(f"{LIST_SQL} LIMIT ? OFFSET ?", ("completed", args.limit, skip)).fetchall(),
+        args.repeat
+    )
+
+    store = HybridTaskStore(pool)
+    boundary = conn.execute(f"{LIST_SQL} LIMIT 1 OFFSET ?", ("completed", skip - 1)).fetchone()
+    cursor = encode_cursor(boundary["created_at"], boundary["task_id"])
+    keyset_ms = timed(lambda: store.list_tasks_page("completed", cursor, args.limit), args.repeat)
+
+    print(f"\n{'第' + str(args.page) + '页':<24}{'OFFSET(ms)':>14}{'游标(ms)':>14}")
+    print(f"{'status=completed':<24}{offset_ms:>14.2f}{keyset_ms:>14.2f}")
+
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
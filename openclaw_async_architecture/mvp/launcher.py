@@ -22,11 +22,17 @@ def start_worker():
     subprocess.run([sys.executable, "-m", "src.worker.main"])
 
 
+def start_all():
+    """启动进程管理器（Gateway + 按积压伸缩的Worker进程）"""
+    print("🚀 启动 Supervisor")
+    subprocess.run([sys.executable, "-m", "src.supervisor.main"])
+
+
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="OpenClaw V2 MVP")
-    parser.add_argument("command", choices=["gateway", "worker"], help="启动组件")
+    parser.add_argument("command", choices=["gateway", "worker", "all"], help="启动组件")
 
     args = parser.parse_args()
 
@@ -34,3 +40,5 @@ if __name__ == "__main__":
         start_gateway()
     elif args.command == "worker":
         start_worker()
+    elif args.command == "all":
+        start_all()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""序列化编解码 - 队列消息、任务缓存、工具结果缓存共用
+
+编码器由settings.serialization_codec选择：
+- json: 标准库（无额外依赖）
+- orjson: JSON格式，编解码更快（未安装时回退为json）
+- msgpack: 二进制格式，体积更小（未安装时回退为json）
+
+格式按首字节区分，读取方兼容所有格式：
+- JSON（json / orjson）不加头部，未升级的读取方仍可直接json.loads
+- msgpack加版本字节MSGPACK_V1，以后变更格式时换用新的版本字节
+- 压缩数据（compression模块的头字节）先解压再按上述规则解码
+"""
+import json
+from typing import Any, Optional, Union
+from .compression import compress, decompress, is_compressed
+from .config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# 二进制格式版本字节（JSON以"{"、"["等可见字符开头，不会与之冲突）
+MSGPACK_V1 = b"\x01"
+
+
+class JsonCodec:
+    """标准库JSON（紧凑分隔符，UTF-8字节）"""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def dump_model(self, model) -> bytes:
+        return model.model_dump_json().encode("utf-8")
+
+
+class OrjsonCodec:
+    """orjson（输出即UTF-8字节，与标准库JSON互通）"""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def dump_model(self, model) -> bytes:
+        # orjson原生支持datetime，省去model_dump(mode="json")的逐字段转换
+        return orjson.dumps(model.model_dump())
+
+
+class MsgpackCodec:
+    """msgpack（版本字节 + 二进制数据）"""
+
+    name = "msgpack"
+
+    def dumps(self, obj: Any) -> bytes:
+        return MSGPACK_V1 + msgpack.packb(obj, use_bin_type=True)
+
+    def dump_model(self, model) -> bytes:
+        return self.dumps(model.model_dump(mode="json"))
+
+
+CODECS = {
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+    "msgpack": MsgpackCodec
+}
+
+# 编码器依赖的可选包
+_REQUIRED = {"orjson": lambda: orjson, "msgpack": lambda: msgpack}
+
+
+def available_codecs() -> list[str]:
+    """当前环境可用的编码器"""
+    return [name for name in CODECS if _REQUIRED.get(name, lambda: True)() is not None]
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """解码（按首字节识别格式，兼容旧版JSON字符串）"""
+    if isinstance(data, str):
+        return orjson.loads(data) if orjson else json.loads(data)
+    if is_compressed(data):
+        data = decompress(data)
+    if data[:1] == MSGPACK_V1:
+        if msgpack is None:
+            raise ValueError("数据为msgpack格式，但未安装msgpack")
+        return msgpack.unpackb(data[1:], raw=False)
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """按当前配置的编码器编码"""
+    return get_codec().dumps(obj)
+
+
+def dumps_task(task) -> bytes:
+    """编码任务模型（超过压缩阈值时整体压缩，见compression模块）"""
+    return compress(get_codec().dump_model(task))
+
+
+def loads_task(data: Union[bytes, str]):
+    """解码任务模型"""
+    from .models import Task
+    return Task.model_validate(loads(data))
+
+
+# 全局实例
+_codec = None
+
+
+def get_codec(name: Optional[str] = None):
+    """获取编码器（不传name时为settings.serialization_codec的全局实例）"""
+    global _codec
+    if name is None and _codec is not None:
+        return _codec
+
+    requested = name or settings.serialization_codec
+    codec_name = requested if requested in available_codecs() else "json"
+    if codec_name != requested:
+        print(f"[Codec] 编码器 {requested} 不可用，回退为json")
+    codec = CODECS[codec_name]()
+
+    if name is None:
+        _codec = codec
+    return codec
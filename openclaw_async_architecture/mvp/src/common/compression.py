@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""大结果压缩 - SQLite结果列与Redis任务缓存共用
+
+超过settings.result_compress_threshold字节的数据压缩后存储，读取时透明解压：
+- SQLite: result列存为BLOB（头字节 + 压缩数据），未压缩的结果仍为TEXT
+- Redis: codec编码后的缓存值整体压缩
+
+头字节与codec的格式字节（JSON可见字符 / MSGPACK_V1）不冲突，
+codec.loads可直接识别压缩数据。
+"""
+import threading
+import time
+import zlib
+from typing import Optional, Union
+from .config import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# 压缩格式头字节
+ZLIB_V1 = b"\x02"
+ZSTD_V1 = b"\x03"
+
+
+class CompressionMetrics:
+    """压缩指标（进程内累计：压缩前后字节数、解压次数与耗时）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.decompressed = 0
+        self.decompress_seconds = 0.0
+
+    def record_compress(self, raw: int, stored: int):
+        with self._lock:
+            self.compressed += 1
+            self.raw_bytes += raw
+            self.stored_bytes += stored
+
+    def record_decompress(self, seconds: float):
+        with self._lock:
+            self.decompressed += 1
+            self.decompress_seconds += seconds
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "algorithm": get_algorithm(),
+                "threshold": settings.result_compress_threshold,
+                "compressed": self.compressed,
+                "raw_bytes": self.raw_bytes,
+                "stored_bytes": self.stored_bytes,
+                "saved_bytes": self.raw_bytes - self.stored_bytes,
+                "ratio": round(self.stored_bytes / self.raw_bytes, 3) if self.raw_bytes else None,
+                "decompressed": self.decompressed,
+                "decompress_avg_us": round(self.decompress_seconds / self.decompressed * 1_000_000, 1)
+                if self.decompressed else 0.0
+            }
+
+
+compression_metrics = CompressionMetrics()
+
+
+def get_algorithm() -> str:
+    """当前压缩算法（zstd未安装时回退为zlib；none为关闭）"""
+    algorithm = settings.result_compression
+    if algorithm == "zstd" and zstandard is None:
+        return "zlib"
+    return algorithm
+
+
+def is_compressed(data) -> bool:
+    """是否为本模块压缩的数据"""
+    return isinstance(data, (bytes, bytearray)) and data[:1] in (ZLIB_V1, ZSTD_V1)
+
+
+def compress(data: bytes, threshold: Optional[int] = None) -> bytes:
+    """超过阈值时压缩（压缩后不更小则原样返回）"""
+    threshold = settings.result_compress_threshold if threshold is None else threshold
+    algorithm = get_algorithm()
+    if algorithm == "none" or len(data) <= threshold:
+        return data
+
+    if algorithm == "zstd":
+        packed = ZSTD_V1 + zstandard.ZstdCompressor(level=settings.result_compression_level).compress(data)
+    else:
+        packed = ZLIB_V1 + zlib.compress(data, settings.result_compression_level)
+
+    if len(packed) >= len(data):
+        return data
+    compression_metrics.record_compress(len(data), len(packed))
+    return packed
+
+
+def decompress(data: bytes) -> bytes:
+    """解压（未压缩的数据原样返回）"""
+    if not is_compressed(data):
+        return data
+
+    start = time.perf_counter()
+    if data[:1] == ZSTD_V1:
+        if zstandard is None:
+            raise ValueError("数据为zstd压缩，但未安装zstandard")
+        raw = zstandard.ZstdDecompressor().decompress(data[1:])
+    else:
+        raw = zlib.decompress(data[1:])
+    compression_metrics.record_decompress(time.perf_counter() - start)
+    return raw
+
+
+def compress_text(text: Optional[str]) -> Union[str, bytes, None]:
+    """结果列写入：超过阈值时返回压缩后的bytes（存为BLOB），否则原文"""
+    if not text:
+        return text
+    data = text.encode("utf-8")
+    packed = compress(data)
+    return text if packed is data else packed
+
+
+def decompress_text(value: Union[str, bytes, None]) -> Optional[str]:
+    """结果列读取：BLOB解压还原为文本，TEXT原样返回"""
+    if isinstance(value, (bytes, bytearray)):
+        return decompress(bytes(value)).decode("utf-8")
+    return value
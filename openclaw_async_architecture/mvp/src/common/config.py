@@ -1,8 +1,35 @@
 """配置管理"""
 import os
+from pathlib import Path
 from typing import Optional
 
 
+# src/common/config.py → openclaw_async_architecture/API_CONFIG_FINAL.json
+DEFAULT_API_CONFIG_PATH = Path(__file__).resolve().parents[3] / "API_CONFIG_FINAL.json"
+
+
+def parse_limits(value: str) -> dict[str, int]:
+    """解析"name:n,name:n"格式的限额配置"""
+    limits = {}
+    for item in value.split(","):
+        if ":" in item:
+            name, limit = item.split(":", 1)
+            limits[name.strip()] = int(limit)
+    return limits
+
+
+def parse_list(value: str) -> list[str]:
+    """解析逗号分隔的列表配置"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def parse_optional_float(value: Optional[str]) -> Optional[float]:
+    """解析可选数值配置（未设置或为空时返回None）"""
+    if value is None or not value.strip():
+        return None
+    return float(value)
+
+
 class Settings:
     """OpenClaw V2 MVP 配置"""
 
@@ -16,14 +43,145 @@ class Settings:
         self.redis_port = int(os.getenv("REDIS_PORT", "6379"))
         self.redis_db = int(os.getenv("REDIS_DB", "0"))
         self.redis_password = os.getenv("REDIS_PASSWORD")
+        # 连接池：同步池供Worker/工具线程使用，asyncio池供Gateway事件循环使用
+        self.redis_max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+        self.redis_async_max_connections = int(os.getenv("REDIS_ASYNC_MAX_CONNECTIONS", "100"))
+        # 连接池耗尽时等待空闲连接的最长时间（秒），超时抛出ConnectionError
+        self.redis_pool_timeout = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+        self.redis_connect_timeout = float(os.getenv("REDIS_CONNECT_TIMEOUT", "5"))
+        # 读写超时（秒），留空不限；需大于BRPOP/XREADGROUP阻塞时长，Pub/Sub长连接也受其影响
+        self.redis_socket_timeout = parse_optional_float(os.getenv("REDIS_SOCKET_TIMEOUT"))
+        self.redis_health_check_interval = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
 
         # OpenClaw V1
         self.v1_gateway_url = os.getenv("V1_GATEWAY_URL", "http://127.0.0.1:18790")
         self.v1_gateway_token = os.getenv("V1_GATEWAY_TOKEN", "lbprg74nqGxsvopWqkgLAAefoIWKobzH")
         self.v1_agent_id = os.getenv("V1_AGENT_ID", "main")
 
+        # 模型API配置文件（默认为仓库中的openclaw_async_architecture/API_CONFIG_FINAL.json）
+        self.api_config_path = os.getenv("API_CONFIG_PATH", str(DEFAULT_API_CONFIG_PATH))
+        # 模型API连接池：单次请求超时（秒）；未配置max_concurrent的模型的连接上限；空闲连接保留秒数；
+        # 是否启用HTTP/2（需pip install httpx[http2]，未安装自动降级HTTP/1.1）
+        self.provider_timeout = float(os.getenv("PROVIDER_TIMEOUT", "30"))
+        self.provider_max_connections = int(os.getenv("PROVIDER_MAX_CONNECTIONS", "10"))
+        self.provider_keepalive_expiry = float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY", "60"))
+        self.provider_http2 = os.getenv("PROVIDER_HTTP2", "true").lower() in ("1", "true", "yes")
+        # 模型并发/RPM限制后端：redis（所有进程共享配额，Redis不可用时退回进程内）/ local（仅进程内）
+        self.rate_limit_backend = os.getenv("RATE_LIMIT_BACKEND", "redis").lower()
+        # RPM令牌桶容量占RPM的比例（突发量；补充速率相应降低，任意60秒内不超过RPM）；
+        # 并发租约有效秒数（进程崩溃未归还的名额到期释放，应大于单次调用最长耗时）；Redis出错后多久再试（秒）
+        self.rate_limit_burst = float(os.getenv("RATE_LIMIT_BURST", "0.1"))
+        self.rate_limit_lease_ttl = float(os.getenv("RATE_LIMIT_LEASE_TTL", "120"))
+        self.rate_limit_retry_interval = float(os.getenv("RATE_LIMIT_RETRY_INTERVAL", "5"))
+        # 对冲请求：对这些任务类型（如realtime），首选模型超过其最近p95延迟仍未返回时，
+        # 向下一个有并发/RPM名额的模型发同样的请求，取先返回的结果（空为关闭）
+        self.hedge_task_types = parse_list(os.getenv("HEDGE_TASK_TYPES", ""))
+        # 同时在途的最多请求数；p95样本不足时的等待秒数；等待下限（秒）
+        self.hedge_max_requests = int(os.getenv("HEDGE_MAX_REQUESTS", "2"))
+        self.hedge_default_delay = float(os.getenv("HEDGE_DEFAULT_DELAY", "2"))
+        self.hedge_min_delay = float(os.getenv("HEDGE_MIN_DELAY", "0.3"))
+        # 自适应路由：按各模型的EWMA延迟/首字延迟/错误率重排TaskClassifier的推荐顺序
+        # EWMA平滑系数；参与排序的最少样本数；把非首选模型提到最前的探索概率；按首字延迟排序的任务类型
+        self.routing_ewma_alpha = float(os.getenv("ROUTING_EWMA_ALPHA", "0.2"))
+        self.routing_min_samples = int(os.getenv("ROUTING_MIN_SAMPLES", "5"))
+        self.routing_exploration = float(os.getenv("ROUTING_EXPLORATION", "0.05"))
+        self.routing_ttft_task_types = parse_list(os.getenv("ROUTING_TTFT_TASK_TYPES", "realtime"))
+
         # Worker配置
         self.worker_timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+        # 每次从队列批量拉取的任务数
+        self.worker_batch_size = int(os.getenv("WORKER_BATCH_SIZE", "10"))
+        # 单进程最大并发任务数，及按任务类型的并发上限
+        self.worker_max_inflight = int(os.getenv("WORKER_MAX_INFLIGHT", "8"))
+        self.worker_type_limits = parse_limits(os.getenv("WORKER_TYPE_LIMITS", "v1:4,chat:4,command:2"))
+        # 收到SIGTERM后等待在途任务完成的最长时间（秒）
+        self.worker_drain_timeout = int(os.getenv("WORKER_DRAIN_TIMEOUT", "300"))
+        self.worker_metrics_interval = int(os.getenv("WORKER_METRICS_INTERVAL", "10"))
+
+        # 进程管理（src.supervisor）：Gateway的uvicorn worker数；Worker进程数范围，
+        # 每个Worker进程承担的队列积压（按此扩缩容）；伸缩检查间隔、缩容前积压持续偏低的秒数；等待就绪的最长时间
+        self.supervisor_gateway_workers = int(os.getenv("SUPERVISOR_GATEWAY_WORKERS", "1"))
+        self.supervisor_min_workers = int(os.getenv("SUPERVISOR_MIN_WORKERS", "1"))
+        self.supervisor_max_workers = int(os.getenv("SUPERVISOR_MAX_WORKERS", "4"))
+        self.supervisor_tasks_per_worker = int(os.getenv("SUPERVISOR_TASKS_PER_WORKER", "100"))
+        self.supervisor_scale_interval = float(os.getenv("SUPERVISOR_SCALE_INTERVAL", "10"))
+        self.supervisor_scale_down_delay = float(os.getenv("SUPERVISOR_SCALE_DOWN_DELAY", "60"))
+        self.supervisor_ready_timeout = float(os.getenv("SUPERVISOR_READY_TIMEOUT", "30"))
+
+        # 失败重试：最多执行次数（含首次，1为不重试），指数退避的首次等待与上限（秒）
+        self.retry_max_attempts = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+        self.retry_base_delay = float(os.getenv("RETRY_BASE_DELAY", "2"))
+        self.retry_max_delay = float(os.getenv("RETRY_MAX_DELAY", "300"))
+        # 视为暂时性（可重试）的错误：正则，匹配任务error字段
+        self.retry_error_pattern = os.getenv(
+            "RETRY_ERROR_PATTERN",
+            r"HTTP (429|5\d\d)|timeout|timed out|connect|temporarily|overloaded|rate limit"
+        )
+        # Worker检查到期延迟/重试任务的间隔（秒）
+        self.scheduler_poll_interval = float(os.getenv("SCHEDULER_POLL_INTERVAL", "1"))
+
+        # 重复提交去重：Idempotency-Key保留秒数；内容哈希去重窗口（秒，0为关闭）
+        self.idempotency_ttl = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+        self.dedup_window = int(os.getenv("DEDUP_WINDOW", "0"))
+
+        # 准入控制：每个客户端每秒请求数与突发容量（0为不限）
+        self.admission_client_rate = float(os.getenv("ADMISSION_CLIENT_RATE", "50"))
+        self.admission_client_burst = float(os.getenv("ADMISSION_CLIENT_BURST", "100"))
+        # 受信代理的IP（逗号分隔）：仅来自这些地址的请求采用X-Client-ID，其余按来源IP计
+        self.admission_trusted_proxies = parse_list(os.getenv("ADMISSION_TRUSTED_PROXIES", ""))
+        # 队列积压上限（0为不限），及各车道在积压达到上限百分之几时被拒绝（低优先级先拒绝）
+        self.admission_max_queue = int(os.getenv("ADMISSION_MAX_QUEUE", "50000"))
+        self.admission_shed_thresholds = parse_limits(
+            os.getenv("ADMISSION_SHED_THRESHOLDS", "bulk:50,complex:75,simple:90,realtime:100")
+        )
+        self.admission_retry_after_max = int(os.getenv("ADMISSION_RETRY_AFTER_MAX", "300"))
+
+        # 单次批量提交的最大任务数
+        self.batch_max_tasks = int(os.getenv("BATCH_MAX_TASKS", "10000"))
+
+        # 队列消息 / 任务缓存 / 工具缓存的编码器: json / orjson / msgpack（未安装时回退为json）
+        self.serialization_codec = os.getenv("SERIALIZATION_CODEC", "orjson")
+
+        # 大结果压缩：超过阈值（字节）的任务结果在SQLite与Redis缓存中压缩存储
+        # 算法: zstd（需pip install zstandard，未安装回退zlib） / zlib / none
+        self.result_compression = os.getenv("RESULT_COMPRESSION", "zstd")
+        self.result_compress_threshold = int(os.getenv("RESULT_COMPRESS_THRESHOLD", "8192"))
+        self.result_compression_level = int(os.getenv("RESULT_COMPRESSION_LEVEL", "3"))
+
+        # 队列配置
+        # 队列后端: list（LPUSH/BRPOP） / stream（Redis Streams消费组，支持ack与故障接管）
+        #           / priority（按TaskClassifier分车道，加权出队）
+        self.queue_backend = os.getenv("QUEUE_BACKEND", "list")
+        # priority后端：各车道出队权重，及队头等待超过多少秒后优先出队（防饿死）
+        self.queue_lane_weights = parse_limits(os.getenv("QUEUE_LANE_WEIGHTS", "realtime:8,simple:4,complex:2,bulk:1"))
+        self.queue_lane_max_wait = float(os.getenv("QUEUE_LANE_MAX_WAIT", "60"))
+        self.stream_group = os.getenv("STREAM_GROUP", "openclaw_workers")
+        self.stream_claim_idle_ms = int(os.getenv("STREAM_CLAIM_IDLE_MS", "300000"))
+        self.stream_reclaim_interval = int(os.getenv("STREAM_RECLAIM_INTERVAL", "30"))
+
+        # SQLite配置
+        self.sqlite_db_path = os.getenv(
+            "SQLITE_DB_PATH",
+            r'C:\Users\10952\.openclaw\workspace\memory\v1_memory.db'
+        )
+        # 持久化模式: sync（每次写入立即提交） / batched（写后合并提交，group commit）
+        self.sqlite_durability = os.getenv("SQLITE_DURABILITY", "sync")
+        self.sqlite_flush_interval_ms = int(os.getenv("SQLITE_FLUSH_INTERVAL_MS", "50"))
+        self.sqlite_flush_batch_size = int(os.getenv("SQLITE_FLUSH_BATCH_SIZE", "500"))
+        # 只读连接数（WAL下与唯一的写连接并发读取），及每个连接的预编译语句缓存条数
+        self.sqlite_read_pool_size = int(os.getenv("SQLITE_READ_POOL_SIZE", "4"))
+        self.sqlite_statement_cache = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+        # 任务保留：按状态的保留天数，超期任务移入月度归档库（未列出的状态不归档）
+        self.retention_days = parse_limits(os.getenv("RETENTION_DAYS", "completed:30,failed:90"))
+        # Gateway执行归档的间隔（秒，0为关闭），每批移动的任务数
+        self.retention_interval = int(os.getenv("RETENTION_INTERVAL", "3600"))
+        self.retention_batch_size = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+        # 归档库目录（默认为SQLite数据库所在目录下的archive）
+        self.archive_dir = os.getenv("ARCHIVE_DIR") or None
+        # Redis任务缓存按状态的TTL（秒），未列出的状态使用默认3600
+        self.cache_ttl_by_status = parse_limits(os.getenv("CACHE_TTL_BY_STATUS", ""))
+        # Gateway定期全表校正状态计数的间隔（秒，0为关闭）
+        self.stats_reconcile_interval = int(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))
 
 
 # 全局配置实例
@@ -1,20 +1,180 @@
 # -*- coding: utf-8 -*-
 """连接池管理 - Phase 2性能优化"""
 
+import asyncio
+import queue
 import redis
+import redis.asyncio as aioredis
+import socket
 import sqlite3
+import time
+from pathlib import Path
 from typing import Optional
 from contextlib import contextmanager
-from threading import Lock
+from threading import Lock, RLock
 from .config import settings
 
 
+def _keepalive_options() -> dict:
+    """TCP keepalive参数（按当前平台实际提供的socket常量设置）"""
+    options = {}
+    for name, value in (("TCP_KEEPIDLE", 1), ("TCP_KEEPINTVL", 3), ("TCP_KEEPCNT", 5)):
+        if hasattr(socket, name):
+            options[getattr(socket, name)] = value
+    return options
+
+
+def _connection_kwargs(decode_responses: bool = True) -> dict:
+    """同步池与asyncio池共用的连接参数"""
+    return {
+        "host": settings.redis_host,
+        "port": settings.redis_port,
+        "db": settings.redis_db,
+        "password": settings.redis_password,
+        "decode_responses": decode_responses,
+        "socket_connect_timeout": settings.redis_connect_timeout,
+        "socket_timeout": settings.redis_socket_timeout,
+        "socket_keepalive": True,
+        "socket_keepalive_options": _keepalive_options(),
+        "health_check_interval": settings.redis_health_check_interval
+    }
+
+
+class PoolMetrics:
+    """连接池指标（借出数、获取连接的等待时间、等待超时次数）"""
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self.in_use = 0
+        self.acquired = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self._lock = Lock()
+
+    def record_acquire(self, seconds: float):
+        """记录一次成功借出及等待时间"""
+        with self._lock:
+            self.in_use += 1
+            self.acquired += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_release(self):
+        """记录一次归还"""
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def record_timeout(self):
+        """记录一次等待空闲连接超时（连接池耗尽）"""
+        with self._lock:
+            self.timeouts += 1
+
+    def to_dict(self) -> dict:
+        """转换为字典"""
+        wait_avg = self.wait_total / self.acquired if self.acquired else 0.0
+        return {
+            "max_connections": self.max_connections,
+            "in_use": self.in_use,
+            "acquired": self.acquired,
+            "wait_avg_ms": round(wait_avg * 1000, 3),
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+            "timeouts": self.timeouts
+        }
+
+
+def _is_pool_exhausted(error: Exception) -> bool:
+    """BlockingConnectionPool等待超时时抛出的错误"""
+    return "No connection available" in str(error)
+
+
+class MeteredBlockingConnectionPool(redis.BlockingConnectionPool):
+    """带等待指标的阻塞连接池（池满时等待而不是立即报错）"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = PoolMetrics(self.max_connections)
+
+    def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            connection = super().get_connection(command_name, *keys, **options)
+        except redis.ConnectionError as e:
+            if _is_pool_exhausted(e):
+                self.metrics.record_timeout()
+            raise
+        self.metrics.record_acquire(time.perf_counter() - start)
+        return connection
+
+    def release(self, connection):
+        super().release(connection)
+        self.metrics.record_release()
+
+
+class AsyncMeteredBlockingConnectionPool(aioredis.BlockingConnectionPool):
+    """asyncio版带等待指标的阻塞连接池
+
+    只在条件锁内领取连接，建立连接放到锁外：redis-py 5.0.x的实现会在持锁状态下
+    因连接失败调用release()再次加锁，导致Redis不可用时每个请求都卡满pool_timeout。
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = PoolMetrics(self.max_connections)
+
+    async def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            connection = await asyncio.wait_for(self._take_connection(), self.timeout)
+        except asyncio.TimeoutError as err:
+            self.metrics.record_timeout()
+            raise redis.ConnectionError("No connection available.") from err
+        self.metrics.record_acquire(time.perf_counter() - start)
+
+        try:
+            await self.ensure_connection(connection)
+        except BaseException:
+            await self.release(connection)
+            raise
+        return connection
+
+    async def _take_connection(self):
+        """等待空位并领取一个连接（空闲连接优先，否则新建）"""
+        async with self._condition:
+            await self._condition.wait_for(self.can_get_connection)
+            try:
+                connection = self._available_connections.pop()
+            except IndexError:
+                connection = self.make_connection()
+            self._in_use_connections.add(connection)
+            return connection
+
+    async def release(self, connection):
+        await super().release(connection)
+        self.metrics.record_release()
+
+
 class RedisConnectionPool:
-    """Redis连接池管理器"""
+    """Redis连接池管理器
+
+    进程内所有Redis访问（队列、存储、工具缓存、记忆系统）共用同一个池：
+    - client: 同步客户端（线程安全，首次访问时创建并缓存）
+    - async_client: asyncio客户端（Gateway事件循环内使用）
+    - binary_client / async_binary_client: 返回原始bytes（不做UTF-8解码），
+      读取codec编码的队列消息与缓存值（msgpack等二进制格式）
+    池大小、等待超时、读写超时见settings.redis_*。
+    """
 
     _instance = None
     _lock = Lock()
     _pool = None
+    _client = None
+    _async_pool = None
+    _async_client = None
+    _binary_pool = None
+    _binary_client = None
+    _async_binary_pool = None
+    _async_binary_client = None
 
     def __new__(cls):
         """单例模式"""
@@ -22,26 +182,83 @@ class RedisConnectionPool:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
-                    cls._pool = redis.ConnectionPool(
-                        host=settings.redis_host,
-                        port=settings.redis_port,
-                        db=settings.redis_db,
-                        password=settings.redis_password,
-                        max_connections=10,  # 最大连接数
-                        decode_responses=True,
-                        socket_keepalive=True,
-                        socket_keepalive_options={
-                            1: 1,  # TCP_KEEPIDLE
-                            2: 3,  # TCP_KEEPINTVL
-                            3: 5   # TCP_KEEPCNT
-                        }
+                    cls._pool = MeteredBlockingConnectionPool(
+                        max_connections=settings.redis_max_connections,
+                        timeout=settings.redis_pool_timeout,
+                        **_connection_kwargs()
                     )
+                    cls._client = redis.Redis(connection_pool=cls._pool)
         return cls._instance
 
     @property
     def client(self) -> redis.Redis:
-        """获取Redis客户端（自动从连接池获取）"""
-        return redis.Redis(connection_pool=self._pool)
+        """获取Redis客户端（共用连接池，命令执行时借出连接）"""
+        return self._client
+
+    @property
+    def async_client(self) -> aioredis.Redis:
+        """获取asyncio版Redis客户端（Gateway事件循环内使用，不阻塞）"""
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    RedisConnectionPool._async_pool = AsyncMeteredBlockingConnectionPool(
+                        max_connections=settings.redis_async_max_connections,
+                        timeout=settings.redis_pool_timeout,
+                        **_connection_kwargs()
+                    )
+                    RedisConnectionPool._async_client = aioredis.Redis(connection_pool=self._async_pool)
+        return self._async_client
+
+    @property
+    def binary_client(self) -> redis.Redis:
+        """获取返回bytes的Redis客户端（读取codec编码的数据）"""
+        if self._binary_client is None:
+            with self._lock:
+                if self._binary_client is None:
+                    RedisConnectionPool._binary_pool = MeteredBlockingConnectionPool(
+                        max_connections=settings.redis_max_connections,
+                        timeout=settings.redis_pool_timeout,
+                        **_connection_kwargs(decode_responses=False)
+                    )
+                    RedisConnectionPool._binary_client = redis.Redis(connection_pool=self._binary_pool)
+        return self._binary_client
+
+    @property
+    def async_binary_client(self) -> aioredis.Redis:
+        """获取返回bytes的asyncio版Redis客户端"""
+        if self._async_binary_client is None:
+            with self._lock:
+                if self._async_binary_client is None:
+                    RedisConnectionPool._async_binary_pool = AsyncMeteredBlockingConnectionPool(
+                        max_connections=settings.redis_async_max_connections,
+                        timeout=settings.redis_pool_timeout,
+                        **_connection_kwargs(decode_responses=False)
+                    )
+                    RedisConnectionPool._async_binary_client = aioredis.Redis(
+                        connection_pool=self._async_binary_pool
+                    )
+        return self._async_binary_client
+
+    def stats(self) -> dict:
+        """连接池指标（同步池 / asyncio池，及各自的bytes池）"""
+        pools = {
+            "sync": self._pool,
+            "async": self._async_pool,
+            "sync_binary": self._binary_pool,
+            "async_binary": self._async_binary_pool
+        }
+        return {name: pool.metrics.to_dict() if pool is not None else None for name, pool in pools.items()}
+
+    async def close_async(self):
+        """关闭asyncio连接池"""
+        if self._async_pool is not None:
+            await self._async_pool.disconnect()
+            RedisConnectionPool._async_pool = None
+            RedisConnectionPool._async_client = None
+        if self._async_binary_pool is not None:
+            await self._async_binary_pool.disconnect()
+            RedisConnectionPool._async_binary_pool = None
+            RedisConnectionPool._async_binary_client = None
 
     @contextmanager
     def get_client(self):
@@ -54,54 +271,184 @@ class RedisConnectionPool:
             pass
 
 
+# 结构迁移：(版本, [SQL, ...])，按版本顺序追加，不修改已发布的条目
+SCHEMA_MIGRATIONS = [
+    (1, [
+        # 列表查询：按状态筛选 / 全部，按(created_at, task_id)排序与游标分页
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_created ON tasks(status, created_at, task_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks(created_at, task_id)",
+    ]),
+    (2, [
+        # 按状态计数：触发器随每次插入/状态变更/删除增量维护，统计查询与表大小无关
+        """CREATE TABLE IF NOT EXISTS task_status_counts (
+            status TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )""",
+        "DELETE FROM task_status_counts",
+        "INSERT INTO task_status_counts (status, count) SELECT status, COUNT(*) FROM tasks GROUP BY status",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_count_insert AFTER INSERT ON tasks
+        BEGIN
+            INSERT INTO task_status_counts (status, count) VALUES (NEW.status, 1)
+            ON CONFLICT(status) DO UPDATE SET count = count + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_count_update AFTER UPDATE OF status ON tasks
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            UPDATE task_status_counts SET count = count - 1 WHERE status = OLD.status;
+            INSERT INTO task_status_counts (status, count) VALUES (NEW.status, 1)
+            ON CONFLICT(status) DO UPDATE SET count = count + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_count_delete AFTER DELETE ON tasks
+        BEGIN
+            UPDATE task_status_counts SET count = count - 1 WHERE status = OLD.status;
+        END""",
+    ]),
+    (3, [
+        # 归档定位：已移入月度归档库的task_id → 归档月份（YYYY_MM），get_task热表未命中时查找
+        """CREATE TABLE IF NOT EXISTS task_archive_index (
+            task_id TEXT PRIMARY KEY,
+            archive TEXT NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID""",
+    ]),
+]
+
+
 class SQLiteConnectionPool:
     """SQLite连接池管理器
 
-    SQLite本身不支持真正的连接池，所以我们：
-    1. 维护一个连接（线程安全）
-    2. 使用连接复用
-    3. 提供事务管理
+    WAL模式下读写互不阻塞，因此分为：
+    1. 一个写连接：所有写入经transaction()串行执行（写锁）
+    2. 最多read_pool_size个只读连接：read_connection()按需借出、用完归还，
+       并发读取不再与写入争用同一个连接
+    3. 每个连接保留已编译语句缓存（cached_statements），相同SQL文本复用预编译结果
+
+    不传db_path时为全局单例（settings.sqlite_db_path）；
+    显式传入db_path时创建独立实例（测试、独立数据库）。
     """
 
     _instance = None
     _lock = Lock()
+    _write_lock = RLock()
     _conn = None
     _db_path = None
 
-    def __new__(cls, db_path: Optional[str] = None):
+    def __new__(cls, db_path: Optional[str] = None, read_pool_size: Optional[int] = None):
         """单例模式"""
+        if db_path is not None:
+            instance = super().__new__(cls)
+            instance._db_path = db_path
+            instance._conn = None
+            instance._lock = Lock()
+            instance._write_lock = RLock()
+            instance._init_read_pool(read_pool_size)
+            return instance
+
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
                     cls._db_path = db_path
                     cls._conn = None
+                    cls._instance._init_read_pool(read_pool_size)
         return cls._instance
 
+    def _init_read_pool(self, size: Optional[int]):
+        """只读连接池（None占位，首次借出时才真正连接）"""
+        self.read_pool_size = size or settings.sqlite_read_pool_size
+        self._read_pool: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(self.read_pool_size):
+            self._read_pool.put(None)
+        self._readers: list[sqlite3.Connection] = []
+
     def get_connection(self) -> sqlite3.Connection:
-        """获取SQLite连接（线程安全）"""
+        """获取写连接（线程安全；读取请使用read_connection()）"""
         with self._lock:
             if self._conn is None:
                 import os
                 if self._db_path is None:
-                    db_dir = r'C:\Users\10952\.openclaw\workspace\memory'
+                    self._db_path = settings.sqlite_db_path
+                db_dir = os.path.dirname(self._db_path)
+                if db_dir:
                     os.makedirs(db_dir, exist_ok=True)
-                    self._db_path = os.path.join(db_dir, 'v1_memory.db')
 
                 self._conn = sqlite3.connect(
                     self._db_path,
                     check_same_thread=False,
-                    isolation_level=None  # 自动提交模式（每个语句自动提交）
+                    isolation_level=None,  # 自动提交模式（每个语句自动提交）
+                    cached_statements=settings.sqlite_statement_cache
                 )
                 self._conn.row_factory = sqlite3.Row  # 返回字典格式
                 self._init_tables()
 
             return self._conn
 
+    @property
+    def db_path(self) -> str:
+        """数据库文件路径"""
+        return self._db_path or settings.sqlite_db_path
+
+    @contextmanager
+    def read_connection(self):
+        """借用只读连接（池空时等待其他线程归还）
+
+        用法：
+            with sqlite_pool.read_connection() as conn:
+                conn.execute(...)
+        """
+        read_pool = self._read_pool  # close()会换新池，归还到借出时的池
+        conn = read_pool.get()
+        try:
+            if conn is None:
+                conn = self._open_reader()
+        except Exception:
+            read_pool.put(None)
+            raise
+
+        try:
+            yield conn
+        finally:
+            read_pool.put(conn)
+
+    def _open_reader(self) -> sqlite3.Connection:
+        """打开只读连接（先确保写连接已建库建表）"""
+        self.get_connection()
+        uri = Path(self._db_path).absolute().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,  # 借出期间只被一个线程使用，可跨线程归还
+            isolation_level=None,
+            cached_statements=settings.sqlite_statement_cache
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-16000")
+        with self._lock:
+            self._readers.append(conn)
+        return conn
+
     def _init_tables(self):
         """初始化表"""
         cursor = self._conn.cursor()
 
+        # 新建库启用增量auto_vacuum（归档删除后可分批回收空闲页；已有库需一次VACUUM转换）
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+
+        # 性能相关PRAGMA
+        # - WAL: 读写互不阻塞，提交只追加WAL文件
+        # - synchronous: sync模式FULL（每次提交fsync）；batched模式NORMAL（WAL下仅checkpoint时fsync）
+        cursor.execute("PRAGMA journal_mode=WAL")
+        if settings.sqlite_durability == "batched":
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        else:
+            cursor.execute("PRAGMA synchronous=FULL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-16000")  # 16MB页缓存
+
         # 创建任务表
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS tasks (
@@ -117,21 +464,49 @@ class SQLiteConnectionPool:
         ''')
 
         self._conn.commit()
+        self._migrate()
+
+    def _migrate(self):
+        """按PRAGMA user_version执行未应用的结构迁移（每个版本一个事务）"""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, statements in SCHEMA_MIGRATIONS:
+            if target <= version:
+                continue
+            # 在get_connection()持锁期间执行，直接使用写连接
+            with self._immediate_transaction(self._conn) as conn:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {target}")
+            print(f"[SQLite] 结构迁移到版本 {target}")
 
     @contextmanager
     def transaction(self):
-        """事务上下文管理器"""
-        conn = self.get_connection()
-        try:
+        """事务上下文管理器
+
+        连接处于自动提交模式，这里显式BEGIN，使块内多条语句（含executemany）
+        只产生一次提交；写锁保证同一时刻只有一个事务。
+        """
+        with self._immediate_transaction(self.get_connection()) as conn:
             yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
+
+    @contextmanager
+    def _immediate_transaction(self, conn: sqlite3.Connection):
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
     def close(self):
-        """关闭连接"""
+        """关闭写连接与所有只读连接"""
         with self._lock:
+            for reader in self._readers:
+                reader.close()
+            self._readers.clear()
+            self._init_read_pool(self.read_pool_size)
             if self._conn:
                 self._conn.close()
                 self._conn = None
@@ -0,0 +1,146 @@
+"""分布式速率限制 - 多个Worker/Gateway进程共享同一份模型配额
+
+进程内的deque/信号量各算各的：两个Worker进程各自放行40 RPM，合起来就超出供应商的配额（429）。
+这里把计数放到Redis，由Lua脚本原子完成：
+- RPM：令牌桶（哈希 tokens / ts），容量为RPM的settings.rate_limit_burst比例，
+  补充速率为 (RPM - 容量) / 60秒，任意60秒窗口内放行数不超过RPM
+- 并发：租约ZSET（成员为租约ID，分数为到期时间），获取时先清理过期租约；
+  进程崩溃未归还的租约在settings.rate_limit_lease_ttl秒后自动失效
+
+时间统一取Redis服务器的TIME，不受各进程主机时钟偏差影响。
+Redis不可用时由MultiModelRateLimiter退回进程内限制（见multi_model_limiter）。
+"""
+import math
+import time
+import uuid
+from typing import Optional
+import redis
+from .config import settings
+from .connection_pool import redis_pool
+
+
+LIMITER_KEY_PREFIX = "openclaw:limiter:"
+
+# 令牌桶：返回 {是否放行, 需等待的毫秒数}
+# KEYS[1]=令牌桶哈希  ARGV[1]=容量  ARGV[2]=每毫秒补充令牌数  ARGV[3]=本次取的令牌数
+TOKEN_BUCKET_SCRIPT = """
+redis.replicate_commands()
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+    allowed = 1
+else
+    wait = math.ceil((requested - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate) + 1000)
+return {allowed, wait}
+"""
+
+# 并发租约：返回1（获得）/ 0（已满）
+# KEYS[1]=租约ZSET  ARGV[1]=并发上限  ARGV[2]=租约ID  ARGV[3]=租约有效毫秒数
+LEASE_SCRIPT = """
+redis.replicate_commands()
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[3]))
+return 1
+"""
+
+
+def bucket_shape(rpm: int, burst: Optional[float] = None) -> tuple[int, float]:
+    """RPM对应的令牌桶（容量, 每秒补充令牌数）：容量 + 60秒补充量 = RPM"""
+    burst = settings.rate_limit_burst if burst is None else burst
+    capacity = max(1, int(rpm * burst))
+    return capacity, max(rpm - capacity, 1) / 60
+
+
+class DistributedLimiter:
+    """Redis令牌桶 + 并发租约（同步，Redis错误原样抛出由调用方降级）"""
+
+    def __init__(
+        self,
+        client: Optional[redis.Redis] = None,
+        burst: Optional[float] = None,
+        lease_ttl: Optional[float] = None,
+        key_prefix: str = LIMITER_KEY_PREFIX
+    ):
+        """初始化
+
+        Args:
+            client: Redis客户端（默认共用连接池）
+            burst: 令牌桶容量占RPM的比例（默认settings.rate_limit_burst）
+            lease_ttl: 并发租约有效秒数（默认settings.rate_limit_lease_ttl，应大于单次调用的最长耗时）
+            key_prefix: 键前缀（测试用）
+        """
+        self.redis_client = client or redis_pool.client
+        self.burst = settings.rate_limit_burst if burst is None else burst
+        self.lease_ttl = settings.rate_limit_lease_ttl if lease_ttl is None else lease_ttl
+        self.key_prefix = key_prefix
+        self._take = self.redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._lease = self.redis_client.register_script(LEASE_SCRIPT)
+
+    def _rpm_key(self, model: str) -> str:
+        return f"{self.key_prefix}{model}:rpm"
+
+    def _lease_key(self, model: str) -> str:
+        return f"{self.key_prefix}{model}:leases"
+
+    def take(self, model: str, rpm: int) -> tuple[bool, float]:
+        """取一个RPM令牌，返回(是否放行, 需等待的秒数)"""
+        capacity, rate = bucket_shape(rpm, self.burst)
+        allowed, wait_ms = self._take(keys=[self._rpm_key(model)], args=[capacity, rate / 1000, 1])
+        return bool(allowed), int(wait_ms) / 1000
+
+    def acquire_lease(self, model: str, limit: int) -> Optional[str]:
+        """获取并发租约，返回租约ID；已达上限返回None"""
+        lease_id = uuid.uuid4().hex
+        acquired = self._lease(
+            keys=[self._lease_key(model)],
+            args=[limit, lease_id, math.ceil(self.lease_ttl * 1000)]
+        )
+        return lease_id if acquired else None
+
+    def release_lease(self, model: str, lease_id: str):
+        """归还并发租约"""
+        self.redis_client.zrem(self._lease_key(model), lease_id)
+
+    def status(self, model: str, rpm: Optional[int]) -> dict:
+        """全局在用租约数与令牌桶剩余令牌（按本机时钟估算补充量）"""
+        now_ms = time.time() * 1000
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.zcount(self._lease_key(model), now_ms, "+inf")
+        pipeline.hmget(self._rpm_key(model), "tokens", "ts")
+        leases, (tokens, ts) = pipeline.execute()
+
+        status = {"leases": leases}
+        if rpm:
+            capacity, rate = bucket_shape(rpm, self.burst)
+            if tokens is None or ts is None:
+                status["tokens"] = capacity
+            else:
+                refill = max(0.0, now_ms - float(ts)) * rate / 1000
+                status["tokens"] = round(min(capacity, float(tokens) + refill), 2)
+            status["capacity"] = capacity
+        return status
@@ -1,9 +1,20 @@
-"""负载均衡器 - 结合RateLimiter和TaskClassifier"""
+"""负载均衡器 - 结合RateLimiter和TaskClassifier
+
+模型API经ProviderClientPool按模型复用keep-alive连接（异步，不阻塞事件循环）；
+call_api为同步包装，在后台事件循环线程中执行，连续调用同样复用连接。
+settings.hedge_task_types中的任务类型启用对冲请求（首选模型超过p95未返回时并行请求下一个模型）。
+每次调用的延迟与成败记入ModelRouter，TaskClassifier据此动态调整候选模型顺序。
+"""
+import asyncio
+import threading
+import time
 from typing import Optional, Dict, Any
+from .config import settings
+from .model_stats import get_model_stats
 from .multi_model_limiter import MultiModelRateLimiter, get_rate_limiter
+from .provider_clients import ProviderClientPool
 from .task_classifier import TaskClassifier, get_task_classifier
 import json
-import requests
 
 
 class LoadBalancer:
@@ -13,15 +24,28 @@ class LoadBalancer:
     整合：
     - TaskClassifier: 根据任务特征选择最优模型
     - MultiModelRateLimiter: 检查并发和RPM限制
+    - ProviderClientPool: 按模型复用HTTP连接
     """
 
-    def __init__(self):
+    def __init__(self, api_configs: Optional[Dict] = None, clients: Optional[ProviderClientPool] = None):
+        """
+        Args:
+            api_configs: 模型API配置（默认读取settings.api_config_path）
+            clients: HTTP连接池（默认新建）
+        """
         # 初始化组件
         self.limiter = get_rate_limiter()
         self.classifier = get_task_classifier()
+        self.clients = clients or ProviderClientPool()
+        self.model_stats = get_model_stats()
+        self.router = self.classifier.router
 
         # API配置
-        self.api_configs = self._load_api_configs()
+        self.api_configs = api_configs or self._load_api_configs()
+
+        # 同步调用使用的后台事件循环（延迟创建）
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_lock = threading.Lock()
 
         # 统计信息
         self.request_stats = {
@@ -33,7 +57,10 @@ class LoadBalancer:
                 "nvidia2": 0,
                 "siliconflow": 0
             },
-            "failures": 0
+            "failures": 0,
+            # 发出的对冲请求数，及对冲请求先返回（首选模型落败）的次数
+            "hedged": 0,
+            "hedge_wins": 0
         }
 
         print("="*60)
@@ -42,17 +69,40 @@ class LoadBalancer:
 
     def _load_api_configs(self) -> Dict:
         """加载API配置"""
-        config_path = r'C:\Users\10952\.openclaw\workspace\openclaw_async_architecture\API_CONFIG_FINAL.json'
-        with open(config_path, 'r', encoding='utf-8') as f:
+        with open(settings.api_config_path, 'r', encoding='utf-8') as f:
             return json.load(f)['api_configs']
 
-    def call_api(self, prompt: str, preferred_models: Optional[list] = None) -> Dict[str, Any]:
+    def call_api(self, prompt: str, preferred_models: Optional[list] = None, hedge: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        智能调用API（同步包装，不能在事件循环线程内调用，异步代码请用call_api_async）
+
+        Args:
+            prompt: 用户提示词
+            preferred_models: 用户优先级（可选）
+            hedge: 是否对冲请求（默认按settings.hedge_task_types）
+
+        Returns:
+            同call_api_async
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.call_api_async(prompt, preferred_models, hedge),
+            self._get_sync_loop()
+        )
+        return future.result()
+
+    async def call_api_async(
+        self,
+        prompt: str,
+        preferred_models: Optional[list] = None,
+        hedge: Optional[bool] = None
+    ) -> Dict[str, Any]:
         """
         智能调用API（自动选择最优模型）
 
         Args:
             prompt: 用户提示词
             preferred_models: 用户优先级（可选）
+            hedge: 是否对冲请求（默认按settings.hedge_task_types判断任务类型）
 
         Returns:
             {
@@ -64,39 +114,20 @@ class LoadBalancer:
             }
         """
         # 1. 任务分类
-        models_to_try = self.classifier.recommend_model(prompt, preferred_models)
-
-        # 2. 依次尝试模型
-        for model_name in models_to_try:
-            print(f"\n[LoadBalancer] 尝试模型: {model_name}")
-
-            # 检查并发和RPM限制
-            if not self.limiter.acquire_concurrency(model_name):
-                print(f"  ➜ 并发限制，跳过 {model_name}")
-                continue
-
-            if not self.limiter.check_rpm_limit(model_name):
-                self.limiter.release_concurrency(model_name)
-                print(f"  ➜ RPM限制，跳过 {model_name}")
-                continue
-
-            # 3. 调用API
-            result = self._call_single_model(model_name, prompt)
-
-            if result['success']:
-                # 统计
-                self.request_stats["total"] += 1
-                self.request_stats["by_model"][model_name] += 1
-
-                print(f"  ✅ {model_name} 调用成功！")
-                return result
-            else:
-                self.limiter.release_concurrency(model_name)
-                self.request_stats["failures"] += 1
-                print(f"  ❌ {model_name} 调用失败: {result.get('error')}")
+        task_type, models_to_try = self.classifier.recommend(prompt, preferred_models)
+        candidates = [model_name for model_name in models_to_try if model_name in self.api_configs]
+        if hedge is None:
+            hedge = task_type.value in settings.hedge_task_types
+
+        # 2. 依次尝试模型（对冲：首选模型超过其p95仍未返回时，并行请求下一个模型）
+        if hedge:
+            result = await self._call_hedged(candidates, prompt)
+        else:
+            result = await self._call_in_order(candidates, prompt)
+        if result is not None:
+            return result
 
         # 所有模型都失败
-        self.limiter.release_concurrency(models_to_try[0])  # 清理
         self.request_stats["failures"] += 1
 
         return {
@@ -107,28 +138,127 @@ class LoadBalancer:
             "error": "所有模型都不可用"
         }
 
-    def _call_single_model(self, model_name: str, prompt: str) -> Dict[str, Any]:
-        """调用单个模型API"""
-        import time
+    async def _call_in_order(self, candidates: list, prompt: str) -> Optional[Dict[str, Any]]:
+        """依次尝试，失败后换下一个模型"""
+        for model_name in candidates:
+            if not await self._acquire(model_name):
+                continue
+            result = await self._attempt(model_name, prompt)
+            if result['success']:
+                return result
+        return None
+
+    async def _call_hedged(self, candidates: list, prompt: str) -> Optional[Dict[str, Any]]:
+        """
+        对冲请求：最近发出的请求超过该模型的p95仍未返回时，向下一个有名额的模型发同样的请求，
+        取先成功的结果并取消其余请求（同时在途不超过settings.hedge_max_requests个）。
+        请求失败时立即换下一个模型（同_call_in_order）。
+        """
+        pending = list(candidates)
+        running: Dict[asyncio.Task, str] = {}
+        hedged_models = set()
+        last_model = None
+
+        async def launch() -> bool:
+            nonlocal last_model
+            while pending:
+                model_name = pending.pop(0)
+                if await self._acquire(model_name):
+                    running[asyncio.create_task(self._attempt(model_name, prompt))] = model_name
+                    last_model = model_name
+                    return True
+            return False
+
+        await launch()
+        try:
+            while running:
+                can_hedge = bool(pending) and len(running) < settings.hedge_max_requests
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self._hedge_delay(last_model) if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    if await launch():
+                        hedged_models.add(last_model)
+                        self.request_stats["hedged"] += 1
+                        print(f"  ➜ 超过p95未返回，对冲请求 {last_model}")
+                    continue
+
+                for finished in done:
+                    model_name = running.pop(finished)
+                    result = finished.result()
+                    if result['success']:
+                        if model_name in hedged_models:
+                            self.request_stats["hedge_wins"] += 1
+                        return result
+
+                if not running:
+                    await launch()
+        finally:
+            for loser in running:
+                loser.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return None
+
+    def _hedge_delay(self, model_name: str) -> float:
+        """发出对冲请求前的等待：该模型最近的p95延迟（样本不足时用settings.hedge_default_delay）"""
+        p95 = self.model_stats.p95(model_name)
+        return max(settings.hedge_min_delay, p95 if p95 is not None else settings.hedge_default_delay)
+
+    async def _acquire(self, model_name: str) -> bool:
+        """占用模型的并发名额与RPM配额（分布式限流的Redis调用不阻塞事件循环）"""
+        print(f"\n[LoadBalancer] 尝试模型: {model_name}")
+
+        # 检查并发和RPM限制
+        if not await self.limiter.acquire_concurrency_async(model_name):
+            print(f"  ➜ 并发限制，跳过 {model_name}")
+            return False
+
+        if not await self.limiter.check_rpm_limit_async(model_name):
+            await self.limiter.release_concurrency_async(model_name)
+            print(f"  ➜ RPM限制，跳过 {model_name}")
+            return False
+
+        return True
+
+    async def _attempt(self, model_name: str, prompt: str) -> Dict[str, Any]:
+        """调用已占用名额的模型（完成或被取消时归还并发名额）"""
+        try:
+            # 3. 调用API
+            result = await self._call_single_model(model_name, prompt)
+        finally:
+            await self.limiter.release_concurrency_async(model_name)
 
+        self.model_stats.record(model_name, result['latency'], result['success'])
+        self.router.record(model_name, result['latency'], result['success'])
+        if result['success']:
+            # 统计
+            self.request_stats["total"] += 1
+            self.request_stats["by_model"][model_name] = self.request_stats["by_model"].get(model_name, 0) + 1
+
+            print(f"  ✅ {model_name} 调用成功！")
+        else:
+            self.request_stats["failures"] += 1
+            print(f"  ❌ {model_name} 调用失败: {result.get('error')}")
+        return result
+
+    async def _call_single_model(self, model_name: str, prompt: str) -> Dict[str, Any]:
+        """调用单个模型API"""
         config = self.api_configs[model_name]
 
         # Embeddings API（特殊处理）
         if model_name == "siliconflow":
-            return self._call_embedding_api(config, prompt)
+            return await self._call_embedding_api(model_name, config, prompt)
 
         # Chat API
-        return self._call_chat_api(config, prompt)
-
-    def _call_chat_api(self, config: Dict, prompt: str) -> Dict[str, Any]:
-        """调用聊天API"""
-        import time
-
-        headers = {
-            "Authorization": f"Bearer {config['api_key']}",
-            "Content-Type": "application/json"
-        }
+        return await self._call_chat_api(model_name, config, prompt)
 
+    def _chat_payload(self, config: Dict, prompt: str) -> Dict[str, Any]:
+        """聊天API请求体"""
         payload = {
             "model": config['model'],
             "messages": [{"role": "user", "content": prompt}],
@@ -148,87 +278,54 @@ class LoadBalancer:
         elif config['provider'] == 'zhipu' and config.get('enable_thinking'):
             payload['thinking'] = {"type": "enabled"}
 
-        try:
-            start_time = time.time()
-
-            response = requests.post(
-                config['url'],
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-
-            latency = time.time() - start_time
+        return payload
 
-            if response.status_code == 200:
-                data = response.json()
-                content = data['choices'][0]['message']['content']
-                usage = data.get('usage', {})
+    async def _call_chat_api(self, model_name: str, config: Dict, prompt: str) -> Dict[str, Any]:
+        """调用聊天API"""
+        return await self._post(model_name, config, self._chat_payload(config, prompt), self._parse_chat)
 
-                return {
-                    "success": True,
-                    "content": content,
-                    "model": config['model'],
-                    "latency": latency,
-                    "usage": usage
-                }
-            else:
-                return {
-                    "success": False,
-                    "content": None,
-                    "model": None,
-                    "latency": latency,
-                    "error": f"HTTP {response.status_code}"
-                }
+    async def _call_embedding_api(self, model_name: str, config: Dict, text: str) -> Dict[str, Any]:
+        """调用Embedding API"""
+        payload = {
+            "model": config['model'],
+            "input": text,
+            "encoding_format": "float"
+        }
+        return await self._post(model_name, config, payload, self._parse_embedding)
 
-        except Exception as e:
-            return {
-                "success": False,
-                "content": None,
-                "model": None,
-                "latency": 0,
-                "error": str(e)
-            }
+    @staticmethod
+    def _parse_chat(data: Dict) -> tuple:
+        return data['choices'][0]['message']['content'], data.get('usage', {})
 
-    def _call_embedding_api(self, config: Dict, text: str) -> Dict[str, Any]:
-        """调用Embedding API"""
-        import time
+    @staticmethod
+    def _parse_embedding(data: Dict) -> tuple:
+        embedding = data['data'][0]['embedding']
+        return embedding, {"dimensions": len(embedding)}
 
+    async def _post(self, model_name: str, config: Dict, payload: Dict, parse) -> Dict[str, Any]:
+        """经连接池发送请求并解析响应"""
         headers = {
             "Authorization": f"Bearer {config['api_key']}",
             "Content-Type": "application/json"
         }
-
-        payload = {
-            "model": config['model'],
-            "input": text,
-            "encoding_format": "float"
-        }
+        client = self.clients.get(model_name, config.get('max_concurrent'))
 
         try:
-            start_time = time.time()
+            start_time = time.perf_counter()
 
-            response = requests.post(
-                config['url'],
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            response = await client.post(config['url'], headers=headers, json=payload)
 
-            latency = time.time() - start_time
+            latency = time.perf_counter() - start_time
 
             if response.status_code == 200:
-                data = response.json()
-                embedding = data['data'][0]['embedding']
+                content, usage = parse(response.json())
 
                 return {
                     "success": True,
-                    "content": embedding,
+                    "content": content,
                     "model": config['model'],
                     "latency": latency,
-                    "usage": {
-                        "dimensions": len(embedding)
-                    }
+                    "usage": usage
                 }
             else:
                 return {
@@ -245,14 +342,32 @@ class LoadBalancer:
                 "content": None,
                 "model": None,
                 "latency": 0,
-                "error": str(e)
+                # 异常类型（如ReadTimeout / ConnectError）供重试判断，httpx的部分异常消息为空
+                "error": f"{type(e).__name__}: {e}"
             }
 
+    def _get_sync_loop(self) -> asyncio.AbstractEventLoop:
+        """同步调用使用的后台事件循环（守护线程，进程内复用连接）"""
+        with self._sync_lock:
+            if self._sync_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="load-balancer-loop", daemon=True).start()
+                self._sync_loop = loop
+            return self._sync_loop
+
+    async def close(self):
+        """关闭当前事件循环内的HTTP连接"""
+        await self.clients.close()
+
     def get_stats(self) -> Dict:
         """获取统计信息"""
         return {
             "requests": self.request_stats,
-            "limiter_status": self.limiter.get_status()
+            "limiter_status": self.limiter.get_status(),
+            "limiter_backend": self.limiter.backend,
+            "model_latency": self.model_stats.get_stats(),
+            "routing": self.router.get_stats(),
+            "http_clients": self.clients.stats()
         }
 
 
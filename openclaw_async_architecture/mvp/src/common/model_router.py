@@ -0,0 +1,186 @@
+"""自适应模型路由 - 按各模型的EWMA延迟、首字延迟与错误率动态排序候选模型
+
+- LoadBalancer每次调用记录延迟与成功/失败；流式调用由PerformanceMonitorContext额外记录首字延迟（TTFT）
+- 排序代价 = 延迟EWMA / (1 - 错误率EWMA)，即计入失败重试后的期望耗时；
+  实时任务（settings.routing_ttft_task_types）有首字延迟样本时按首字延迟计
+- 样本不足settings.routing_min_samples的模型保持原有位置（TaskClassifier的优先级作为先验）
+- 以settings.routing_exploration的概率把一个非首选模型提到最前，让变慢后被降级的模型有机会重新采样
+
+各进程的统计随Worker指标写入Redis（openclaw:routing_stats:{name}），Gateway的/routing/stats汇总。
+"""
+import json
+import random
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from .config import settings
+
+
+ROUTING_KEY_PREFIX = "openclaw:routing_stats:"
+
+
+class ModelHealth:
+    """单个模型的EWMA统计"""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.ttft: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.ttft_samples = 0
+        self.updated_at = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "ttft": round(self.ttft, 3) if self.ttft is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "samples": self.samples,
+            "ttft_samples": self.ttft_samples,
+            "updated_at": self.updated_at
+        }
+
+
+def _ewma(previous: Optional[float], value: float, alpha: float) -> float:
+    return value if previous is None else alpha * value + (1 - alpha) * previous
+
+
+class ModelRouter:
+    """按实测延迟与错误率排序候选模型（进程内，线程安全）"""
+
+    def __init__(
+        self,
+        alpha: Optional[float] = None,
+        exploration: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        rng: Optional[random.Random] = None
+    ):
+        """初始化
+
+        Args:
+            alpha: EWMA平滑系数（默认settings.routing_ewma_alpha，越大越偏重最近的调用）
+            exploration: 探索概率（默认settings.routing_exploration）
+            min_samples: 参与排序的最少样本数（默认settings.routing_min_samples）
+            rng: 随机数生成器（测试用）
+        """
+        self.alpha = settings.routing_ewma_alpha if alpha is None else alpha
+        self.exploration = settings.routing_exploration if exploration is None else exploration
+        self.min_samples = settings.routing_min_samples if min_samples is None else min_samples
+        self.rng = rng or random.Random()
+        self._models: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+        self.explored = 0
+        self.reordered = 0
+
+    def record(self, model: str, latency: float, success: bool = True):
+        """记录一次调用：错误率按成功0/失败1做EWMA，仅成功调用的延迟进入延迟EWMA"""
+        with self._lock:
+            health = self._models.setdefault(model, ModelHealth())
+            health.error_rate = _ewma(health.error_rate if health.samples else None, 0.0 if success else 1.0, self.alpha)
+            if success:
+                health.latency = _ewma(health.latency, latency, self.alpha)
+            health.samples += 1
+            health.updated_at = time.time()
+
+    def record_ttft(self, model: str, ttft: float):
+        """记录一次流式调用的首字延迟（秒）"""
+        with self._lock:
+            health = self._models.setdefault(model, ModelHealth())
+            health.ttft = _ewma(health.ttft, ttft, self.alpha)
+            health.ttft_samples += 1
+            health.updated_at = time.time()
+
+    def cost(self, model: str, task_type: Optional[str] = None) -> Optional[float]:
+        """模型的期望耗时（秒）；样本不足时返回None
+
+        从未成功过的模型按settings.provider_timeout计延迟。
+        """
+        with self._lock:
+            health = self._models.get(model)
+            if health is None or health.samples < self.min_samples:
+                return None
+            latency = health.latency if health.latency is not None else settings.provider_timeout
+            if task_type in settings.routing_ttft_task_types and health.ttft_samples >= self.min_samples:
+                latency = health.ttft
+            return latency / max(1.0 - health.error_rate, 0.05)
+
+    def rank(self, models: Iterable[str], task_type: Optional[str] = None) -> list:
+        """按期望耗时重排候选模型
+
+        有足够样本的模型在它们原来占据的位置之间按代价从低到高重排，样本不足的模型位置不变；
+        以exploration概率再把一个非首选模型提到最前。
+        """
+        models = list(models)
+        costs = {model: self.cost(model, task_type) for model in models}
+        measured = [model for model in models if costs[model] is not None]
+        ranked = sorted(measured, key=lambda model: costs[model])
+        ordered = iter(ranked)
+        result = [next(ordered) if costs[model] is not None else model for model in models]
+        if result != models:
+            self.reordered += 1
+
+        if len(result) > 1 and self.exploration > 0 and self.rng.random() < self.exploration:
+            result.insert(0, result.pop(self.rng.randrange(1, len(result))))
+            self.explored += 1
+        return result
+
+    def snapshot(self) -> Dict[str, dict]:
+        """各模型的EWMA统计"""
+        with self._lock:
+            return {model: health.to_dict() for model, health in self._models.items()}
+
+    def get_stats(self) -> dict:
+        """路由统计（/routing/stats）"""
+        return {
+            "alpha": self.alpha,
+            "exploration": self.exploration,
+            "min_samples": self.min_samples,
+            "reordered": self.reordered,
+            "explored": self.explored,
+            "models": self.snapshot()
+        }
+
+    def to_redis_mapping(self) -> Dict[str, str]:
+        """写入Redis哈希的字段（模型 → JSON）"""
+        return {model: json.dumps(stats) for model, stats in self.snapshot().items()}
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, dict]]) -> Dict[str, dict]:
+    """汇总多个进程的统计：EWMA按样本数加权平均，样本数相加"""
+    merged: Dict[str, dict] = {}
+    for snapshot in snapshots:
+        for model, stats in snapshot.items():
+            total = merged.setdefault(model, {
+                "latency": 0.0, "ttft": 0.0, "error_rate": 0.0,
+                "samples": 0, "ttft_samples": 0, "updated_at": 0.0,
+                "_latency_weight": 0, "_ttft_weight": 0
+            })
+            samples, ttft_samples = stats.get("samples", 0), stats.get("ttft_samples", 0)
+            if stats.get("latency") is not None:
+                total["latency"] += stats["latency"] * samples
+                total["_latency_weight"] += samples
+            if stats.get("ttft") is not None:
+                total["ttft"] += stats["ttft"] * ttft_samples
+                total["_ttft_weight"] += ttft_samples
+            total["error_rate"] += stats.get("error_rate", 0.0) * samples
+            total["samples"] += samples
+            total["ttft_samples"] += ttft_samples
+            total["updated_at"] = max(total["updated_at"], stats.get("updated_at", 0.0))
+
+    for total in merged.values():
+        latency_weight, ttft_weight = total.pop("_latency_weight"), total.pop("_ttft_weight")
+        total["latency"] = round(total["latency"] / latency_weight, 3) if latency_weight else None
+        total["ttft"] = round(total["ttft"] / ttft_weight, 3) if ttft_weight else None
+        total["error_rate"] = round(total["error_rate"] / total["samples"], 3) if total["samples"] else 0.0
+    return merged
+
+
+# 全局实例
+model_router_instance = None
+
+def get_model_router():
+    """获取模型路由实例"""
+    global model_router_instance
+    if model_router_instance is None:
+        model_router_instance = ModelRouter()
+    return model_router_instance
@@ -0,0 +1,66 @@
+"""模型调用统计 - 按模型的滚动延迟窗口（LoadBalancer记录，对冲请求按p95决定等待时间）"""
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+# 每个模型保留的最近延迟样本数
+WINDOW_SIZE = 200
+# 样本少于该数时不给出分位数（调用方使用默认值）
+MIN_SAMPLES = 20
+
+
+class ModelStats:
+    """按模型的调用统计（进程内）"""
+
+    def __init__(self, window_size: int = WINDOW_SIZE, min_samples: int = MIN_SAMPLES):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._latencies: Dict[str, deque] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, latency: float, success: bool = True):
+        """记录一次调用（仅成功调用的延迟进入窗口）"""
+        with self._lock:
+            counts = self._counts.setdefault(model, {"success": 0, "failure": 0})
+            counts["success" if success else "failure"] += 1
+            if success:
+                self._latencies.setdefault(model, deque(maxlen=self.window_size)).append(latency)
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        """最近窗口内延迟的q分位（0~100）；样本不足时返回None"""
+        with self._lock:
+            samples = sorted(self._latencies.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(q / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def p95(self, model: str) -> Optional[float]:
+        return self.percentile(model, 95)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """各模型的调用次数与延迟分位（秒）"""
+        stats = {}
+        for model in list(self._counts):
+            p50, p95 = self.percentile(model, 50), self.percentile(model, 95)
+            stats[model] = {
+                **self._counts[model],
+                "samples": len(self._latencies.get(model, ())),
+                "p50": round(p50, 3) if p50 is not None else None,
+                "p95": round(p95, 3) if p95 is not None else None
+            }
+        return stats
+
+
+# 全局实例
+model_stats_instance = None
+
+def get_model_stats():
+    """获取模型统计实例"""
+    global model_stats_instance
+    if model_stats_instance is None:
+        model_stats_instance = ModelStats()
+    return model_stats_instance
@@ -1,7 +1,8 @@
 """数据模型"""
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
+import time
 import uuid
 
 
@@ -20,6 +21,32 @@ class Task(BaseModel):
 class TaskRequest(BaseModel):
     """任务请求"""
     content: str
+    task_type: str = "v1"  # v1 / chat / command（Worker按类型路由与限流）
+    # 优先级车道（priority队列后端）；不指定时由TaskClassifier判定，批量提交默认bulk
+    priority: Optional[Literal["realtime", "simple", "complex", "bulk"]] = None
+    # 延迟执行：指定时间（带时区；不带时区按本地时间）或延迟秒数，二者都给时以run_at为准
+    run_at: Optional[datetime] = None
+    delay_seconds: Optional[float] = Field(None, ge=0)
+
+    def scheduled_timestamp(self) -> Optional[float]:
+        """计划执行的时间戳（未指定延迟时为None）"""
+        if self.run_at is not None:
+            return self.run_at.timestamp()
+        if self.delay_seconds:
+            return time.time() + self.delay_seconds
+        return None
+
+
+class TaskBatchRequest(BaseModel):
+    """批量任务请求"""
+    tasks: List[TaskRequest] = Field(..., min_length=1)
+
+
+class TaskBatchResponse(BaseModel):
+    """批量任务响应（task_ids与请求顺序一致）"""
+    task_ids: List[str]
+    count: int
+    message: str
 
 
 class TaskResponse(BaseModel):
@@ -27,6 +54,9 @@ class TaskResponse(BaseModel):
     task_id: str
     status: str
     message: str
+    # 重复提交命中去重时为True，task_id为已存在的任务（已完成时附带结果）
+    deduplicated: bool = False
+    result: Optional[str] = None
 
 
 class TaskResult(BaseModel):
@@ -1,13 +1,21 @@
-"""多模型速率限制器 - 支持5个模型的并发和RPM控制"""
+"""多模型速率限制器 - 支持5个模型的并发和RPM控制
+
+settings.rate_limit_backend=redis（默认）时并发与RPM由Redis在所有进程间共享（见distributed_limiter），
+Redis不可用时退回进程内的信号量与请求时间窗口，settings.rate_limit_retry_interval秒后再试Redis。
+异步代码（LoadBalancer）使用*_async方法：走Redis时在线程池中执行，不阻塞事件循环。
+"""
 import asyncio
 import time
 import threading
 from typing import Dict, Optional
 from collections import deque
 import json
+import redis
+from .config import settings
+from .distributed_limiter import DistributedLimiter
 
 # 加载API配置
-API_CONFIG_PATH = r'C:\Users\10952\.openclaw\workspace\openclaw_async_architecture\API_CONFIG_FINAL.json'
+API_CONFIG_PATH = settings.api_config_path
 
 with open(API_CONFIG_PATH, 'r', encoding='utf-8') as f:
     API_CONFIG = json.load(f)['api_configs']
@@ -25,7 +33,11 @@ class MultiModelRateLimiter:
     - SiliconFlow: 5 RPM（embeddings）
     """
 
-    def __init__(self):
+    def __init__(self, distributed: Optional[DistributedLimiter] = None):
+        """
+        Args:
+            distributed: 跨进程限制器（默认settings.rate_limit_backend为redis时新建，local时不使用）
+        """
         # 并发限制（每个模型独立控制）
         self.concurrency_limits = {
             "zhipu": API_CONFIG['zhipu']['max_concurrent'],
@@ -65,6 +77,16 @@ class MultiModelRateLimiter:
         # RPM锁
         self.rpm_lock = threading.Lock()
 
+        # 跨进程限制（Redis）；本进程持有的并发名额（Redis租约ID，本地信号量名额记为None）
+        if distributed is None and settings.rate_limit_backend == "redis":
+            distributed = DistributedLimiter()
+        self.distributed = distributed
+        self.leases = {model: [] for model in self.concurrency_limits.keys()}
+        # 异步方法经线程池调用，名额计数与租约列表加锁
+        self._count_lock = threading.Lock()
+        self._redis_retry_at = 0.0
+        self.fallbacks = 0
+
         print("="*60)
         print("多模型速率限制器初始化 [OK]")
         print("="*60)
@@ -74,8 +96,24 @@ class MultiModelRateLimiter:
         print("\n[限制] RPM限制：")
         for model, limit in self.rpm_limits.items():
             print(f"  {model:12s}: {limit if limit else '无限制'} RPM")
+        print(f"\n[后端] {'Redis（跨进程共享）' if self.distributed else '进程内'}")
         print("="*60)
 
+    def _use_redis(self) -> bool:
+        """是否走Redis（Redis出错后的重试间隔内使用进程内限制）"""
+        return self.distributed is not None and time.monotonic() >= self._redis_retry_at
+
+    @property
+    def backend(self) -> str:
+        """当前生效的限制后端：redis / local"""
+        return "redis" if self._use_redis() else "local"
+
+    def _redis_failed(self, error: Exception):
+        """Redis不可用：暂时退回进程内限制"""
+        self._redis_retry_at = time.monotonic() + settings.rate_limit_retry_interval
+        self.fallbacks += 1
+        print(f"[WARN] 分布式限流不可用，{settings.rate_limit_retry_interval}秒内使用进程内限制: {error}")
+
     def acquire_concurrency(self, model: str) -> bool:
         """
         获取并发资源
@@ -94,11 +132,29 @@ class MultiModelRateLimiter:
             print(f"[WARN] 未知模型: {model}")
             return False
 
+        limit = self.concurrency_limits[model]
+        if self._use_redis():
+            try:
+                lease_id = self.distributed.acquire_lease(model, limit)
+            except redis.RedisError as e:
+                self._redis_failed(e)
+            else:
+                if lease_id is None:
+                    print(f"[Concurrency] {model}: 达到全局上限 {limit}")
+                    return False
+                with self._count_lock:
+                    self.leases[model].append(lease_id)
+                    self.current_concurrency[model] += 1
+                print(f"[Concurrency] {model}: 获取租约成功 (本进程: {self.current_concurrency[model]}, 全局上限: {limit})")
+                return True
+
         # 尝试获取并发锁（非阻塞）
         acquired = self.concurrency_locks[model].acquire(blocking=False)
 
         if acquired:
-            self.current_concurrency[model] += 1
+            with self._count_lock:
+                self.leases[model].append(None)
+                self.current_concurrency[model] += 1
             print(f"[Concurrency] {model}: 获取成功 (当前: {self.current_concurrency[model]}/{self.concurrency_limits[model]})")
         else:
             print(f"[Concurrency] {model}: 达到上限 {self.concurrency_limits[model]}")
@@ -110,10 +166,50 @@ class MultiModelRateLimiter:
         if model not in self.concurrency_locks:
             return
 
-        if self.current_concurrency[model] > 0:
+        with self._count_lock:
+            if self.current_concurrency[model] <= 0:
+                return
             self.current_concurrency[model] -= 1
+            lease_id = self.leases[model].pop()
+
+        if lease_id is None:
             self.concurrency_locks[model].release()
-            print(f"[Concurrency] {model}: 释放 (当前: {self.current_concurrency[model]}/{self.concurrency_limits[model]})")
+        else:
+            try:
+                self.distributed.release_lease(model, lease_id)
+            except redis.RedisError as e:
+                print(f"[WARN] 归还{model}租约失败（{settings.rate_limit_lease_ttl}秒后自动过期）: {e}")
+        print(f"[Concurrency] {model}: 释放 (当前: {self.current_concurrency[model]}/{self.concurrency_limits[model]})")
+
+    async def acquire_concurrency_async(self, model: str) -> bool:
+        """异步版acquire_concurrency（走Redis时在线程池执行）"""
+        if not self._use_redis():
+            return self.acquire_concurrency(model)
+
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.acquire_concurrency, model))
+        try:
+            return await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # 调用方被取消时线程仍会完成获取：拿到名额后立即归还，避免泄漏
+            acquiring.add_done_callback(lambda future: self._release_if_acquired(future, model))
+            raise
+
+    def _release_if_acquired(self, future: asyncio.Future, model: str):
+        if not future.cancelled() and future.exception() is None and future.result():
+            asyncio.get_running_loop().run_in_executor(None, self.release_concurrency, model)
+
+    async def release_concurrency_async(self, model: str):
+        """异步版release_concurrency（可能持有Redis租约时在线程池执行）"""
+        if self.distributed is not None:
+            await asyncio.to_thread(self.release_concurrency, model)
+        else:
+            self.release_concurrency(model)
+
+    async def check_rpm_limit_async(self, model: str) -> bool:
+        """异步版check_rpm_limit（走Redis时在线程池执行）"""
+        if self._use_redis():
+            return await asyncio.to_thread(self.check_rpm_limit, model)
+        return self.check_rpm_limit(model)
 
     def check_rpm_limit(self, model: str) -> bool:
         """
@@ -134,6 +230,18 @@ class MultiModelRateLimiter:
         if rpm_limit is None:
             return True
 
+        if self._use_redis():
+            try:
+                allowed, wait = self.distributed.take(model, rpm_limit)
+            except redis.RedisError as e:
+                self._redis_failed(e)
+            else:
+                if allowed:
+                    print(f"[RPM] {model}: 取得令牌 ({rpm_limit} RPM，全局)")
+                else:
+                    print(f"[RPM] {model}: 达到全局限制 {rpm_limit} RPM（{wait:.1f}秒后有令牌）")
+                return allowed
+
         with self.rpm_lock:
             now = time.time()
             history = self.request_history[model]
@@ -180,6 +288,12 @@ class MultiModelRateLimiter:
     def get_status(self) -> Dict:
         """获取所有模型的状态"""
         status = {}
+        shared = {}
+        if self._use_redis():
+            try:
+                shared = {model: self.distributed.status(model, self.rpm_limits[model]) for model in self.concurrency_limits}
+            except redis.RedisError as e:
+                self._redis_failed(e)
 
         for model in self.concurrency_limits.keys():
             # 并发状态
@@ -208,6 +322,9 @@ class MultiModelRateLimiter:
                     "limit": rpm_limit
                 }
             }
+            # Redis后端：全局在用租约数、令牌桶剩余令牌
+            if model in shared:
+                status[model]["shared"] = shared[model]
 
         return status
 
@@ -0,0 +1,78 @@
+"""模型API连接池 - 每个模型（供应商账户）一个keep-alive的httpx.AsyncClient
+
+- 连接复用：同一模型的请求共用连接，省去每次DNS/TCP/TLS握手
+- 按模型限制连接数：max_connections取API配置的max_concurrent（未配置时settings.provider_max_connections）
+- HTTP/2：已安装h2时启用（pip install httpx[http2]），否则降级HTTP/1.1（Keep-Alive仍然有效）
+
+httpx.AsyncClient的连接绑定在创建它的事件循环上，因此按事件循环分别缓存；
+事件循环被回收后对应的客户端随之释放。
+"""
+import asyncio
+import weakref
+from typing import Optional
+import httpx
+from .config import settings
+
+
+class ProviderClientPool:
+    """按模型复用的httpx客户端"""
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None
+    ):
+        """初始化
+
+        Args:
+            timeout: 单次请求超时（秒，默认settings.provider_timeout）
+            max_connections: 未配置max_concurrent的模型的连接上限（默认settings.provider_max_connections）
+            keepalive_expiry: 空闲连接保留秒数（默认settings.provider_keepalive_expiry）
+            http2: 是否尝试HTTP/2（默认settings.provider_http2）
+        """
+        self.timeout = settings.provider_timeout if timeout is None else timeout
+        self.max_connections = max_connections or settings.provider_max_connections
+        self.keepalive_expiry = settings.provider_keepalive_expiry if keepalive_expiry is None else keepalive_expiry
+        self.http2 = settings.provider_http2 if http2 is None else http2
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def get(self, name: str, max_concurrent: Optional[int] = None) -> httpx.AsyncClient:
+        """获取模型的客户端（当前事件循环内首次使用时创建）"""
+        clients = self._clients.setdefault(asyncio.get_running_loop(), {})
+        client = clients.get(name)
+        if client is None or client.is_closed:
+            client = self._create_client(max_concurrent)
+            clients[name] = client
+        return client
+
+    def _create_client(self, max_concurrent: Optional[int]) -> httpx.AsyncClient:
+        limit = max_concurrent if isinstance(max_concurrent, int) and max_concurrent > 0 else self.max_connections
+        limits = httpx.Limits(
+            max_connections=limit,
+            max_keepalive_connections=limit,
+            keepalive_expiry=self.keepalive_expiry
+        )
+        if self.http2:
+            try:
+                return httpx.AsyncClient(timeout=self.timeout, limits=limits, http2=True)
+            except ImportError:
+                # h2未安装，降级到HTTP/1.1
+                self.http2 = False
+        return httpx.AsyncClient(timeout=self.timeout, limits=limits)
+
+    async def close(self):
+        """关闭当前事件循环内的全部客户端"""
+        clients = self._clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+    def stats(self) -> dict:
+        """已创建的客户端（按事件循环汇总）"""
+        return {
+            "http2": self.http2,
+            "clients": sorted({name for clients in self._clients.values() for name in clients})
+        }
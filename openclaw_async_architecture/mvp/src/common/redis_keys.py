@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Redis键批量操作 - SCAN游标遍历 + 分批UNLINK
+
+KEYS和DEL大量键都会在Redis主线程上一次做完，期间同一实例上的任务队列
+（BRPOP/XREADGROUP）全部排队等待。这里改为：
+- SCAN每次只遍历count个槽位，命令之间其他客户端照常执行
+- UNLINK只摘除键名，内存在后台线程回收
+"""
+from typing import Iterator
+import redis
+
+
+# 每次SCAN遍历的数量提示 / 每批UNLINK的键数
+SCAN_COUNT = 1000
+UNLINK_BATCH = 500
+
+
+def scan_keys(client: redis.Redis, pattern: str, count: int = SCAN_COUNT) -> Iterator[str]:
+    """按模式遍历键（SCAN游标，不阻塞Redis）"""
+    return client.scan_iter(match=pattern, count=count)
+
+
+def unlink_keys(client: redis.Redis, keys: list) -> int:
+    """删除一批键（UNLINK后台回收内存；Redis<4.0回退为DEL）"""
+    if not keys:
+        return 0
+    try:
+        return client.unlink(*keys)
+    except redis.ResponseError:
+        return client.delete(*keys)
+
+
+def unlink_matching(client: redis.Redis, pattern: str, batch_size: int = UNLINK_BATCH) -> int:
+    """删除所有匹配的键（边SCAN边分批UNLINK），返回删除数量"""
+    deleted = 0
+    batch = []
+    for key in scan_keys(client, pattern):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            deleted += unlink_keys(client, batch)
+            batch = []
+    deleted += unlink_keys(client, batch)
+    return deleted
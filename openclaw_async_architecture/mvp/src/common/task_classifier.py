@@ -2,6 +2,7 @@
 import re
 from typing import Literal, Optional
 from enum import Enum
+from .model_router import ModelRouter, get_model_router
 
 
 class TaskType(Enum):
@@ -17,16 +18,19 @@ class TaskClassifier:
     """
     任务分类器
 
-    根据任务特征自动选择最优模型：
-    - 实时交互 → 智谱（最快1.03秒）
+    根据任务特征自动选择最优模型（以下为初始优先级，实测样本足够后由ModelRouter按延迟/错误率重排）：
+    - 实时交互 → 智谱（实测最快1.03秒）
     - 大批量任务 → 混元（无RPM限制）
     - 复杂推理 → NVIDIA（思考模式）
     - 简单任务 → 负载均衡
     - Embeddings → SiliconFlow
     """
 
-    def __init__(self):
-        # 模型优先级配置
+    def __init__(self, router: Optional[ModelRouter] = None):
+        # 自适应路由（默认全局实例，LoadBalancer与流式调用向其记录实测数据）
+        self.router = router or get_model_router()
+
+        # 模型优先级配置（先验顺序）
         self.model_preferences = {
             TaskType.REALTIME: ["zhipu", "hunyuan", "nvidia2", "nvidia1"],
             TaskType.BULK: ["hunyuan", "nvidia2", "nvidia1"],
@@ -152,6 +156,15 @@ class TaskClassifier:
         Returns:
             推荐的模型列表
         """
+        return self.recommend(prompt, preferred_models)[1]
+
+    def recommend(self, prompt: str, preferred_models: Optional[list] = None) -> tuple:
+        """
+        推荐模型列表，并返回任务类型（LoadBalancer按类型决定是否对冲请求）
+
+        Returns:
+            (TaskType, 推荐的模型列表)
+        """
         # 分析任务
         analysis = self.analyze_task(prompt)
         task_type = analysis['task_type']
@@ -165,21 +178,17 @@ class TaskClassifier:
         print(f"  紧急度: {urgency}")
         print(f"  需要思考: {needs_thinking}")
 
-        # 基础优先级
-        base_models = self.model_preferences[task_type].copy()
+        # 基础优先级（按实测延迟/错误率重排）
+        base_models = self.router.rank(self.model_preferences[task_type], task_type.value)
 
-        # 特殊规则：思考模式必须选NVIDIA
+        # 特殊规则：思考模式必须选NVIDIA（NVIDIA之间按实测排序，混元兜底）
         if needs_thinking and task_type == TaskType.COMPLEX:
-            base_models = ["nvidia1", "nvidia2", "hunyuan"]
+            base_models = self.router.rank(["nvidia1", "nvidia2"], task_type.value) + ["hunyuan"]
 
         # 特殊规则：超大上下文（>200K）必须选混元
         if context_size == "large" and analysis['estimated_tokens'] > 200000:
             base_models = ["hunyuan"]
 
-        # 特殊规则：实时任务必须选智谱（最快）
-        if urgency == "high" and task_type == TaskType.REALTIME:
-            base_models = ["zhipu", "hunyuan", "nvidia2", "nvidia1"]
-
         # 用户优先级覆盖
         if preferred_models:
             # 将用户指定的模型移到列表前面
@@ -189,7 +198,7 @@ class TaskClassifier:
 
         print(f"  推荐模型: {' → '.join(base_models)}")
 
-        return base_models
+        return task_type, base_models
 
 
 # 全局实例
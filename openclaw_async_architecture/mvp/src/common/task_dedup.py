@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""重复提交去重 - Idempotency-Key与内容哈希窗口（Gateway使用）
+
+两种去重键都用Redis SET NX原子占位，值为首次提交的task_id：
+- Idempotency-Key: 客户端重试同一请求时携带相同的键，settings.idempotency_ttl内返回同一任务
+- 内容哈希（可选）: 相同task_type + content在settings.dedup_window秒内只执行一次；
+  已失败的任务不复用，允许重新提交
+
+多个Gateway进程共用同一Redis，去重与计数跨进程一致。
+"""
+import hashlib
+from typing import Optional
+import redis.asyncio as aioredis
+from .config import settings
+from .connection_pool import redis_pool
+
+
+IDEMPOTENCY_PREFIX = "dedup:idem:"
+CONTENT_PREFIX = "dedup:content:"
+# 去重计数（hash字段: idempotency / content）
+STATS_KEY = "dedup:stats"
+
+
+def content_hash(content: str, task_type: str = "v1") -> str:
+    """任务内容哈希（task_type不同视为不同任务）"""
+    return hashlib.sha256(f"{task_type}\0{content}".encode("utf-8")).hexdigest()
+
+
+class TaskDeduplicator:
+    """提交去重器"""
+
+    def __init__(
+        self,
+        client: Optional[aioredis.Redis] = None,
+        idempotency_ttl: Optional[int] = None,
+        window: Optional[int] = None
+    ):
+        """初始化
+
+        Args:
+            client: asyncio Redis客户端（默认共用连接池）
+            idempotency_ttl: Idempotency-Key保留秒数（默认settings.idempotency_ttl）
+            window: 内容哈希去重窗口秒数，0为关闭（默认settings.dedup_window）
+        """
+        self.redis_client = client or redis_pool.async_client
+        self.idempotency_ttl = settings.idempotency_ttl if idempotency_ttl is None else idempotency_ttl
+        self.window = settings.dedup_window if window is None else window
+
+    def keys_for(self, content: str, task_type: str, idempotency_key: Optional[str] = None) -> list[tuple[str, int, str]]:
+        """本次提交要占用的去重键 [(键, TTL, 类型), ...]"""
+        keys = []
+        if idempotency_key:
+            keys.append((f"{IDEMPOTENCY_PREFIX}{idempotency_key}", self.idempotency_ttl, "idempotency"))
+        if self.window > 0:
+            keys.append((f"{CONTENT_PREFIX}{content_hash(content, task_type)}", self.window, "content"))
+        return keys
+
+    async def claim(self, keys: list[tuple[str, int, str]], task_id: str) -> tuple[Optional[str], Optional[str]]:
+        """为task_id占用去重键
+
+        Returns:
+            (已存在的task_id, 去重类型)；全部占用成功时为(None, None)
+        """
+        claimed = []
+        for key, ttl, kind in keys:
+            if await self.redis_client.set(key, task_id, nx=True, ex=ttl):
+                claimed.append(key)
+                continue
+
+            existing = await self.redis_client.get(key)
+            if existing is None:
+                # 恰好过期，重新占用
+                await self.redis_client.set(key, task_id, ex=ttl)
+                claimed.append(key)
+                continue
+
+            # 命中：本次已占用的键改指向已存在的任务，后续重试直接命中
+            for other in claimed:
+                await self.redis_client.set(other, existing, keepttl=True)
+            return existing, kind
+
+        return None, None
+
+    async def replace(self, keys: list[tuple[str, int, str]], task_id: str):
+        """去重键改指向新任务（命中的任务已失败、需要重新执行时）"""
+        for key, ttl, _kind in keys:
+            await self.redis_client.set(key, task_id, ex=ttl)
+
+    async def release(self, keys: list[tuple[str, int, str]], task_id: str):
+        """释放占用（提交失败时，仅删除仍指向task_id的键）"""
+        for key, _ttl, _kind in keys:
+            if await self.redis_client.get(key) == task_id:
+                await self.redis_client.delete(key)
+
+    async def record_hit(self, kind: str):
+        """去重计数 +1"""
+        await self.redis_client.hincrby(STATS_KEY, kind, 1)
+
+    async def get_stats(self) -> dict:
+        """去重计数与配置"""
+        try:
+            counts = await self.redis_client.hgetall(STATS_KEY)
+        except Exception:
+            counts = {}
+        return {
+            "idempotency_hits": int(counts.get("idempotency", 0)),
+            "content_hits": int(counts.get("content", 0)),
+            "idempotency_ttl": self.idempotency_ttl,
+            "content_window": self.window
+        }
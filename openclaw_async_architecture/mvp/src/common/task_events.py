@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""任务状态事件 - Redis Pub/Sub通知（替代客户端轮询）"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Set
+from .connection_pool import redis_pool
+
+
+# 所有任务状态变更发布到同一频道，消息体携带task_id
+TASK_EVENTS_CHANNEL = "openclaw:task_events"
+
+# 终态（到达后不再变化）
+TERMINAL_STATUSES = {"completed", "failed"}
+
+
+def build_task_event(task) -> str:
+    """构建任务事件消息"""
+    return json.dumps({
+        "task_id": task.id,
+        "status": task.status,
+        "updated_at": task.updated_at.isoformat()
+    })
+
+
+class TaskEventHub:
+    """
+    任务事件分发器（Gateway进程内单例）
+
+    整个进程只占用一个Pub/Sub连接，收到事件后按task_id分发给本进程内
+    正在等待的请求（长轮询 / SSE），等待方数量不影响Redis连接数。
+    """
+
+    def __init__(self):
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str):
+        """订阅某个任务的事件
+
+        用法：
+            async with hub.subscribe(task_id) as events:
+                event = await events.get()
+        """
+        await self._ensure_reader()
+
+        events: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(task_id, set()).add(events)
+        try:
+            yield events
+        finally:
+            listeners = self._listeners.get(task_id)
+            if listeners is not None:
+                listeners.discard(events)
+                if not listeners:
+                    del self._listeners[task_id]
+
+    def listener_count(self) -> int:
+        """当前等待中的订阅数"""
+        return sum(len(listeners) for listeners in self._listeners.values())
+
+    async def close(self):
+        """停止后台读取"""
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+
+    async def _ensure_reader(self):
+        """首次订阅时启动后台读取任务"""
+        if self._reader and not self._reader.done():
+            return
+        async with self._lock:
+            if self._reader and not self._reader.done():
+                return
+            ready = asyncio.get_running_loop().create_future()
+            self._reader = asyncio.create_task(self._read_loop(ready))
+            # 等待SUBSCRIBE完成，避免订阅前发布的事件丢失
+            try:
+                await asyncio.wait_for(ready, timeout=2)
+            except asyncio.TimeoutError:
+                print("[TaskEvents] 订阅超时，稍后重试")
+
+    async def _read_loop(self, ready: asyncio.Future):
+        """读取Pub/Sub消息并分发（断线自动重连）"""
+        while True:
+            pubsub = redis_pool.async_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(TASK_EVENTS_CHANNEL)
+                if not ready.done():
+                    ready.set_result(True)
+
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[TaskEvents] 订阅中断，1秒后重连: {e}")
+                # 断线期间可能丢事件：唤醒所有等待方重新读取状态
+                for listeners in list(self._listeners.values()):
+                    for events in listeners:
+                        events.put_nowait(None)
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def _dispatch(self, data: str):
+        """把事件投递给对应task_id的等待方"""
+        try:
+            event = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        for events in list(self._listeners.get(event.get("task_id"), ())):
+            events.put_nowait(event)
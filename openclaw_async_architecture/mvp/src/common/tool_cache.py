@@ -6,7 +6,9 @@ from typing import Optional, Any
 import hashlib
 import json
 from datetime import datetime, timedelta
+from ..common import codec
 from ..common.connection_pool import redis_pool
+from ..common.redis_keys import scan_keys, unlink_matching
 
 
 class BaseCache(ABC):
@@ -39,7 +41,7 @@ class ToolResultCache(BaseCache):
 
     缓存策略：
     - Key: tool_name:hash(input_args)
-    - Value: JSON字符串
+    - Value: codec编码（settings.serialization_codec），读取兼容旧版JSON
     - TTL: 默认1小时（可配置）
     """
 
@@ -52,6 +54,7 @@ class ToolResultCache(BaseCache):
             default_ttl: 默认TTL（秒）
         """
         self.redis_client = redis_pool.client
+        self.binary_client = redis_pool.binary_client
         self.prefix = "tools:result:"
         self.default_ttl = default_ttl
         self.max_size = max_size
@@ -75,9 +78,9 @@ class ToolResultCache(BaseCache):
     def get(self, key: str) -> Optional[Any]:
         """获取缓存"""
         try:
-            cached = self.redis_client.get(key)
+            cached = self.binary_client.get(key)
             if cached:
-                data = json.loads(cached)
+                data = codec.loads(cached)
                 return data.get("result")
             return None
         except Exception:
@@ -99,7 +102,7 @@ class ToolResultCache(BaseCache):
                 "timestamp": datetime.now().isoformat()
             }
 
-            self.redis_client.setex(key, ttl, json.dumps(data))
+            self.redis_client.setex(key, ttl, codec.dumps(data))
             return True
         except Exception:
             return False
@@ -123,11 +126,9 @@ class ToolResultCache(BaseCache):
         return self.delete(key)
 
     def clear(self) -> bool:
-        """清空所有工具结果缓存"""
+        """清空所有工具结果缓存（SCAN + 分批UNLINK，不阻塞Redis）"""
         try:
-            keys = self.redis_client.keys(f"{self.prefix}*")
-            if keys:
-                self.redis_client.delete(*keys)
+            unlink_matching(self.redis_client, f"{self.prefix}*")
             return True
         except Exception:
             return False
@@ -135,9 +136,7 @@ class ToolResultCache(BaseCache):
     def clear_by_tool(self, tool_name: str) -> bool:
         """清空指定工具的缓存"""
         try:
-            keys = self.redis_client.keys(f"{self.prefix}{tool_name}:*")
-            if keys:
-                self.redis_client.delete(*keys)
+            unlink_matching(self.redis_client, f"{self.prefix}{tool_name}:*")
             return True
         except Exception:
             return False
@@ -150,11 +149,9 @@ class ToolResultCache(BaseCache):
         }
 
         try:
-            keys = self.redis_client.keys(f"{self.prefix}*")
-            stats["total_keys"] = len(keys)
-
-            # 按工具分组统计
-            for key in keys:
+            # 按工具分组统计（SCAN逐批遍历）
+            for key in scan_keys(self.redis_client, f"{self.prefix}*"):
+                stats["total_keys"] += 1
                 # 提取工具名
                 parts = key.split(":")
                 if len(parts) >= 3:
@@ -178,11 +175,7 @@ class ToolResultCache(BaseCache):
             失效的缓存数量
         """
         try:
-            keys = self.redis_client.keys(f"{self.prefix}{pattern}")
-            if keys:
-                self.redis_client.delete(*keys)
-                return len(keys)
-            return 0
+            return unlink_matching(self.redis_client, f"{self.prefix}{pattern}")
         except Exception:
             return 0
 
@@ -8,11 +8,17 @@ V1技术栈：
 """
 
 import sqlite3
-import redis
 import chromadb
 from typing import Optional, Dict, Any
 from datetime import datetime
 import json
+from .compression import decompress_text
+from .connection_pool import redis_pool
+from .redis_keys import unlink_matching
+
+
+# L1缓存键前缀：与任务队列共用Redis实例，清空时只删除本命名空间
+CACHE_PREFIX = "memory:cache:"
 
 
 class V1MemorySystemIntegration:
@@ -26,13 +32,8 @@ class V1MemorySystemIntegration:
     """
 
     def __init__(self):
-        # L1: Redis缓存
-        self.redis_client = redis.Redis(
-            host='127.0.0.1',
-            port=6379,
-            db=0,
-            decode_responses=True
-        )
+        # L1: Redis缓存（共用进程内连接池）
+        self.redis_client = redis_pool.client
 
         # L2: ChromaDB向量数据库
         self.chroma_client = chromadb.Client()
@@ -94,7 +95,7 @@ class V1MemorySystemIntegration:
             if isinstance(value, (dict, list)):
                 value = json.dumps(value, ensure_ascii=False)
 
-            self.redis_client.setex(key, ttl, value)
+            self.redis_client.setex(f"{CACHE_PREFIX}{key}", ttl, value)
             return True
         except Exception as e:
             print(f"[L1-Redis] 保存失败: {e}")
@@ -103,7 +104,7 @@ class V1MemorySystemIntegration:
     def get_from_cache(self, key: str) -> Optional[Any]:
         """从Redis缓存获取（L1）"""
         try:
-            value = self.redis_client.get(key)
+            value = self.redis_client.get(f"{CACHE_PREFIX}{key}")
             if value:
                 # 尝试解析JSON
                 try:
@@ -115,6 +116,10 @@ class V1MemorySystemIntegration:
             print(f"[L1-Redis] 获取失败: {e}")
             return None
 
+    def clear_cache(self) -> int:
+        """清空L1缓存（仅记忆命名空间，SCAN + 分批UNLINK），返回删除数量"""
+        return unlink_matching(self.redis_client, f"{CACHE_PREFIX}*")
+
     # ==================== L2: ChromaDB层 ====================
 
     def save_to_vector_db(self, doc_id: str, content: str, metadata: Optional[Dict] = None):
@@ -167,10 +172,19 @@ class V1MemorySystemIntegration:
             cursor = self.sqlite_conn.cursor()
 
             if table == "tasks":
+                # 与HybridTaskStore相同的upsert：INSERT OR REPLACE不触发删除触发器，
+                # task_status_counts会多计一条（recursive_triggers默认关闭）
                 cursor.execute('''
-                    INSERT OR REPLACE INTO tasks
+                    INSERT INTO tasks
                     (task_id, content, status, result, error, metadata)
                     VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(task_id) DO UPDATE SET
+                        content = excluded.content,
+                        status = excluded.status,
+                        result = excluded.result,
+                        error = excluded.error,
+                        metadata = excluded.metadata,
+                        updated_at = CURRENT_TIMESTAMP
                 ''', (
                     data['task_id'],
                     data['content'],
@@ -214,6 +228,9 @@ class V1MemorySystemIntegration:
                 # 解析JSON字段
                 if 'metadata' in result and result['metadata']:
                     result['metadata'] = json.loads(result['metadata'])
+                # V2写入的大结果是压缩BLOB（与HybridTaskStore读取时一样解压）
+                if 'result' in result:
+                    result['result'] = decompress_text(result['result'])
                 return result
 
             return None
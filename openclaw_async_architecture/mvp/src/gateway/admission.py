@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""准入控制 - 客户端令牌桶 + 队列积压上限 + 按车道降级
+
+过载时宁可立即返回429（附Retry-After），也不让队列无限增长、延迟无限拉长：
+1. 每个客户端一个令牌桶（settings.admission_client_rate / admission_client_burst），每个任务消耗1个令牌
+   （批量提交按任务数计，最多扣满一个桶）；客户端按来源IP区分，
+   仅当来源是settings.admission_trusted_proxies中的代理时才采用其转发的X-Client-ID
+2. 队列积压达到settings.admission_max_queue时拒绝所有提交
+3. 降级：积压达到上限的一定比例时，先拒绝低优先级车道
+   （settings.admission_shed_thresholds，如bulk:50表示积压过半即拒绝bulk）
+
+Retry-After按超出部分 ÷ Worker吞吐估算：吞吐来自Worker上报的完成数
+（openclaw:worker_metrics:*，见worker.consumer）的增量，指数平滑。
+队列长度与吞吐每refresh_interval秒刷新一次，期间按本进程已接纳的数量累加估算。
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+from ..common.config import settings
+from ..common.connection_pool import redis_pool
+from ..worker.consumer import METRICS_KEY_PREFIX
+
+
+# 令牌桶最多保留的客户端数（按最近使用淘汰）
+MAX_CLIENTS = 10000
+
+# 吞吐估算的平滑系数
+THROUGHPUT_ALPHA = 0.3
+
+
+class AdmissionRejected(Exception):
+    """提交被拒绝（Gateway转换为429 + Retry-After）"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """令牌桶（每秒补充rate个，最多burst个）"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, count: int = 1, now: Optional[float] = None) -> float:
+        """取count个令牌；成功返回0，不足时返回需等待的秒数（不扣减）"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= count:
+            self.tokens -= count
+            return 0.0
+        return (count - self.tokens) / self.rate
+
+
+def client_identity(peer: Optional[str], client_header: Optional[str], trusted_proxies: list[str]) -> str:
+    """准入控制的客户端标识：来源IP；来源是受信代理且携带X-Client-ID时用该头
+
+    X-Client-ID由客户端自行声明，直连时不可信（换一个值就能拿到新的令牌桶）。
+    """
+    if client_header and peer in trusted_proxies:
+        return client_header
+    return peer or "unknown"
+
+
+class AdmissionController:
+    """Gateway准入控制器"""
+
+    def __init__(
+        self,
+        queue,
+        client_rate: Optional[float] = None,
+        client_burst: Optional[float] = None,
+        max_queue: Optional[int] = None,
+        shed_thresholds: Optional[dict[str, int]] = None,
+        refresh_interval: float = 1.0
+    ):
+        """初始化
+
+        Args:
+            queue: 异步任务队列（提供get_queue_length）
+            client_rate: 每个客户端每秒令牌数，0为不限（默认settings.admission_client_rate）
+            client_burst: 令牌桶容量（默认settings.admission_client_burst）
+            max_queue: 队列积压上限，0为不限（默认settings.admission_max_queue）
+            shed_thresholds: {车道: 积压达到上限的百分比时拒绝}（默认settings.admission_shed_thresholds）
+            refresh_interval: 队列长度与吞吐的刷新间隔（秒）
+        """
+        self.queue = queue
+        self.client_rate = settings.admission_client_rate if client_rate is None else client_rate
+        self.client_burst = settings.admission_client_burst if client_burst is None else client_burst
+        self.max_queue = settings.admission_max_queue if max_queue is None else max_queue
+        self.shed_thresholds = settings.admission_shed_thresholds if shed_thresholds is None else shed_thresholds
+        self.refresh_interval = refresh_interval
+
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._queue_length = 0
+        self._refreshed_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        self._worker_done: dict[str, int] = {}
+        self._throughput = 0.0  # 任务/秒
+        self._throughput_at = 0.0
+        self.rejected = {"client_rate": 0, "queue_full": 0, "shed": 0}
+
+    async def admit(self, client_id: str, lane: str, count: int = 1):
+        """检查并占用准入名额（count为本次请求提交的任务数）
+
+        Raises:
+            AdmissionRejected: 超出客户端速率 / 队列已满 / 当前积压下该车道被降级
+        """
+        if self.client_rate > 0:
+            # 批量提交按任务数扣令牌；超过桶容量的一批最多扣满一个桶，否则永远无法通过
+            wait = self._bucket(client_id).take(min(count, max(self.client_burst, 1)))
+            if wait > 0:
+                self.rejected["client_rate"] += 1
+                raise AdmissionRejected("提交过于频繁", self._clamp(wait))
+
+        if self.max_queue > 0:
+            await self._refresh()
+            limit = self.max_queue * self.shed_thresholds.get(lane, 100) / 100
+            if self._queue_length + count > limit:
+                kind = "queue_full" if limit >= self.max_queue else "shed"
+                self.rejected[kind] += 1
+                excess = self._queue_length + count - limit
+                raise AdmissionRejected(
+                    "队列已满" if kind == "queue_full" else f"系统繁忙，暂停接收{lane}任务",
+                    self._retry_after(excess)
+                )
+            self._queue_length += count
+
+    def _bucket(self, client_id: str) -> TokenBucket:
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, max(self.client_burst, 1))
+            self._buckets[client_id] = bucket
+            if len(self._buckets) > MAX_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket
+
+    def _retry_after(self, excess: float) -> int:
+        """积压消化到阈值以下所需秒数（吞吐未知时按上限的一成估算）"""
+        if self._throughput > 0:
+            return self._clamp(excess / self._throughput)
+        return self._clamp(settings.admission_retry_after_max / 10)
+
+    @staticmethod
+    def _clamp(seconds: float) -> int:
+        return max(1, min(settings.admission_retry_after_max, math.ceil(seconds)))
+
+    async def _refresh(self):
+        """刷新队列长度与Worker吞吐（过期时由一个请求负责刷新）"""
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        async with self._refresh_lock:
+            if time.monotonic() - self._refreshed_at < self.refresh_interval:
+                return
+            try:
+                self._queue_length = await self.queue.get_queue_length()
+                await self._update_throughput()
+            except Exception as e:
+                print(f"[Admission] 刷新队列状态失败: {e}")
+            self._refreshed_at = time.monotonic()
+
+    async def _update_throughput(self):
+        """按各Worker完成数（completed + failed）的增量估算吞吐"""
+        client = redis_pool.async_client
+        keys = [key async for key in client.scan_iter(match=f"{METRICS_KEY_PREFIX}*", count=100)]
+        if not keys:
+            return
+
+        pipeline = client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.hmget(key, "completed", "failed")
+        results = await pipeline.execute()
+
+        self.record_worker_counts(
+            {key: int(completed or 0) + int(failed or 0) for key, (completed, failed) in zip(keys, results)},
+            time.monotonic()
+        )
+
+    def record_worker_counts(self, done_now: dict[str, int], now: float):
+        """记录一次各Worker的累计完成数，更新吞吐估算（任务/秒）"""
+        delta = 0
+        for key, done in done_now.items():
+            previous = self._worker_done.get(key)
+            if previous is not None:
+                # 计数变小说明Worker重启，本周期按新计数计
+                delta += done - previous if done >= previous else done
+        had_baseline = bool(self._worker_done)
+        self._worker_done = done_now
+
+        if had_baseline and self._throughput_at:
+            rate = delta / max(now - self._throughput_at, 1e-3)
+            self._throughput = rate if self._throughput == 0 else (
+                THROUGHPUT_ALPHA * rate + (1 - THROUGHPUT_ALPHA) * self._throughput
+            )
+        self._throughput_at = now
+
+    def get_stats(self) -> dict:
+        """准入状态（/health）"""
+        return {
+            "max_queue": self.max_queue,
+            "queue_length": self._queue_length,
+            "throughput_per_sec": round(self._throughput, 2),
+            "shed_lanes": [
+                lane for lane, percent in self.shed_thresholds.items()
+                if self.max_queue > 0 and self._queue_length >= self.max_queue * percent / 100
+            ],
+            "clients": len(self._buckets),
+            "rejected": dict(self.rejected)
+        }
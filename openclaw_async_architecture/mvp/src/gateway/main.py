@@ -1,12 +1,27 @@
 """Gateway - FastAPI应用"""
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import time
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone
 import requests
 
 from ..common.models import TaskRequest, TaskResponse, HealthResponse
-from ..queue.redis_queue import RedisTaskQueue
-from ..store.hybrid_store import HybridTaskStore  # 使用混合存储
+from ..common.models import TaskBatchRequest, TaskBatchResponse
+from ..common.config import settings
+from ..common.compression import compression_metrics
+from ..common.connection_pool import redis_pool
+from ..common.model_router import ROUTING_KEY_PREFIX, get_model_router, merge_snapshots
+from ..common.task_dedup import TaskDeduplicator
+from ..common.task_events import TaskEventHub, TERMINAL_STATUSES
+from ..queue.factory import create_async_task_queue
+from ..queue.priority_queue import resolve_lane
+from ..queue.scheduler import AsyncTaskScheduler
+from .admission import AdmissionController, AdmissionRejected, client_identity
+from ..store.async_store import AsyncHybridTaskStore  # 异步混合存储
 from ..common.models import Task
 
 
@@ -26,19 +41,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 初始化组件（使用V1兼容的混合存储）
-queue = RedisTaskQueue()
-store = HybridTaskStore()  # 三层存储：SQLite + Redis
+# 初始化组件（全异步：redis.asyncio + SQLite专用写线程，请求路径不阻塞事件循环）
+queue = create_async_task_queue()
+store = AsyncHybridTaskStore()  # 三层存储：SQLite + Redis
+event_hub = TaskEventHub()  # 任务完成通知（长轮询 / SSE）
+dedup = TaskDeduplicator()  # 重复提交去重（Idempotency-Key / 内容哈希窗口）
+admission = AdmissionController(queue)  # 准入控制（客户端令牌桶 / 积压上限 / 按车道降级）
+scheduler = AsyncTaskScheduler()  # 延迟任务 / 死信队列（重试由Worker安排）
+
+# SSE心跳间隔（秒），防止代理断开空闲连接
+SSE_KEEPALIVE_SECONDS = 15
+
+# 状态计数定期校正任务 / 定期归档任务
+_reconcile_task: Optional[asyncio.Task] = None
+_retention_task: Optional[asyncio.Task] = None
+
+
+async def _reconcile_statistics_loop():
+    """定期全表校正状态计数（计数表由触发器维护，这里兜底）"""
+    while True:
+        await asyncio.sleep(settings.stats_reconcile_interval)
+        try:
+            await store.reconcile_statistics()
+        except Exception as e:
+            print(f"[Gateway] 状态计数校正失败: {e}")
+
+
+async def _retention_loop():
+    """定期把超期任务移入归档库（见store.retention）"""
+    while True:
+        await asyncio.sleep(settings.retention_interval)
+        try:
+            await store.run_retention()
+        except Exception as e:
+            print(f"[Gateway] 任务归档失败: {e}")
+
+
+@app.on_event("startup")
+async def startup():
+    """启动后台任务"""
+    global _reconcile_task, _retention_task
+    if settings.stats_reconcile_interval > 0:
+        _reconcile_task = asyncio.create_task(_reconcile_statistics_loop())
+    if settings.retention_interval > 0 and settings.retention_days:
+        _retention_task = asyncio.create_task(_retention_loop())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """关闭时等待SQLite写线程落盘，并释放Redis连接"""
+    if _reconcile_task:
+        _reconcile_task.cancel()
+    if _retention_task:
+        _retention_task.cancel()
+    await event_hub.close()
+    await store.close()
+    await redis_pool.close_async()
 
 
 @app.get("/health")
 async def health():
     """健康检查（检查三层存储）"""
     # 队列连接
-    redis_queue_ok = queue.test_connection()
+    redis_queue_ok = await queue.test_connection()
 
     # 存储连接（SQLite + Redis）
-    storage_status = store.test_connection()
+    storage_status = await store.test_connection()
+
+    # 队列积压（priority后端附带各车道深度与队头等待时间）
+    queue_status = {
+        "backend": settings.queue_backend,
+        "length": await queue.get_queue_length()
+    }
+    if hasattr(queue, "get_lane_stats"):
+        queue_status["lanes"] = await queue.get_lane_stats()
 
     return {
         "status": "ok",
@@ -49,26 +125,70 @@ async def health():
             "sqlite_persistence": storage_status['sqlite_connected'],
             "storage_mode": storage_status['storage_mode']
         },
+        "queue": queue_status,
+        "redis_pool": redis_pool.stats(),
+        # 本进程读写大结果的压缩统计（节省字节数、解压耗时）
+        "result_compression": compression_metrics.to_dict(),
+        "dedup": await dedup.get_stats(),
+        "admission": admission.get_stats(),
+        "retries": await scheduler.get_stats(),
         "v1_compatible": True
     }
 
 
 @app.post("/tasks", response_model=TaskResponse)
-async def submit_task(request: TaskRequest):
+async def submit_task(
+    request: TaskRequest,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """提交任务
 
     立即返回task_id，不等待执行完成（<50ms）
+    携带Idempotency-Key（或开启内容哈希去重窗口）时，重复提交返回已存在的任务，不再入队。
+    过载时返回429与Retry-After（见admission模块）。
+    指定run_at / delay_seconds时任务先进入延迟队列，到期后由Worker移入任务队列。
     """
     # 创建任务
-    task = Task(content=request.content, status="pending")
+    task = Task(
+        content=request.content,
+        status="pending",
+        metadata={"task_type": request.task_type}
+    )
+
+    # 去重：命中时直接返回已存在的任务
+    dedup_keys = dedup.keys_for(request.content, request.task_type, idempotency_key)
+    if dedup_keys:
+        duplicate = await _find_duplicate(dedup_keys, task)
+        if duplicate:
+            return duplicate
+
+    # 准入控制
+    lane = resolve_lane(request.content, request.priority)
+    try:
+        await admission.admit(_client_id(http_request), lane)
+    except AdmissionRejected as e:
+        if dedup_keys:
+            await dedup.release(dedup_keys, task.id)
+        raise _too_many_requests(e)
 
     # 保存到存储
-    store.save_task(task)
+    run_at = request.scheduled_timestamp()
+    if run_at and run_at > time.time():
+        task.metadata["run_at"] = datetime.fromtimestamp(run_at, timezone.utc).isoformat()
+    else:
+        run_at = None
+    await store.save_task(task)
 
-    # 提交到队列
-    success = queue.submit(task.id, task.content)
+    # 提交到队列（延迟任务进入延迟队列）
+    if run_at:
+        success = await scheduler.schedule(task.id, task.content, request.task_type, lane, run_at)
+    else:
+        success = await queue.submit(task.id, task.content, request.task_type, lane)
 
     if not success:
+        if dedup_keys:
+            await dedup.release(dedup_keys, task.id)
         raise HTTPException(status_code=500, detail="提交任务失败")
 
     print(f"[Gateway] 收到任务 {task.id}: {task.content[:50]}...")
@@ -77,18 +197,224 @@ async def submit_task(request: TaskRequest):
     return TaskResponse(
         task_id=task.id,
         status="pending",
-        message="任务已提交，正在处理中"
+        message=f"任务已计划于 {task.metadata['run_at']} 执行" if run_at else "任务已提交，正在处理中"
     )
 
 
+async def _find_duplicate(dedup_keys: list, task: Task) -> Optional[TaskResponse]:
+    """占用去重键；已存在相同提交时返回其任务（含已缓存的结果）
+
+    内容哈希命中已失败的任务时不复用，改由本次提交重新执行。
+    Redis不可用时不去重，照常提交。
+    """
+    try:
+        existing_id, kind = await dedup.claim(dedup_keys, task.id)
+        if not existing_id:
+            return None
+
+        existing = await store.get_task(existing_id)
+        if kind == "content" and existing and existing.status == "failed":
+            await dedup.replace(dedup_keys, task.id)
+            return None
+
+        await dedup.record_hit(kind)
+    except Exception as e:
+        print(f"[Gateway] 去重检查失败，照常提交: {e}")
+        return None
+
+    print(f"[Gateway] 重复提交（{kind}），返回已存在的任务 {existing_id}")
+    return TaskResponse(
+        task_id=existing_id,
+        status=existing.status if existing else "pending",
+        message="重复提交，返回已存在的任务",
+        deduplicated=True,
+        result=existing.result if existing else None
+    )
+
+
+def _client_id(http_request: Request) -> str:
+    """准入控制的客户端标识（来源IP；受信代理转发时为X-Client-ID）"""
+    return client_identity(
+        http_request.client.host if http_request.client else None,
+        http_request.headers.get("X-Client-ID"),
+        settings.admission_trusted_proxies
+    )
+
+
+def _too_many_requests(rejected: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=rejected.reason,
+        headers={"Retry-After": str(rejected.retry_after)}
+    )
+
+
+@app.post("/tasks/batch", response_model=TaskBatchResponse)
+async def submit_tasks_batch(request: TaskBatchRequest, http_request: Request):
+    """批量提交任务
+
+    一次请求提交最多settings.batch_max_tasks个任务：
+    SQLite一次executemany事务 + Redis缓存一次pipeline + 队列一次pipeline。
+    返回的task_ids与请求中的任务顺序一致。
+    未指定priority的任务进入bulk车道，不挤占交互请求。
+    """
+    if len(request.tasks) > settings.batch_max_tasks:
+        raise HTTPException(
+            status_code=413,
+            detail=f"单次最多提交 {settings.batch_max_tasks} 个任务"
+        )
+    if any(item.run_at or item.delay_seconds for item in request.tasks):
+        raise HTTPException(status_code=400, detail="批量提交不支持延迟执行，请使用POST /tasks")
+
+    # 准入控制（整批按bulk车道计入积压）
+    try:
+        await admission.admit(_client_id(http_request), "bulk", count=len(request.tasks))
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+
+    tasks = [
+        Task(content=item.content, status="pending", metadata={"task_type": item.task_type})
+        for item in request.tasks
+    ]
+
+    # 保存到存储
+    await store.save_tasks(tasks)
+
+    # 提交到队列
+    submitted = await queue.submit_batch([
+        (task.id, task.content, task.metadata["task_type"], item.priority or "bulk")
+        for task, item in zip(tasks, request.tasks)
+    ])
+
+    if submitted != len(tasks):
+        # 已保存的任务不会被执行：标记为失败，避免留下永远pending的记录
+        for task in tasks:
+            task.status = "failed"
+            task.error = "提交到队列失败"
+        await store.save_tasks(tasks)
+        raise HTTPException(status_code=500, detail="批量提交任务失败")
+
+    print(f"[Gateway] 批量收到 {len(tasks)} 个任务")
+
+    return TaskBatchResponse(
+        task_ids=[task.id for task in tasks],
+        count=len(tasks),
+        message="任务已批量提交，正在处理中"
+    )
+
+
+@app.get("/tasks/stats")
+async def task_statistics():
+    """按状态统计任务数（计数表维护，耗时与任务总数无关）"""
+    return await store.get_statistics()
+
+
+@app.get("/tasks")
+async def list_tasks(
+    status: Optional[str] = Query(None, description="按状态筛选：pending/running/completed/failed"),
+    after: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    limit: int = Query(50, ge=1, le=500, description="每页条数")
+):
+    """按创建时间倒序列出任务（游标分页）
+
+    返回next_cursor时表示还有下一页，作为after参数传回即可。
+    """
+    try:
+        tasks, next_cursor = await store.list_tasks_page(status=status, after=after, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "tasks": [_task_to_dict(task) for task in tasks],
+        "count": len(tasks),
+        "next_cursor": next_cursor
+    }
+
+
 @app.get("/tasks/{task_id}")
-async def get_task(task_id: str):
-    """获取任务状态和结果"""
-    task = store.get_task(task_id)
+async def get_task(
+    task_id: str,
+    wait: float = Query(0, ge=0, le=60, description="长轮询：最多等待N秒直到任务完成")
+):
+    """获取任务状态和结果
+
+    wait>0时为长轮询：任务未完成则挂起，直到Worker发布完成事件或超时，
+    返回时任务可能仍未完成（超时），客户端据status决定是否再次请求。
+    """
+    task = await store.get_task(task_id)
 
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
 
+    if wait > 0 and task.status not in TERMINAL_STATUSES:
+        task = await _wait_for_terminal(task_id, task, wait)
+
+    return _task_to_dict(task)
+
+
+@app.get("/tasks/{task_id}/events")
+async def task_events(task_id: str, request: Request):
+    """任务状态事件流（Server-Sent Events）
+
+    连接建立即推送当前状态，之后每次状态变化推送一次，
+    到达终态（completed/failed）后推送并关闭。
+    """
+    task = await store.get_task(task_id)
+
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    async def event_stream():
+        async with event_hub.subscribe(task_id) as events:
+            # 订阅后再读一次，避免错过订阅前发生的变化
+            current = await store.get_task(task_id) or task
+            yield _sse("status", _task_to_dict(current))
+
+            while current.status not in TERMINAL_STATUSES:
+                if await request.is_disconnected():
+                    return
+                try:
+                    await asyncio.wait_for(events.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                latest = await store.get_task(task_id)
+                if latest and (latest.status != current.status or latest.status in TERMINAL_STATUSES):
+                    current = latest
+                    yield _sse("status", _task_to_dict(current))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _wait_for_terminal(task_id: str, task: Task, wait: float) -> Task:
+    """等待任务到达终态（事件驱动），超时返回最新状态"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+
+    async with event_hub.subscribe(task_id) as events:
+        # 订阅后复查，避免错过订阅前发布的完成事件
+        task = await store.get_task(task_id) or task
+
+        while task.status not in TERMINAL_STATUSES:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(events.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            task = await store.get_task(task_id) or task
+
+    return task
+
+
+def _task_to_dict(task: Task) -> dict:
+    """Task → API响应"""
     return {
         "task_id": task.id,
         "status": task.status,
@@ -101,6 +427,97 @@ async def get_task(task_id: str):
     }
 
 
+def _sse(event: str, data: dict) -> str:
+    """格式化一条SSE消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/dlq")
+async def list_dead_letters(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """死信队列（重试用尽的任务，最近进入的在前）"""
+    entries = await scheduler.list_dead(limit, offset)
+    return {"entries": entries, "count": len(entries)}
+
+
+@app.get("/dlq/{task_id}")
+async def get_dead_letter(task_id: str):
+    """单条死信（含最后一次错误与执行次数）"""
+    entry = await scheduler.get_dead(task_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="死信不存在")
+    return entry
+
+
+@app.post("/dlq/{task_id}/requeue")
+async def requeue_dead_letter(task_id: str):
+    """死信重新入队（重试次数从零计，任务状态改回pending）
+
+    先保存pending状态再入队：Worker取到任务后写入的running/completed不会被这里的旧状态覆盖。
+    """
+    if await scheduler.get_dead(task_id) is None:
+        raise HTTPException(status_code=404, detail="死信不存在")
+
+    task = await store.get_task(task_id)
+    dead = task.model_copy(deep=True) if task else None
+    if task:
+        task.status = "pending"
+        task.error = None
+        task.updated_at = datetime.utcnow()
+        task.metadata.pop("dead_letter", None)
+        task.metadata.pop("attempt", None)
+        task.metadata.pop("retry_at", None)
+        await store.save_task(task)
+
+    # 未能入队（或死信已被并发丢弃）时恢复原来的失败状态
+    try:
+        entry = await scheduler.requeue_dead(task_id, queue)
+    except RuntimeError as e:
+        if dead:
+            await store.save_task(dead)
+        raise HTTPException(status_code=500, detail=str(e))
+    if entry is None:
+        if dead:
+            await store.save_task(dead)
+        raise HTTPException(status_code=404, detail="死信不存在")
+
+    print(f"[Gateway] 死信 {task_id} 已重新入队")
+    return {"task_id": task_id, "status": "pending", "message": "已重新入队"}
+
+
+@app.delete("/dlq/{task_id}")
+async def discard_dead_letter(task_id: str):
+    """丢弃死信（任务保持failed）"""
+    if not await scheduler.remove_dead(task_id):
+        raise HTTPException(status_code=404, detail="死信不存在")
+    return {"task_id": task_id, "message": "已丢弃"}
+
+
+@app.get("/routing/stats")
+async def routing_stats():
+    """模型路由统计：各进程的EWMA延迟 / 首字延迟 / 错误率，及按样本数加权的汇总"""
+    client = redis_pool.async_client
+    processes = {}
+    async for key in client.scan_iter(match=f"{ROUTING_KEY_PREFIX}*", count=100):
+        fields = await client.hgetall(key)
+        processes[key[len(ROUTING_KEY_PREFIX):]] = {model: json.loads(value) for model, value in fields.items()}
+
+    # 本进程（如流式调用）的统计
+    router = get_model_router()
+    local = router.snapshot()
+    if local:
+        processes["gateway"] = local
+
+    return {
+        "models": merge_snapshots(processes.values()),
+        "processes": processes,
+        "exploration": router.exploration,
+        "min_samples": router.min_samples
+    }
+
+
 @app.get("/")
 async def root():
     """根路径"""
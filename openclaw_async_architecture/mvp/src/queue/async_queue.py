@@ -0,0 +1,56 @@
+"""异步Redis任务队列 - Gateway专用（redis.asyncio，不阻塞事件循环）"""
+from typing import Optional
+from ..common.connection_pool import redis_pool
+from .redis_queue import QUEUE_KEY, build_task_payload
+
+
+class AsyncRedisTaskQueue:
+    """异步Redis任务队列（生产者端）
+
+    与RedisTaskQueue共用队列键和消息格式，Worker端无需改动。
+    """
+
+    def __init__(self):
+        """初始化（使用asyncio连接池）"""
+        self.redis_client = redis_pool.async_client
+        self.queue_key = QUEUE_KEY
+
+    async def submit(self, task_id: str, task_data: str, task_type: str = "v1", lane: Optional[str] = None) -> bool:
+        """提交任务到队列"""
+        try:
+            await self.redis_client.lpush(self.queue_key, build_task_payload(task_id, task_data, task_type, lane))
+            return True
+        except Exception as e:
+            print(f"[AsyncQueue] 提交任务失败: {e}")
+            return False
+
+    async def submit_batch(self, tasks: list[tuple]) -> int:
+        """批量提交任务（pipeline，一次往返）
+
+        Args:
+            tasks: [(task_id, task_data[, task_type[, lane]]), ...]
+        """
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for item in tasks:
+                pipeline.lpush(self.queue_key, build_task_payload(*item))
+            await pipeline.execute()
+            return len(tasks)
+        except Exception as e:
+            print(f"[AsyncQueue] 批量提交失败: {e}")
+            return 0
+
+    async def get_queue_length(self) -> int:
+        """获取队列长度"""
+        try:
+            return await self.redis_client.llen(self.queue_key)
+        except Exception:
+            return 0
+
+    async def test_connection(self) -> bool:
+        """测试Redis连接"""
+        try:
+            await self.redis_client.ping()
+            return True
+        except Exception:
+            return False
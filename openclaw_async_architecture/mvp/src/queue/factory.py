@@ -0,0 +1,31 @@
+"""队列工厂 - 按settings.queue_backend选择队列实现"""
+from typing import Optional
+from ..common.config import settings
+from .redis_queue import RedisTaskQueue
+from .async_queue import AsyncRedisTaskQueue
+from .stream_queue import RedisStreamTaskQueue, AsyncRedisStreamTaskQueue
+from .priority_queue import RedisPriorityTaskQueue, AsyncRedisPriorityTaskQueue
+
+
+def create_task_queue(backend: Optional[str] = None):
+    """创建同步任务队列（Worker端）
+
+    Args:
+        backend: list / stream / priority（默认settings.queue_backend）
+    """
+    backend = backend or settings.queue_backend
+    if backend == "stream":
+        return RedisStreamTaskQueue()
+    if backend == "priority":
+        return RedisPriorityTaskQueue()
+    return RedisTaskQueue()
+
+
+def create_async_task_queue(backend: Optional[str] = None):
+    """创建异步任务队列（Gateway端）"""
+    backend = backend or settings.queue_backend
+    if backend == "stream":
+        return AsyncRedisStreamTaskQueue()
+    if backend == "priority":
+        return AsyncRedisPriorityTaskQueue()
+    return AsyncRedisTaskQueue()
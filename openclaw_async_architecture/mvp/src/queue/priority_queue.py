@@ -0,0 +1,288 @@
+"""优先级任务队列 - 多车道Redis列表 + 加权出队 + 老化防饿死"""
+import time
+from typing import Optional
+import redis
+from ..common import codec
+from ..common.config import settings
+from ..common.connection_pool import redis_pool
+from ..common.task_classifier import TaskType, get_task_classifier
+from .redis_queue import QUEUE_KEY, build_task_payload
+
+
+# 车道（按优先级从高到低）
+LANES = ("realtime", "simple", "complex", "bulk")
+
+# simple车道沿用原列表队列键：从list后端切换过来时，已入队的任务按simple处理
+LANE_KEYS = {
+    "realtime": f"{QUEUE_KEY}:realtime",
+    "simple": QUEUE_KEY,
+    "complex": f"{QUEUE_KEY}:complex",
+    "bulk": f"{QUEUE_KEY}:bulk"
+}
+
+
+def classify_lane(content: str) -> str:
+    """按TaskClassifier的任务类型与紧急度选择车道"""
+    analysis = get_task_classifier().analyze_task(content)
+    task_type = analysis["task_type"]
+
+    if analysis["urgency"] == "high" or task_type == TaskType.REALTIME:
+        return "realtime"
+    if task_type == TaskType.BULK or analysis["context_size"] == "large":
+        return "bulk"
+    if task_type == TaskType.COMPLEX:
+        return "complex"
+    return "simple"
+
+
+def resolve_lane(content: str, lane: Optional[str] = None) -> str:
+    """显式指定的车道优先，否则由分类器决定"""
+    if lane in LANE_KEYS:
+        return lane
+    return classify_lane(content)
+
+
+def _head_wait_ms(payload: Optional[bytes], now: float) -> float:
+    """队头（最早入队）任务已等待的毫秒数"""
+    if not payload:
+        return 0.0
+    try:
+        enqueued_at = codec.loads(payload).get("enqueued_at") or now
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, (now - enqueued_at) * 1000)
+
+
+def _lane_stats(results: list, now: float) -> dict:
+    """[LLEN, LINDEX -1, ...]管道结果 → {lane: {depth, oldest_wait_ms}}"""
+    stats = {}
+    for i, lane in enumerate(LANES):
+        stats[lane] = {
+            "depth": results[2 * i],
+            "oldest_wait_ms": round(_head_wait_ms(results[2 * i + 1], now), 1)
+        }
+    return stats
+
+
+def _queue_lane_stats(pipeline) -> None:
+    for lane in LANES:
+        pipeline.llen(LANE_KEYS[lane])
+        pipeline.lindex(LANE_KEYS[lane], -1)
+
+
+class RedisPriorityTaskQueue:
+    """
+    优先级任务队列（Worker端）
+
+    - 每个车道一个Redis列表（LPUSH入队，RPOP出队）
+    - 出队按车道权重做平滑加权轮询（settings.queue_lane_weights），
+      积分跨批次保留，单条拉取时长期比例同样符合权重
+    - 老化：队头等待超过settings.queue_lane_max_wait秒的车道，本批先分得1个名额
+    - 所有车道为空时BRPOP按优先级顺序阻塞等待
+    """
+
+    def __init__(self, weights: Optional[dict[str, int]] = None, max_wait: Optional[float] = None):
+        """初始化（使用连接池；bytes客户端，消息由codec解码）"""
+        self.redis_client = redis_pool.binary_client
+        weights = settings.queue_lane_weights if weights is None else weights
+        self.weights = {lane: max(1, weights.get(lane, 1)) for lane in LANES}
+        self.max_wait = settings.queue_lane_max_wait if max_wait is None else max_wait
+        self._credits = {lane: 0 for lane in LANES}
+
+    def submit(
+        self,
+        task_id: str,
+        task_data: str,
+        task_type: str = "v1",
+        lane: Optional[str] = None,
+        attempt: int = 0
+    ) -> bool:
+        """提交任务到对应车道"""
+        try:
+            lane = resolve_lane(task_data, lane)
+            self.redis_client.lpush(LANE_KEYS[lane], build_task_payload(task_id, task_data, task_type, lane, attempt))
+            return True
+        except Exception as e:
+            print(f"[PriorityQueue] 提交任务失败: {e}")
+            return False
+
+    def submit_batch(self, tasks: list[tuple]) -> int:
+        """批量提交任务（pipeline）
+
+        Args:
+            tasks: [(task_id, task_data[, task_type[, lane]]), ...]
+        """
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for item in tasks:
+                task_id, task_data = item[0], item[1]
+                task_type = item[2] if len(item) > 2 else "v1"
+                lane = resolve_lane(task_data, item[3] if len(item) > 3 else None)
+                pipeline.lpush(LANE_KEYS[lane], build_task_payload(task_id, task_data, task_type, lane))
+            pipeline.execute()
+            return len(tasks)
+        except Exception as e:
+            print(f"[PriorityQueue] 批量提交失败: {e}")
+            return 0
+
+    def get_task(self, timeout: int = 5) -> Optional[dict]:
+        """获取一个任务（阻塞）"""
+        tasks = self.get_tasks_batch(count=1, timeout=timeout)
+        return tasks[0] if tasks else None
+
+    def get_tasks_batch(self, count: int = 10, timeout: int = 5) -> list[dict]:
+        """按权重从各车道批量获取任务（全部为空时最多阻塞timeout秒）"""
+        try:
+            tasks = self._take(count)
+            if tasks:
+                return tasks
+
+            result = self.redis_client.brpop([LANE_KEYS[lane] for lane in LANES], timeout=timeout)
+            if not result:
+                return []
+            tasks = [codec.loads(result[1])]
+            if count > 1:
+                tasks.extend(self._take(count - 1))
+            return tasks
+        except Exception as e:
+            print(f"[PriorityQueue] 批量获取失败: {e}")
+            return []
+
+    def plan(self, count: int, lane_stats: dict) -> dict[str, int]:
+        """为本批分配各车道名额（老化车道优先，其余平滑加权轮询）"""
+        available = {lane: stats["depth"] for lane, stats in lane_stats.items() if stats["depth"] > 0}
+        allocation: dict[str, int] = {}
+
+        for lane in LANES:
+            if count and available.get(lane) and lane_stats[lane]["oldest_wait_ms"] >= self.max_wait * 1000:
+                allocation[lane] = 1
+                available[lane] -= 1
+                count -= 1
+
+        while count > 0:
+            candidates = [lane for lane in LANES if available.get(lane)]
+            if not candidates:
+                break
+            total = sum(self.weights[lane] for lane in candidates)
+            for lane in candidates:
+                self._credits[lane] += self.weights[lane]
+            chosen = max(candidates, key=lambda lane: self._credits[lane])
+            self._credits[chosen] -= total
+            allocation[chosen] = allocation.get(chosen, 0) + 1
+            available[chosen] -= 1
+            count -= 1
+
+        return allocation
+
+    def _take(self, count: int) -> list[dict]:
+        """非阻塞按计划取走任务（一次统计往返 + 一次出队往返）"""
+        allocation = self.plan(count, self.get_lane_stats())
+        if not allocation:
+            return []
+
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for lane, n in allocation.items():
+                pipeline.rpop(LANE_KEYS[lane], n)
+            results = [items or [] for items in pipeline.execute()]
+        except redis.ResponseError:
+            # Redis<6.2不支持RPOP count
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for lane, n in allocation.items():
+                for _ in range(n):
+                    pipeline.rpop(LANE_KEYS[lane])
+            results = [[item for item in pipeline.execute() if item is not None]]
+
+        return [codec.loads(payload) for items in results for payload in items]
+
+    def get_lane_stats(self) -> dict:
+        """各车道深度与队头等待时间"""
+        pipeline = self.redis_client.pipeline(transaction=False)
+        _queue_lane_stats(pipeline)
+        return _lane_stats(pipeline.execute(), time.time())
+
+    def ack(self, task_data: dict) -> bool:
+        """确认任务已处理（列表出队即移除，无需确认）"""
+        return True
+
+    def reclaim_pending(self, min_idle_ms: Optional[int] = None, count: int = 100) -> list[dict]:
+        """接管失联Worker的未确认任务（列表队列不支持，返回空）"""
+        return []
+
+    def get_queue_length(self) -> int:
+        """获取所有车道任务总数"""
+        try:
+            return sum(stats["depth"] for stats in self.get_lane_stats().values())
+        except Exception:
+            return 0
+
+    def clear(self) -> bool:
+        """清空所有车道"""
+        try:
+            self.redis_client.delete(*LANE_KEYS.values())
+            return True
+        except Exception as e:
+            print(f"[PriorityQueue] 清空队列失败: {e}")
+            return False
+
+    def test_connection(self) -> bool:
+        """测试Redis连接"""
+        try:
+            self.redis_client.ping()
+            return True
+        except Exception:
+            return False
+
+
+class AsyncRedisPriorityTaskQueue:
+    """异步优先级队列（生产者端，Gateway专用）"""
+
+    def __init__(self):
+        """初始化（使用asyncio连接池；bytes客户端，车道统计需解码队头消息）"""
+        self.redis_client = redis_pool.async_binary_client
+
+    async def submit(self, task_id: str, task_data: str, task_type: str = "v1", lane: Optional[str] = None) -> bool:
+        """提交任务到对应车道"""
+        try:
+            lane = resolve_lane(task_data, lane)
+            await self.redis_client.lpush(LANE_KEYS[lane], build_task_payload(task_id, task_data, task_type, lane))
+            return True
+        except Exception as e:
+            print(f"[AsyncPriorityQueue] 提交任务失败: {e}")
+            return False
+
+    async def submit_batch(self, tasks: list[tuple]) -> int:
+        """批量提交任务（pipeline，一次往返）"""
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for item in tasks:
+                task_id, task_data = item[0], item[1]
+                task_type = item[2] if len(item) > 2 else "v1"
+                lane = resolve_lane(task_data, item[3] if len(item) > 3 else None)
+                pipeline.lpush(LANE_KEYS[lane], build_task_payload(task_id, task_data, task_type, lane))
+            await pipeline.execute()
+            return len(tasks)
+        except Exception as e:
+            print(f"[AsyncPriorityQueue] 批量提交失败: {e}")
+            return 0
+
+    async def get_lane_stats(self) -> dict:
+        """各车道深度与队头等待时间"""
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            _queue_lane_stats(pipeline)
+            return _lane_stats(await pipeline.execute(), time.time())
+        except Exception:
+            return {}
+
+    async def get_queue_length(self) -> int:
+        """获取所有车道任务总数"""
+        return sum(stats["depth"] for stats in (await self.get_lane_stats()).values())
+
+    async def test_connection(self) -> bool:
+        """测试Redis连接"""
+        try:
+            await self.redis_client.ping()
+            return True
+        except Exception:
+            return False
@@ -1,25 +1,70 @@
 """Redis任务队列 - Phase 2优化：使用连接池"""
-import json
+import time
 from typing import Optional
+import redis
+from ..common import codec
 from ..common.config import settings
 from ..common.connection_pool import redis_pool
 
 
+QUEUE_KEY = "openclaw_tasks_queue"
+
+
+def build_task_message(
+    task_id: str,
+    task_data: str,
+    task_type: str = "v1",
+    lane: Optional[str] = None,
+    attempt: int = 0
+) -> dict:
+    """构建队列消息字段（列表/Streams、同步/异步队列共用）
+
+    enqueued_at用于Worker统计排队等待时间；lane为优先级车道（仅priority后端使用）；
+    attempt为已失败次数（重试时由scheduler回队）。
+    """
+    message = {
+        "task_id": task_id,
+        "task_data": task_data,
+        "task_type": task_type,
+        "enqueued_at": time.time()
+    }
+    if lane:
+        message["lane"] = lane
+    if attempt:
+        message["attempt"] = attempt
+    return message
+
+
+def build_task_payload(
+    task_id: str,
+    task_data: str,
+    task_type: str = "v1",
+    lane: Optional[str] = None,
+    attempt: int = 0
+) -> bytes:
+    """构建列表队列消息（按settings.serialization_codec编码）"""
+    return codec.dumps(build_task_message(task_id, task_data, task_type, lane, attempt))
+
+
 class RedisTaskQueue:
     """Redis任务队列管理器（连接池优化版）"""
 
     def __init__(self):
-        """初始化（使用连接池）"""
-        self.redis_client = redis_pool.client
-        self.queue_key = "openclaw_tasks_queue"
+        """初始化（使用连接池；bytes客户端，消息由codec解码）"""
+        self.redis_client = redis_pool.binary_client
+        self.queue_key = QUEUE_KEY
 
-    def submit(self, task_id: str, task_data: str) -> bool:
+    def submit(
+        self,
+        task_id: str,
+        task_data: str,
+        task_type: str = "v1",
+        lane: Optional[str] = None,
+        attempt: int = 0
+    ) -> bool:
         """提交任务到队列（使用连接池）"""
         try:
-            self.redis_client.lpush(self.queue_key, json.dumps({
-                "task_id": task_id,
-                "task_data": task_data
-            }))
+            self.redis_client.lpush(self.queue_key, build_task_payload(task_id, task_data, task_type, lane, attempt))
             return True
         except Exception as e:
             print(f"[Queue] 提交任务失败: {e}")
@@ -31,12 +76,20 @@ class RedisTaskQueue:
             result = self.redis_client.brpop(self.queue_key, timeout=timeout)
             if result:
                 queue_name, task_json = result
-                return json.loads(task_json)
+                return codec.loads(task_json)
             return None
         except Exception as e:
             print(f"[Queue] 获取任务失败: {e}")
             return None
 
+    def ack(self, task_data: dict) -> bool:
+        """确认任务已处理（列表队列BRPOP即出队，无需确认）"""
+        return True
+
+    def reclaim_pending(self, min_idle_ms: Optional[int] = None, count: int = 100) -> list[dict]:
+        """接管失联Worker的未确认任务（列表队列不支持，返回空）"""
+        return []
+
     def get_queue_length(self) -> int:
         """获取队列长度（使用连接池）"""
         try:
@@ -63,15 +116,16 @@ class RedisTaskQueue:
 
     # ====== 新增：批量操作 ======
 
-    def submit_batch(self, tasks: list[tuple[str, str]]) -> int:
-        """批量提交任务（使用pipeline优化）"""
+    def submit_batch(self, tasks: list[tuple]) -> int:
+        """批量提交任务（使用pipeline优化）
+
+        Args:
+            tasks: [(task_id, task_data[, task_type[, lane]]), ...]
+        """
         try:
             pipeline = self.redis_client.pipeline()
-            for task_id, task_data in tasks:
-                pipeline.lpush(self.queue_key, json.dumps({
-                    "task_id": task_id,
-                    "task_data": task_data
-                }))
+            for item in tasks:
+                pipeline.lpush(self.queue_key, build_task_payload(*item))
             pipeline.execute()
             return len(tasks)
         except Exception as e:
@@ -79,16 +133,34 @@ class RedisTaskQueue:
             return 0
 
     def get_tasks_batch(self, count: int = 10, timeout: int = 5) -> list[dict]:
-        """批量获取任务"""
+        """批量获取任务
+
+        一次阻塞等待（BRPOP，最多timeout秒）拿到第一条，
+        再用一次非阻塞的RPOP count取走其余最多count-1条：
+        空队列最多等待timeout秒，非空时整批只需2次往返。
+        """
         tasks = []
         try:
-            for _ in range(count):
-                result = self.redis_client.brpop(self.queue_key, timeout=1)
-                if not result:
-                    break
-                queue_name, task_json = result
-                tasks.append(json.loads(task_json))
+            result = self.redis_client.brpop(self.queue_key, timeout=timeout)
+            if not result:
+                return tasks
+            queue_name, task_json = result
+            tasks.append(codec.loads(task_json))
+
+            if count > 1:
+                for task_json in self._drain(count - 1):
+                    tasks.append(codec.loads(task_json))
             return tasks
         except Exception as e:
             print(f"[Queue] 批量获取失败: {e}")
             return tasks
+
+    def _drain(self, count: int) -> list[bytes]:
+        """非阻塞取走最多count条（Redis>=6.2用RPOP count，否则pipeline逐条RPOP）"""
+        try:
+            return self.redis_client.rpop(self.queue_key, count) or []
+        except redis.ResponseError:
+            pipeline = self.redis_client.pipeline(transaction=True)
+            for _ in range(count):
+                pipeline.rpop(self.queue_key)
+            return [item for item in pipeline.execute() if item is not None]
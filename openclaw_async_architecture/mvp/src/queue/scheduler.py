@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""延迟任务调度 + 失败重试 + 死信队列
+
+- 延迟/重试任务存放在有序集合SCHEDULED_KEY中（score为run_at时间戳），
+  Worker定期调用promote_due把到期任务移回任务队列（Lua原子领取，多Worker不重复）
+- 暂时性错误（HTTP 429/5xx、超时、连接失败）按抖动指数退避重试，
+  最多settings.retry_max_attempts次执行；用尽后进入死信队列
+- 死信队列：DLQ_KEY（有序集合，score为进入时间）+ DLQ_ENTRIES_KEY（哈希，task_id → 条目），
+  Gateway提供查看与重新入队接口
+- 计数写入RETRY_STATS_KEY（哈希），多进程汇总
+
+领取后、重新入队前进程崩溃会丢失该条调度（任务在存储中仍为pending），窗口仅一次往返。
+"""
+import random
+import re
+import time
+from typing import Optional
+import redis
+import redis.asyncio as aioredis
+from ..common import codec
+from ..common.config import settings
+from ..common.connection_pool import redis_pool
+
+
+SCHEDULED_KEY = "openclaw_tasks_scheduled"
+DLQ_KEY = "openclaw_tasks_dlq"
+DLQ_ENTRIES_KEY = "openclaw_tasks_dlq:entries"
+# 重试计数（hash字段: delayed / retry_scheduled / promoted / dead_lettered / requeued / attempt:N）
+RETRY_STATS_KEY = "openclaw:retry_stats"
+
+# 原子领取到期任务：取出并删除score <= now的前N条
+PROMOTE_SCRIPT = """
+local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #items > 0 then
+    redis.call('ZREM', KEYS[1], unpack(items))
+end
+return items
+"""
+
+_transient_pattern: Optional[re.Pattern] = None
+
+
+def is_transient_error(error: Optional[str]) -> bool:
+    """错误是否值得重试（匹配settings.retry_error_pattern，如HTTP 429/5xx、超时、连接失败）"""
+    global _transient_pattern
+    if not error:
+        return False
+    if _transient_pattern is None:
+        _transient_pattern = re.compile(settings.retry_error_pattern, re.IGNORECASE)
+    return bool(_transient_pattern.search(error))
+
+
+def retry_delay(
+    attempt: int,
+    base_delay: Optional[float] = None,
+    max_delay: Optional[float] = None,
+    rng: random.Random = random
+) -> float:
+    """第attempt次失败后的重试等待（指数退避 + 抖动，取[d/2, d]，避免同时失败的任务同时重试）"""
+    base_delay = settings.retry_base_delay if base_delay is None else base_delay
+    max_delay = settings.retry_max_delay if max_delay is None else max_delay
+    delay = min(max_delay, base_delay * (2 ** max(attempt - 1, 0)))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+def build_scheduled_message(
+    task_id: str,
+    task_data: str,
+    task_type: str = "v1",
+    lane: Optional[str] = None,
+    attempt: int = 0,
+    run_at: float = 0.0
+) -> bytes:
+    """构建调度消息（run_at使同一任务的多次调度成员不同）"""
+    message = {
+        "task_id": task_id,
+        "task_data": task_data,
+        "task_type": task_type,
+        "attempt": attempt,
+        "run_at": run_at
+    }
+    if lane:
+        message["lane"] = lane
+    return codec.dumps(message)
+
+
+def build_dead_letter(task_data: dict, error: Optional[str], attempts: int) -> bytes:
+    """构建死信条目"""
+    return codec.dumps({
+        "task_id": task_data["task_id"],
+        "task_data": task_data.get("task_data"),
+        "task_type": task_data.get("task_type") or "v1",
+        "lane": task_data.get("lane"),
+        "attempts": attempts,
+        "error": error,
+        "failed_at": time.time()
+    })
+
+
+class TaskScheduler:
+    """同步调度器（Worker端：失败重试、死信、到期任务回队）"""
+
+    def __init__(
+        self,
+        client: Optional[redis.Redis] = None,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None
+    ):
+        """初始化
+
+        Args:
+            client: bytes Redis客户端（默认共用连接池）
+            max_attempts: 最多执行次数（含首次，默认settings.retry_max_attempts）
+            base_delay: 首次重试等待秒数（默认settings.retry_base_delay）
+            max_delay: 重试等待上限秒数（默认settings.retry_max_delay）
+        """
+        self.redis_client = client or redis_pool.binary_client
+        self.max_attempts = settings.retry_max_attempts if max_attempts is None else max_attempts
+        self.base_delay = settings.retry_base_delay if base_delay is None else base_delay
+        self.max_delay = settings.retry_max_delay if max_delay is None else max_delay
+        self._promote = self.redis_client.register_script(PROMOTE_SCRIPT)
+
+    def handle_failure(self, task_data: dict, error: Optional[str], transient: bool) -> tuple[str, Optional[float]]:
+        """处理一次执行失败
+
+        Returns:
+            ("retry", 下次执行时间戳) / ("dead_letter", None)：暂时性失败且次数用尽 /
+            ("failed", None)：非暂时性失败，不重试
+        """
+        if not transient:
+            return "failed", None
+
+        attempts = int(task_data.get("attempt") or 0) + 1
+        if attempts >= self.max_attempts:
+            self.dead_letter(task_data, error, attempts)
+            return "dead_letter", None
+
+        run_at = time.time() + retry_delay(attempts, self.base_delay, self.max_delay)
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.zadd(SCHEDULED_KEY, {build_scheduled_message(
+            task_data["task_id"], task_data.get("task_data"), task_data.get("task_type") or "v1",
+            task_data.get("lane"), attempts, run_at
+        ): run_at})
+        pipeline.hincrby(RETRY_STATS_KEY, "retry_scheduled", 1)
+        pipeline.hincrby(RETRY_STATS_KEY, f"attempt:{attempts}", 1)
+        pipeline.execute()
+        return "retry", run_at
+
+    def dead_letter(self, task_data: dict, error: Optional[str], attempts: int):
+        """放入死信队列"""
+        pipeline = self.redis_client.pipeline(transaction=True)
+        pipeline.hset(DLQ_ENTRIES_KEY, task_data["task_id"], build_dead_letter(task_data, error, attempts))
+        pipeline.zadd(DLQ_KEY, {task_data["task_id"]: time.time()})
+        pipeline.hincrby(RETRY_STATS_KEY, "dead_lettered", 1)
+        pipeline.execute()
+
+    def promote_due(self, queue, now: Optional[float] = None, limit: int = 100) -> int:
+        """把到期的延迟/重试任务移回任务队列，返回移动数量"""
+        items = self._promote(keys=[SCHEDULED_KEY], args=[now or time.time(), limit])
+        promoted = 0
+        for item in items:
+            message = codec.loads(item)
+            submitted = queue.submit(
+                message["task_id"], message["task_data"], message.get("task_type") or "v1",
+                message.get("lane"), attempt=message.get("attempt", 0)
+            )
+            if submitted:
+                promoted += 1
+            else:
+                # 入队失败：放回，下次再试
+                self.redis_client.zadd(SCHEDULED_KEY, {item: message.get("run_at") or time.time()})
+        if promoted:
+            self.redis_client.hincrby(RETRY_STATS_KEY, "promoted", promoted)
+        return promoted
+
+
+class AsyncTaskScheduler:
+    """异步调度器（Gateway端：延迟提交、死信查看与重新入队）"""
+
+    def __init__(self, client: Optional[aioredis.Redis] = None):
+        """初始化
+
+        Args:
+            client: asyncio bytes Redis客户端（默认共用连接池）
+        """
+        self.redis_client = client or redis_pool.async_binary_client
+
+    async def schedule(
+        self,
+        task_id: str,
+        task_data: str,
+        task_type: str = "v1",
+        lane: Optional[str] = None,
+        run_at: float = 0.0
+    ) -> bool:
+        """安排任务在run_at（时间戳）之后执行"""
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            pipeline.zadd(SCHEDULED_KEY, {build_scheduled_message(task_id, task_data, task_type, lane, 0, run_at): run_at})
+            pipeline.hincrby(RETRY_STATS_KEY, "delayed", 1)
+            await pipeline.execute()
+            return True
+        except Exception as e:
+            print(f"[Scheduler] 安排延迟任务失败: {e}")
+            return False
+
+    async def list_dead(self, limit: int = 50, offset: int = 0) -> list[dict]:
+        """死信列表（最近进入的在前）"""
+        task_ids = await self.redis_client.zrevrange(DLQ_KEY, offset, offset + limit - 1)
+        if not task_ids:
+            return []
+        entries = await self.redis_client.hmget(DLQ_ENTRIES_KEY, task_ids)
+        return [codec.loads(entry) for entry in entries if entry]
+
+    async def get_dead(self, task_id: str) -> Optional[dict]:
+        """单条死信"""
+        entry = await self.redis_client.hget(DLQ_ENTRIES_KEY, task_id)
+        return codec.loads(entry) if entry else None
+
+    async def remove_dead(self, task_id: str) -> bool:
+        """从死信队列删除（返回是否存在）"""
+        pipeline = self.redis_client.pipeline(transaction=True)
+        pipeline.zrem(DLQ_KEY, task_id)
+        pipeline.hdel(DLQ_ENTRIES_KEY, task_id)
+        removed, _ = await pipeline.execute()
+        return bool(removed)
+
+    async def requeue_dead(self, task_id: str, queue) -> Optional[dict]:
+        """死信重新入队（重试次数从零计），返回原条目；不存在时返回None"""
+        entry = await self.get_dead(task_id)
+        if entry is None:
+            return None
+        if not await queue.submit(entry["task_id"], entry["task_data"], entry.get("task_type") or "v1", entry.get("lane")):
+            raise RuntimeError("重新入队失败")
+        await self.remove_dead(task_id)
+        await self.redis_client.hincrby(RETRY_STATS_KEY, "requeued", 1)
+        return entry
+
+    async def get_stats(self) -> dict:
+        """重试/死信计数与当前规模（/health）"""
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            pipeline.hgetall(RETRY_STATS_KEY)
+            pipeline.zcard(SCHEDULED_KEY)
+            pipeline.zcard(DLQ_KEY)
+            counts, scheduled, dead = await pipeline.execute()
+        except Exception:
+            counts, scheduled, dead = {}, 0, 0
+        counts = {key.decode(): int(value) for key, value in counts.items()}
+        return {
+            "scheduled": scheduled,
+            "dead_letter": dead,
+            "delayed": counts.get("delayed", 0),
+            "retry_scheduled": counts.get("retry_scheduled", 0),
+            "promoted": counts.get("promoted", 0),
+            "dead_lettered": counts.get("dead_lettered", 0),
+            "requeued": counts.get("requeued", 0),
+            "retries_by_attempt": {
+                key.split(":", 1)[1]: value for key, value in counts.items() if key.startswith("attempt:")
+            },
+            "max_attempts": settings.retry_max_attempts
+        }
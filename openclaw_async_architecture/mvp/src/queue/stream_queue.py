@@ -0,0 +1,250 @@
+"""Redis Streams任务队列 - 消费组 + ack，Worker崩溃不丢任务"""
+import os
+import socket
+from typing import Optional
+import redis
+from ..common.config import settings
+from ..common.connection_pool import redis_pool
+from .redis_queue import build_task_message
+
+
+STREAM_KEY = "openclaw_tasks_stream"
+
+
+def _consumer_name() -> str:
+    """默认消费者名：主机名-进程号（同一消费组内唯一）"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _entry_to_task(entry_id: str, fields: dict) -> dict:
+    """Stream条目 → 与列表队列一致的任务字典（附带entry_id用于ack）"""
+    return {
+        "task_id": fields.get("task_id"),
+        "task_data": fields.get("task_data"),
+        "task_type": fields.get("task_type", "v1"),
+        "enqueued_at": float(fields.get("enqueued_at", 0)),
+        "lane": fields.get("lane"),
+        "attempt": int(fields.get("attempt", 0)),
+        "entry_id": entry_id
+    }
+
+
+class RedisStreamTaskQueue:
+    """
+    Redis Streams任务队列
+
+    与RedisTaskQueue接口一致，差异：
+    - XREADGROUP投递后条目进入PEL（待确认列表），处理完ack才移除
+    - Worker崩溃时，其未确认条目空闲超过claim_idle_ms后由其他Worker XAUTOCLAIM接管
+    - 同一消费组内多个Worker公平分配，一次往返可读取N条
+    """
+
+    def __init__(
+        self,
+        stream_key: str = STREAM_KEY,
+        group: Optional[str] = None,
+        consumer_name: Optional[str] = None
+    ):
+        """初始化（使用连接池）"""
+        self.redis_client = redis_pool.client
+        self.stream_key = stream_key
+        self.group = group or settings.stream_group
+        self.consumer_name = consumer_name or _consumer_name()
+        self.claim_idle_ms = settings.stream_claim_idle_ms
+        self._group_ready = False
+
+    def _ensure_group(self):
+        """创建消费组（已存在则忽略）"""
+        if self._group_ready:
+            return
+        try:
+            self.redis_client.xgroup_create(self.stream_key, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def submit(
+        self,
+        task_id: str,
+        task_data: str,
+        task_type: str = "v1",
+        lane: Optional[str] = None,
+        attempt: int = 0
+    ) -> bool:
+        """提交任务（XADD）"""
+        try:
+            self.redis_client.xadd(self.stream_key, build_task_message(task_id, task_data, task_type, lane, attempt))
+            return True
+        except Exception as e:
+            print(f"[StreamQueue] 提交任务失败: {e}")
+            return False
+
+    def submit_batch(self, tasks: list[tuple]) -> int:
+        """批量提交任务（pipeline）"""
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for item in tasks:
+                pipeline.xadd(self.stream_key, build_task_message(*item))
+            pipeline.execute()
+            return len(tasks)
+        except Exception as e:
+            print(f"[StreamQueue] 批量提交失败: {e}")
+            return 0
+
+    def get_task(self, timeout: int = 5) -> Optional[dict]:
+        """获取一个任务（阻塞）"""
+        tasks = self.get_tasks_batch(count=1, timeout=timeout)
+        return tasks[0] if tasks else None
+
+    def get_tasks_batch(self, count: int = 10, timeout: int = 5) -> list[dict]:
+        """批量获取任务（一次XREADGROUP往返，最多阻塞timeout秒）"""
+        try:
+            self._ensure_group()
+            response = self.redis_client.xreadgroup(
+                self.group,
+                self.consumer_name,
+                {self.stream_key: ">"},
+                count=count,
+                block=timeout * 1000
+            )
+            tasks = []
+            for _stream, entries in response or []:
+                for entry_id, fields in entries:
+                    tasks.append(_entry_to_task(entry_id, fields))
+            return tasks
+        except Exception as e:
+            print(f"[StreamQueue] 批量获取失败: {e}")
+            return []
+
+    def ack(self, task_data: dict) -> bool:
+        """确认任务已处理（XACK + XDEL，保持Stream精简）"""
+        entry_id = task_data.get("entry_id")
+        if not entry_id:
+            return False
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            pipeline.xack(self.stream_key, self.group, entry_id)
+            pipeline.xdel(self.stream_key, entry_id)
+            pipeline.execute()
+            return True
+        except Exception as e:
+            print(f"[StreamQueue] 确认失败: {e}")
+            return False
+
+    def reclaim_pending(self, min_idle_ms: Optional[int] = None, count: int = 100) -> list[dict]:
+        """接管失联Worker的未确认任务（XAUTOCLAIM）
+
+        Args:
+            min_idle_ms: 空闲超过该时长的条目才会被接管（默认settings.stream_claim_idle_ms）
+            count: 最多接管条数
+
+        Returns:
+            接管到的任务（已归属当前消费者，处理后需ack）
+        """
+        if min_idle_ms is None:
+            min_idle_ms = self.claim_idle_ms
+
+        tasks = []
+        start_id = "0-0"
+        try:
+            self._ensure_group()
+            while len(tasks) < count:
+                response = self.redis_client.xautoclaim(
+                    self.stream_key,
+                    self.group,
+                    self.consumer_name,
+                    min_idle_time=min_idle_ms,
+                    start_id=start_id,
+                    count=count - len(tasks)
+                )
+                start_id, entries = response[0], response[1]
+                for entry_id, fields in entries:
+                    if fields:  # 已被删除的条目为None
+                        tasks.append(_entry_to_task(entry_id, fields))
+                if start_id in ("0-0", b"0-0"):
+                    break
+            if tasks:
+                print(f"[StreamQueue] 接管 {len(tasks)} 个未确认任务")
+            return tasks
+        except Exception as e:
+            print(f"[StreamQueue] 接管失败: {e}")
+            return tasks
+
+    def get_pending_count(self) -> int:
+        """已投递未确认的任务数"""
+        try:
+            self._ensure_group()
+            return self.redis_client.xpending(self.stream_key, self.group)["pending"]
+        except Exception:
+            return 0
+
+    def get_queue_length(self) -> int:
+        """获取队列长度（含已投递未确认的任务）"""
+        try:
+            return self.redis_client.xlen(self.stream_key)
+        except Exception:
+            return 0
+
+    def clear(self) -> bool:
+        """清空队列（连同消费组）"""
+        try:
+            self.redis_client.delete(self.stream_key)
+            self._group_ready = False
+            return True
+        except Exception as e:
+            print(f"[StreamQueue] 清空队列失败: {e}")
+            return False
+
+    def test_connection(self) -> bool:
+        """测试Redis连接"""
+        try:
+            self.redis_client.ping()
+            return True
+        except Exception:
+            return False
+
+
+class AsyncRedisStreamTaskQueue:
+    """异步Streams队列（生产者端，Gateway专用）"""
+
+    def __init__(self, stream_key: str = STREAM_KEY):
+        """初始化（使用asyncio连接池）"""
+        self.redis_client = redis_pool.async_client
+        self.stream_key = stream_key
+
+    async def submit(self, task_id: str, task_data: str, task_type: str = "v1", lane: Optional[str] = None) -> bool:
+        """提交任务（XADD）"""
+        try:
+            await self.redis_client.xadd(self.stream_key, build_task_message(task_id, task_data, task_type, lane))
+            return True
+        except Exception as e:
+            print(f"[AsyncStreamQueue] 提交任务失败: {e}")
+            return False
+
+    async def submit_batch(self, tasks: list[tuple]) -> int:
+        """批量提交任务（pipeline，一次往返）"""
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for item in tasks:
+                pipeline.xadd(self.stream_key, build_task_message(*item))
+            await pipeline.execute()
+            return len(tasks)
+        except Exception as e:
+            print(f"[AsyncStreamQueue] 批量提交失败: {e}")
+            return 0
+
+    async def get_queue_length(self) -> int:
+        """获取队列长度（含已投递未确认的任务）"""
+        try:
+            return await self.redis_client.xlen(self.stream_key)
+        except Exception:
+            return 0
+
+    async def test_connection(self) -> bool:
+        """测试Redis连接"""
+        try:
+            await self.redis_client.ping()
+            return True
+        except Exception:
+            return False
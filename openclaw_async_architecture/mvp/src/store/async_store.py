@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""异步混合存储 - Gateway专用（redis.asyncio + SQLite专用写线程）"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from ..common.codec import dumps_task, loads_task
+from ..common.models import Task
+from ..common.connection_pool import redis_pool
+from .hybrid_store import HybridTaskStore, _storage_mode
+
+
+class AsyncHybridTaskStore:
+    """
+    异步混合任务存储
+
+    - L1: redis.asyncio（事件循环内直接await）
+    - L3: SQLite写入统一交给单个专用线程（串行写，不阻塞事件循环）
+          读取走默认线程池
+
+    SQL与缓存格式复用HybridTaskStore，Worker端读写完全兼容。
+    """
+
+    def __init__(self, sync_store: Optional[HybridTaskStore] = None):
+        """初始化
+
+        Args:
+            sync_store: 复用的同步存储（提供SQLite读写实现）
+        """
+        self.store = sync_store or HybridTaskStore()
+        self.redis_client = redis_pool.async_client
+        self.binary_client = redis_pool.async_binary_client
+        self.result_prefix = self.store.result_prefix
+        self.cache_ttl = self.store.cache_ttl
+
+        # SQLite专用写线程（单线程 = 写入天然串行）
+        self._sqlite_writer = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="sqlite-writer"
+        )
+        # 归档单独一个线程：一轮归档可能持续数分钟，不能占住写线程；
+        # 每批归档是独立的写事务（连接池写锁串行），批次之间提交任务的写入照常进行
+        self._retention_runner = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="sqlite-retention"
+        )
+
+    async def save_task(self, task: Task) -> bool:
+        """保存任务（双层写入，全程不阻塞事件循环）"""
+        success = True
+
+        # L1: Redis缓存
+        try:
+            await self.redis_client.setex(
+                f"{self.result_prefix}{task.id}",
+                self.store.cache_ttl_for(task),
+                dumps_task(task)
+            )
+        except Exception as e:
+            print(f"[L1-Redis] 保存失败: {e}")
+            success = False
+
+        # L3: SQLite持久化（专用写线程）
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._sqlite_writer, self.store._persist_task, task)
+        except Exception as e:
+            print(f"[L3-SQLite] 保存失败: {e}")
+            success = False
+
+        return success
+
+    async def save_tasks(self, tasks: list[Task]) -> bool:
+        """批量保存任务（Redis一次pipeline + SQLite一次executemany事务）"""
+        success = True
+
+        # L1: Redis缓存
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for task in tasks:
+                pipeline.setex(f"{self.result_prefix}{task.id}", self.store.cache_ttl_for(task), dumps_task(task))
+            await pipeline.execute()
+        except Exception as e:
+            print(f"[L1-Redis] 批量保存失败: {e}")
+            success = False
+
+        # L3: SQLite持久化（专用写线程）
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._sqlite_writer, self.store._persist_tasks, tasks)
+        except Exception as e:
+            print(f"[L3-SQLite] 批量保存失败: {e}")
+            success = False
+
+        return success
+
+    async def get_task(self, task_id: str) -> Optional[Task]:
+        """获取任务（先查Redis缓存，未命中查SQLite）"""
+        # L1: Redis缓存
+        try:
+            cached = await self.binary_client.get(f"{self.result_prefix}{task_id}")
+            if cached:
+                return loads_task(cached)
+        except Exception:
+            pass
+
+        # L3: SQLite（线程池读取）
+        try:
+            loop = asyncio.get_running_loop()
+            task = await loop.run_in_executor(None, self.store._load_from_sqlite, task_id)
+            if task:
+                # 回写Redis缓存
+                try:
+                    await self.redis_client.setex(
+                        f"{self.result_prefix}{task.id}",
+                        self.store.cache_ttl_for(task),
+                        dumps_task(task)
+                    )
+                except Exception:
+                    pass
+
+                return task
+        except Exception as e:
+            print(f"[L3-SQLite] 查询失败: {e}")
+
+        return None
+
+    async def list_tasks_page(
+        self,
+        status: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 50
+    ) -> tuple[list[Task], Optional[str]]:
+        """游标分页列出任务（线程池读取，见HybridTaskStore.list_tasks_page）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.store.list_tasks_page, status, after, limit
+        )
+
+    async def get_statistics(self) -> dict:
+        """按状态统计任务数（计数表，常数时间）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.store.get_statistics)
+
+    async def reconcile_statistics(self) -> dict:
+        """校正状态计数（在专用写线程执行）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._sqlite_writer, self.store.reconcile_statistics)
+
+    async def run_retention(self) -> dict[str, int]:
+        """执行一轮归档（在归档线程执行，不阻塞任务写入）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._retention_runner, self.store.run_retention)
+
+    async def test_connection(self) -> dict:
+        """测试存储连接"""
+        redis_ok = False
+        try:
+            await self.redis_client.ping()
+            redis_ok = True
+        except Exception:
+            pass
+
+        loop = asyncio.get_running_loop()
+        sqlite_ok = await loop.run_in_executor(None, self._check_sqlite)
+
+        return {
+            "redis_connected": redis_ok,
+            "sqlite_connected": sqlite_ok,
+            "storage_mode": _storage_mode(redis_ok, sqlite_ok)
+        }
+
+    def _check_sqlite(self) -> bool:
+        try:
+            with self.store.sqlite_pool.read_connection() as conn:
+                conn.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        """等待写线程处理完剩余写入后关闭（batched模式同时落盘合并队列）"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._sqlite_writer.shutdown, True)
+        await loop.run_in_executor(None, self._retention_runner.shutdown, True)
+        await loop.run_in_executor(None, self.store.flush)
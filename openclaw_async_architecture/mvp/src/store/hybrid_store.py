@@ -1,10 +1,38 @@
 # -*- coding: utf-8 -*-
 """混合存储：SQLite（L3）+ Redis（L1缓存）- Phase 2优化版"""
+import base64
 import json
+from datetime import datetime, timezone
 from typing import Optional
+from ..common.codec import dumps_task, loads_task
+from ..common.compression import compress_text, decompress_text
 from ..common.config import settings
 from ..common.models import Task
-from ..common.connection_pool import redis_pool, sqlite_pool
+from ..common.connection_pool import SQLiteConnectionPool, redis_pool, sqlite_pool
+from ..common.redis_keys import unlink_matching
+from ..common.task_events import TASK_EVENTS_CHANNEL, build_task_event
+from .retention import TaskRetention
+from .sqlite_writer import SQLiteWriteBehindWriter
+
+
+# UPSERT：冲突时保留原created_at（INSERT OR REPLACE会先删后插，重置created_at）
+UPSERT_TASK_SQL = '''
+    INSERT INTO tasks
+    (task_id, content, status, result, error, metadata, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(task_id) DO UPDATE SET
+        content = excluded.content,
+        status = excluded.status,
+        result = excluded.result,
+        error = excluded.error,
+        metadata = excluded.metadata,
+        updated_at = excluded.updated_at
+'''
+
+SELECT_TASK_SQL = '''
+    SELECT task_id, content, status, result, error, metadata, created_at, updated_at
+    FROM tasks WHERE task_id = ?
+'''
 
 
 class HybridTaskStore:
@@ -17,23 +45,50 @@ class HybridTaskStore:
 
     Phase 2优化：
     - 使用Redis连接池（max_connections=10）
-    - 使用SQLite连接复用
+    - 使用SQLite连接复用（读取走只读连接池，与写入并发）
     - 添加事务管理
+
+    大结果（超过settings.result_compress_threshold字节）在两层都压缩存储，
+    get_task / 列表查询读取时透明解压。
+
+    保留策略（见retention模块）：超期任务由run_retention()移入月度归档库，
+    get_task在热表未命中时自动查找归档；Redis缓存TTL可按状态配置（settings.cache_ttl_by_status）。
+
+    持久化模式（settings.sqlite_durability）：
+    - sync: 每次写入立即提交
+    - batched: 写入交给SQLiteWriteBehindWriter合并提交（group commit），
+      SQLite最多滞后flush间隔；L1缓存立即可见
     """
 
-    def __init__(self):
-        """初始化（使用连接池）"""
-        # L1: Redis连接池
+    def __init__(self, pool: Optional[SQLiteConnectionPool] = None):
+        """初始化（使用连接池）
+
+        Args:
+            pool: SQLite连接池（默认全局sqlite_pool；测试/压测可传入独立数据库）
+        """
+        # L1: Redis连接池（缓存值由codec编码，读取走bytes客户端）
         self.redis_client = redis_pool.client
+        self.binary_client = redis_pool.binary_client
         self.result_prefix = "tasks:cached:"
+        self.cache_ttl = 3600
+        self.cache_ttl_by_status = settings.cache_ttl_by_status
 
         # L3: SQLite连接池
-        self.sqlite_pool = sqlite_pool
+        self.sqlite_pool = pool or sqlite_pool
+        self.durability = settings.sqlite_durability
+        self.sqlite_writer: Optional[SQLiteWriteBehindWriter] = None
+        self.retention = TaskRetention(self.sqlite_pool)
 
         try:
             # 预连接SQLite
             self.sqlite_pool.get_connection()
-            print("[Store] SQLite L3持久化层已初始化 [OK]")
+            if self.durability == "batched":
+                self.sqlite_writer = SQLiteWriteBehindWriter(
+                    self.sqlite_pool,
+                    flush_interval_ms=settings.sqlite_flush_interval_ms,
+                    batch_size=settings.sqlite_flush_batch_size
+                )
+            print(f"[Store] SQLite L3持久化层已初始化 [OK] (模式: {self.durability})")
         except Exception as e:
             print(f"[Store] SQLite初始化失败（降级为仅Redis模式）: {e}")
 
@@ -43,69 +98,117 @@ class HybridTaskStore:
 
         # L1: Redis缓存（1小时）
         try:
-            self.redis_client.setex(
-                f"{self.result_prefix}{task.id}",
-                3600,
-                task.model_dump_json()
-            )
+            self._cache_task(task)
         except Exception as e:
             print(f"[L1-Redis] 保存失败: {e}")
             success = False
 
         # L3: SQLite持久化（使用事务）
         try:
-            with self.sqlite_pool.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT OR REPLACE INTO tasks
-                    (task_id, content, status, result, error, metadata, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                ''', (
-                    task.id,
-                    task.content,
-                    task.status,
-                    task.result,
-                    task.error,
-                    json.dumps(task.metadata, ensure_ascii=False)
-                ))
+            self._persist_task(task)
         except Exception as e:
             print(f"[L3-SQLite] 保存失败: {e}")
             success = False
 
+        # 通知等待方（Gateway长轮询 / SSE），L1已写入，收到事件即可读到新状态
+        self.publish_task_event(task)
+
+        return success
+
+    def publish_task_event(self, task: Task):
+        """发布任务状态事件（失败不影响保存）"""
+        try:
+            self.redis_client.publish(TASK_EVENTS_CHANNEL, build_task_event(task))
+        except Exception as e:
+            print(f"[Store] 事件发布失败: {e}")
+
+    def save_tasks(self, tasks: list[Task]) -> bool:
+        """批量保存任务（Redis一次pipeline + SQLite一次executemany事务）"""
+        success = True
+
+        # L1: Redis缓存
+        try:
+            self._cache_tasks(tasks)
+        except Exception as e:
+            print(f"[L1-Redis] 批量保存失败: {e}")
+            success = False
+
+        # L3: SQLite持久化
+        try:
+            self._persist_tasks(tasks)
+        except Exception as e:
+            print(f"[L3-SQLite] 批量保存失败: {e}")
+            success = False
+
         return success
 
+    def _cache_tasks(self, tasks: list[Task]):
+        """批量写入L1 Redis缓存（单次pipeline往返）"""
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for task in tasks:
+            pipeline.setex(f"{self.result_prefix}{task.id}", self.cache_ttl_for(task), dumps_task(task))
+        pipeline.execute()
+
+    def _persist_tasks(self, tasks: list[Task]):
+        """批量写入L3 SQLite（sync模式单事务executemany；batched模式整体入队）"""
+        params_list = [_task_params(task) for task in tasks]
+
+        if self.sqlite_writer:
+            for params in params_list:
+                self.sqlite_writer.enqueue(UPSERT_TASK_SQL, params)
+            return
+
+        with self.sqlite_pool.transaction() as conn:
+            conn.executemany(UPSERT_TASK_SQL, params_list)
+
+    def _cache_task(self, task: Task):
+        """写入L1 Redis缓存"""
+        self.redis_client.setex(
+            f"{self.result_prefix}{task.id}",
+            self.cache_ttl_for(task),
+            dumps_task(task)
+        )
+
+    def cache_ttl_for(self, task: Task) -> int:
+        """任务缓存TTL（按状态配置，未配置时为cache_ttl）"""
+        return self.cache_ttl_by_status.get(task.status, self.cache_ttl)
+
+    def _persist_task(self, task: Task):
+        """写入L3 SQLite（异常由调用方处理）"""
+        self._execute_write(UPSERT_TASK_SQL, _task_params(task))
+
+    def _execute_write(self, sql: str, params: tuple):
+        """执行写语句：batched模式入队合并提交，sync模式立即提交"""
+        if self.sqlite_writer:
+            self.sqlite_writer.enqueue(sql, params)
+            return
+
+        with self.sqlite_pool.transaction() as conn:
+            conn.execute(sql, params)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待batched模式下已入队的写入全部落盘（sync模式直接返回）"""
+        if self.sqlite_writer:
+            return self.sqlite_writer.flush(timeout)
+        return True
+
     def get_task(self, task_id: str) -> Optional[Task]:
         """获取任务（先查Redis缓存，未命中查SQLite）"""
         # L1: Redis缓存
         try:
-            cached = self.redis_client.get(f"{self.result_prefix}{task_id}")
+            cached = self.binary_client.get(f"{self.result_prefix}{task_id}")
             if cached:
-                return Task.model_validate_json(cached)
+                return loads_task(cached)
         except Exception:
             pass
 
         # L3: SQLite
         try:
-            conn = self.sqlite_pool.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT task_id, content, status, result, error, metadata, created_at, updated_at
-                FROM tasks WHERE task_id = ?
-            ''', (task_id,))
-            row = cursor.fetchone()
-
-            if row:
+            task = self._load_from_sqlite(task_id)
+            if task:
                 # 回写Redis缓存
-                task_dict = dict(row)
-                task_dict['metadata'] = json.loads(task_dict['metadata'])
-                task = Task(**task_dict)
-
                 try:
-                    self.redis_client.setex(
-                        f"{self.result_prefix}{task.id}",
-                        3600,
-                        task.model_dump_json()
-                    )
+                    self._cache_task(task)
                 except Exception:
                     pass
 
@@ -115,29 +218,41 @@ class HybridTaskStore:
 
         return None
 
-    def update_task(self, task_id: str, **kwargs) -> bool:
-        """更新任务字段（使用连接池和事务）"""
-        try:
-            with self.sqlite_pool.transaction() as conn:
-                cursor = conn.cursor()
+    def _load_from_sqlite(self, task_id: str) -> Optional[Task]:
+        """从L3 SQLite读取任务，热表未命中时查找归档库（异常由调用方处理）"""
+        with self.sqlite_pool.read_connection() as conn:
+            row = conn.execute(SELECT_TASK_SQL, (task_id,)).fetchone()
 
-                # 构建动态更新语句
-                set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
-                values = list(kwargs.values()) + [task_id]
+        if not row:
+            row = self.retention.load_archived(task_id)
+        if not row:
+            return None
 
-                cursor.execute(f'''
-                    UPDATE tasks SET {set_clause}, updated_at = CURRENT_TIMESTAMP
-                    WHERE task_id = ?
-                ''', values)
+        return _row_to_task(row)
 
-                # 更新Redis缓存
-                try:
-                    if 'status' in kwargs or 'result' in kwargs or 'error' in kwargs:
-                        self.redis_client.delete(f"{self.result_prefix}{task_id}")
-                except Exception:
-                    pass
-
-                return True
+    def update_task(self, task_id: str, **kwargs) -> bool:
+        """更新任务字段（使用连接池和事务）"""
+        try:
+            if kwargs.get('result'):
+                kwargs['result'] = compress_text(kwargs['result'])
+
+            # 构建动态更新语句
+            set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
+            values = tuple(kwargs.values()) + (task_id,)
+
+            self._execute_write(f'''
+                UPDATE tasks SET {set_clause}, updated_at = CURRENT_TIMESTAMP
+                WHERE task_id = ?
+            ''', values)
+
+            # 更新Redis缓存
+            try:
+                if 'status' in kwargs or 'result' in kwargs or 'error' in kwargs:
+                    self.redis_client.delete(f"{self.result_prefix}{task_id}")
+            except Exception:
+                pass
+
+            return True
         except Exception as e:
             print(f"[Store] 更新失败: {e}")
             return False
@@ -155,9 +270,8 @@ class HybridTaskStore:
 
         # L3: SQLite
         try:
-            with self.sqlite_pool.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM tasks WHERE task_id = ?', (task_id,))
+            self._execute_write('DELETE FROM tasks WHERE task_id = ?', (task_id,))
+            self.retention.delete_archived(task_id)
         except Exception as e:
             print(f"[L3-SQLite] 删除失败: {e}")
             success = False
@@ -165,33 +279,59 @@ class HybridTaskStore:
         return success
 
     def list_tasks(self, status: Optional[str] = None, limit: int = 100) -> list[Task]:
-        """列出任务（使用连接池）"""
-        try:
-            conn = self.sqlite_pool.get_connection()
-            cursor = conn.cursor()
+        """列出最新的任务（使用连接池）"""
+        tasks, _next_cursor = self.list_tasks_page(status=status, limit=limit)
+        return tasks
+
+    def list_tasks_page(
+        self,
+        status: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 50
+    ) -> tuple[list[Task], Optional[str]]:
+        """按创建时间倒序分页列出任务（游标分页）
+
+        按(created_at, task_id)定位上一页末尾，走(status, created_at, task_id)索引，
+        翻到第N页的代价与第1页相同（OFFSET需要先扫过前面所有行）。
+
+        Args:
+            status: 按状态筛选（可选）
+            after: 上一页返回的游标（可选）
+            limit: 每页条数
+
+        Returns:
+            (任务列表, 下一页游标；没有更多时为None)
+
+        Raises:
+            ValueError: 游标格式无效
+        """
+        conditions = []
+        params: list = []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if after:
+            conditions.append("(created_at, task_id) < (?, ?)")
+            params.extend(decode_cursor(after))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
 
-            if status:
-                cursor.execute('''
-                    SELECT task_id, content, status, result, error, metadata, created_at, updated_at
-                    FROM tasks WHERE status = ? ORDER BY created_at DESC LIMIT ?
-                ''', (status, limit))
-            else:
-                cursor.execute('''
+        try:
+            with self.sqlite_pool.read_connection() as conn:
+                rows = conn.execute(f'''
                     SELECT task_id, content, status, result, error, metadata, created_at, updated_at
-                    FROM tasks ORDER BY created_at DESC LIMIT ?
-                ''', (limit,))
-
-            rows = cursor.fetchall()
-            tasks = []
-            for row in rows:
-                task_dict = dict(row)
-                task_dict['metadata'] = json.loads(task_dict['metadata'])
-                tasks.append(Task(**task_dict))
-
-            return tasks
+                    FROM tasks {where}
+                    ORDER BY created_at DESC, task_id DESC LIMIT ?
+                ''', (*params, limit + 1)).fetchall()
         except Exception as e:
             print(f"[Store] 查询失败: {e}")
-            return []
+            return [], None
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["task_id"])
+
+        return [_row_to_task(row) for row in rows], next_cursor
 
     def clear(self) -> bool:
         """清空所有任务（使用连接池）"""
@@ -199,27 +339,32 @@ class HybridTaskStore:
 
         # L1: Redis
         try:
-            # 删除所有缓存任务
-            keys = self.redis_client.keys(f"{self.result_prefix}*")
-            if keys:
-                self.redis_client.delete(*keys)
+            # 删除所有缓存任务（SCAN + 分批UNLINK，不阻塞同实例上的任务队列）
+            unlink_matching(self.redis_client, f"{self.result_prefix}*")
         except Exception as e:
             print(f"[L1-Redis] 清空失败: {e}")
             success = False
 
         # L3: SQLite
         try:
+            self.flush()
             with self.sqlite_pool.transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM tasks')
+                cursor.execute('DELETE FROM task_archive_index')
         except Exception as e:
             print(f"[L3-SQLite] 清空失败: {e}")
             success = False
 
         return success
 
+    def run_retention(self) -> dict[str, int]:
+        """执行一轮归档（batched模式先落盘），返回{状态: 归档数量}"""
+        self.flush()
+        return self.retention.run_once()
+
     def get_statistics(self) -> dict:
-        """获取存储统计（使用连接池）"""
+        """获取存储统计（读触发器维护的计数表，耗时与任务表大小无关）"""
         stats = {
             "total": 0,
             "pending": 0,
@@ -229,15 +374,12 @@ class HybridTaskStore:
         }
 
         try:
-            conn = self.sqlite_pool.get_connection()
-            cursor = conn.cursor()
+            with self.sqlite_pool.read_connection() as conn:
+                rows = conn.execute(
+                    "SELECT status, count FROM task_status_counts WHERE count > 0"
+                ).fetchall()
 
-            cursor.execute('''
-                SELECT status, COUNT(*) as count
-                FROM tasks GROUP BY status
-            ''')
-
-            for row in cursor.fetchall():
+            for row in rows:
                 status = row['status']
                 count = row['count']
                 stats[status] = count
@@ -248,9 +390,122 @@ class HybridTaskStore:
 
         return stats
 
+    def reconcile_statistics(self) -> dict:
+        """全表重新计数并校正计数表（定期任务，兜底触发器之外的改动）
+
+        在写事务内完成，期间写入会等待（百万行约1秒）。
+
+        Returns:
+            {状态: 实际数 - 计数表数}，无偏差时为空
+        """
+        self.flush()
+        with self.sqlite_pool.transaction() as conn:
+            actual = dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+            counted = dict(conn.execute("SELECT status, count FROM task_status_counts").fetchall())
+
+            drift = {
+                status: actual.get(status, 0) - counted.get(status, 0)
+                for status in set(actual) | set(counted)
+                if actual.get(status, 0) != counted.get(status, 0)
+            }
+            if drift:
+                conn.execute("DELETE FROM task_status_counts")
+                conn.executemany(
+                    "INSERT INTO task_status_counts (status, count) VALUES (?, ?)",
+                    actual.items()
+                )
+
+        if drift:
+            print(f"[Store] 状态计数已校正: {drift}")
+        return drift
+
+    def test_connection(self) -> dict:
+        """测试存储连接（供/health使用）"""
+        redis_ok = False
+        sqlite_ok = False
+
+        try:
+            self.redis_client.ping()
+            redis_ok = True
+        except Exception:
+            pass
+
+        try:
+            with self.sqlite_pool.read_connection() as conn:
+                conn.execute("SELECT 1")
+            sqlite_ok = True
+        except Exception:
+            pass
+
+        return {
+            "redis_connected": redis_ok,
+            "sqlite_connected": sqlite_ok,
+            "storage_mode": _storage_mode(redis_ok, sqlite_ok)
+        }
+
     def close(self):
-        """关闭连接池"""
+        """关闭连接池（batched模式先落盘剩余写入）"""
         try:
+            if self.sqlite_writer:
+                self.sqlite_writer.close()
             self.sqlite_pool.close()
         except Exception as e:
             print(f"[Store] 关闭失败: {e}")
+
+
+def utc_timestamp(value: datetime) -> str:
+    """写入SQLite的时间文本：统一为UTC（与CURRENT_TIMESTAMP一致），带时区的先换算；不带时区的按UTC处理"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(sep=' ')
+
+
+def _task_params(task: Task) -> tuple:
+    """Task → UPSERT_TASK_SQL参数"""
+    return (
+        task.id,
+        task.content,
+        task.status,
+        compress_text(task.result),
+        task.error,
+        json.dumps(task.metadata, ensure_ascii=False),
+        utc_timestamp(task.created_at)
+    )
+
+
+def encode_cursor(created_at: str, task_id: str) -> str:
+    """分页游标：上一页最后一行的(created_at, task_id)，URL安全的base64"""
+    raw = json.dumps([created_at, task_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """解析分页游标（无效时抛出ValueError）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, task_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+    if not isinstance(created_at, str) or not isinstance(task_id, str):
+        raise ValueError(f"无效的分页游标: {cursor}")
+    return created_at, task_id
+
+
+def _row_to_task(row) -> Task:
+    """SQLite行 → Task（列名task_id对应模型字段id）"""
+    task_dict = dict(row)
+    task_dict['id'] = task_dict.pop('task_id')
+    task_dict['result'] = decompress_text(task_dict['result'])
+    task_dict['metadata'] = json.loads(task_dict['metadata'] or '{}')
+    return Task(**task_dict)
+
+
+def _storage_mode(redis_ok: bool, sqlite_ok: bool) -> str:
+    """根据各层连接状态描述存储模式"""
+    if redis_ok and sqlite_ok:
+        return "hybrid"
+    if sqlite_ok:
+        return "sqlite_only"
+    if redis_ok:
+        return "redis_only"
+    return "unavailable"
@@ -1,8 +1,7 @@
 """Redis结果存储"""
-import redis
 import json
 from typing import Optional
-from ..common.config import settings
+from ..common.connection_pool import redis_pool
 from ..common.models import Task
 
 
@@ -10,13 +9,7 @@ class RedisTaskStore:
     """Redis任务结果存储"""
 
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=settings.redis_host,
-            port=settings.redis_port,
-            db=settings.redis_db,
-            password=settings.redis_password,
-            decode_responses=True
-        )
+        self.redis_client = redis_pool.client
         self.result_prefix = "tasks:result:"
 
     def save_task(self, task: Task) -> bool:
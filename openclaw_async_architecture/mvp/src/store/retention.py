@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""任务保留与归档 - 热表只保留近期任务
+
+- 按状态配置保留天数（settings.retention_days，如completed:30,failed:90），
+  未配置的状态（pending / running）不归档
+- 超期任务按created_at月份移入归档库 archive_dir/tasks_YYYY_MM.db（表结构与tasks相同，
+  大结果保持压缩BLOB原样），热库task_archive_index记录task_id → 归档月份
+- 每轮归档后分批incremental_vacuum回收空闲页，热库文件与索引随之缩小
+- get_task在热表未命中时经task_archive_index到归档库查找
+
+归档后的任务不再计入状态计数与列表查询（两者只覆盖热表）。
+
+用法（手动执行一轮 / 已有库一次性转换为增量vacuum）：
+    python -m src.store.retention --run
+    python -m src.store.retention --enable-incremental-vacuum
+"""
+import argparse
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from ..common.config import settings
+from ..common.connection_pool import SQLiteConnectionPool, sqlite_pool
+
+
+TASK_COLUMNS = "task_id, content, status, result, error, metadata, created_at, updated_at"
+
+ARCHIVE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        task_id TEXT PRIMARY KEY,
+        content TEXT NOT NULL,
+        status TEXT DEFAULT 'pending',
+        result TEXT,
+        error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        metadata TEXT DEFAULT '{}'
+    )
+'''
+
+# 每次incremental_vacuum释放的页数（分批持有写锁，不长时间阻塞写入）
+VACUUM_PAGES = 1000
+
+
+def archive_month(created_at: str) -> str:
+    """created_at（YYYY-MM-DD HH:MM:SS）→ 归档月份（YYYY_MM）"""
+    return created_at[:7].replace("-", "_")
+
+
+class TaskRetention:
+    """任务归档器（热库 → 月度归档库）"""
+
+    def __init__(
+        self,
+        pool: Optional[SQLiteConnectionPool] = None,
+        archive_dir: Optional[str] = None,
+        retention_days: Optional[dict[str, int]] = None,
+        batch_size: Optional[int] = None
+    ):
+        """初始化
+
+        Args:
+            pool: 热库连接池（默认全局sqlite_pool）
+            archive_dir: 归档库目录（默认settings.archive_dir，未设置时为热库目录下的archive）
+            retention_days: {状态: 保留天数}（默认settings.retention_days）
+            batch_size: 每批移动的任务数（默认settings.retention_batch_size）
+        """
+        self.pool = pool or sqlite_pool
+        self.archive_dir = Path(archive_dir or settings.archive_dir or Path(self.pool.db_path).parent / "archive")
+        self.retention_days = settings.retention_days if retention_days is None else retention_days
+        self.batch_size = batch_size or settings.retention_batch_size
+
+    def run_once(self, now: Optional[datetime] = None) -> dict[str, int]:
+        """归档一轮：移动所有超期任务并回收空间
+
+        Returns:
+            {状态: 归档数量}
+        """
+        # created_at为UTC（见hybrid_store.utc_timestamp）
+        now = now or datetime.utcnow()
+        archived: dict[str, int] = {}
+
+        for status, days in self.retention_days.items():
+            cutoff = (now - timedelta(days=days)).isoformat(sep=' ')
+            while True:
+                selected, moved = self._archive_batch(status, cutoff)
+                if moved:
+                    archived[status] = archived.get(status, 0) + moved
+                if selected < self.batch_size:
+                    break
+
+        if archived:
+            freed = self.reclaim_space()
+            print(f"[Retention] 已归档 {archived}，回收 {freed} 页")
+        return archived
+
+    def _archive_batch(self, status: str, cutoff: str) -> tuple[int, int]:
+        """移动一批超期任务：先写入归档库并提交，再删除热表行（重复执行幂等）
+
+        读出后状态已改变（如死信重新入队）的任务不会被删除，撤销其归档副本与定位索引。
+
+        Returns:
+            (本批读出的行数, 实际归档的任务数)
+        """
+        with self.pool.read_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {TASK_COLUMNS} FROM tasks
+                WHERE status = ? AND created_at < ?
+                ORDER BY created_at LIMIT ?
+            ''', (status, cutoff, self.batch_size)).fetchall()
+
+        if not rows:
+            return 0, 0
+
+        by_month: dict[str, list[tuple]] = {}
+        for row in rows:
+            by_month.setdefault(archive_month(row["created_at"]), []).append(tuple(row))
+
+        for month, month_rows in by_month.items():
+            conn = self._open_archive(month)
+            try:
+                with conn:
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO tasks ({TASK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        month_rows
+                    )
+            finally:
+                conn.close()
+
+        skipped: dict[str, list[str]] = {}
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO task_archive_index (task_id, archive) VALUES (?, ?)",
+                [(row[0], month) for month, month_rows in by_month.items() for row in month_rows]
+            )
+            for month, month_rows in by_month.items():
+                for row in month_rows:
+                    cursor = conn.execute("DELETE FROM tasks WHERE task_id = ? AND status = ?", (row[0], status))
+                    if cursor.rowcount == 0:
+                        skipped.setdefault(month, []).append(row[0])
+            if skipped:
+                conn.executemany(
+                    "DELETE FROM task_archive_index WHERE task_id = ?",
+                    [(task_id,) for task_ids in skipped.values() for task_id in task_ids]
+                )
+
+        for month, task_ids in skipped.items():
+            conn = self._open_archive(month)
+            try:
+                with conn:
+                    conn.executemany("DELETE FROM tasks WHERE task_id = ?", [(task_id,) for task_id in task_ids])
+            finally:
+                conn.close()
+
+        return len(rows), len(rows) - sum(len(task_ids) for task_ids in skipped.values())
+
+    def _archive_path(self, month: str) -> Path:
+        return self.archive_dir / f"tasks_{month}.db"
+
+    def _open_archive(self, month: str) -> sqlite3.Connection:
+        """打开（必要时创建）月度归档库"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self._archive_path(month))
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute(ARCHIVE_SCHEMA)
+        return conn
+
+    def load_archived(self, task_id: str) -> Optional[sqlite3.Row]:
+        """按task_id读取已归档的任务行（未归档返回None）"""
+        with self.pool.read_connection() as conn:
+            hit = conn.execute(
+                "SELECT archive FROM task_archive_index WHERE task_id = ?", (task_id,)
+            ).fetchone()
+
+        if not hit:
+            return None
+        path = self._archive_path(hit["archive"])
+        if not path.exists():
+            return None
+
+        conn = sqlite3.connect(path.absolute().as_uri() + "?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            return conn.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        finally:
+            conn.close()
+
+    def delete_archived(self, task_id: str) -> bool:
+        """删除已归档的任务（归档库行与定位索引）"""
+        with self.pool.read_connection() as conn:
+            hit = conn.execute(
+                "SELECT archive FROM task_archive_index WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        if not hit:
+            return False
+
+        path = self._archive_path(hit["archive"])
+        if path.exists():
+            conn = self._open_archive(hit["archive"])
+            try:
+                with conn:
+                    conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            finally:
+                conn.close()
+
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM task_archive_index WHERE task_id = ?", (task_id,))
+        return True
+
+    def reclaim_space(self) -> int:
+        """分批incremental_vacuum释放空闲页，返回释放的页数
+
+        仅对auto_vacuum=INCREMENTAL的库生效（新建库默认启用）；
+        已有库需先执行一次enable_incremental_vacuum()。
+        """
+        with self.pool.read_connection() as conn:
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if auto_vacuum != 2:
+            print("[Retention] 数据库未启用增量vacuum，空闲页暂不回收"
+                  "（执行 python -m src.store.retention --enable-incremental-vacuum 转换）")
+            return 0
+
+        freed = 0
+        while True:
+            with self.pool.transaction() as conn:
+                before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if before == 0:
+                    break
+                conn.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES})").fetchall()
+                released = before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if released <= 0:
+                break
+            freed += released
+        return freed
+
+    def enable_incremental_vacuum(self):
+        """已有库一次性转换为增量auto_vacuum（整库VACUUM，期间阻塞写入）"""
+        conn = self.pool.get_connection()
+        with self.pool._write_lock:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+        print(f"[Retention] 已转换为增量vacuum: {self.pool.db_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务保留与归档")
+    parser.add_argument("--run", action="store_true", help="执行一轮归档")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true", help="已有库转换为增量vacuum")
+    args = parser.parse_args()
+
+    retention = TaskRetention()
+    if args.enable_incremental_vacuum:
+        retention.enable_incremental_vacuum()
+    if args.run:
+        print(retention.run_once())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""SQLite写后合并提交（group commit）"""
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Optional
+from ..common.connection_pool import SQLiteConnectionPool
+
+
+class SQLiteWriteBehindWriter:
+    """
+    SQLite写后合并提交器
+
+    调用方只把(sql, params)放入内存队列即返回；后台线程每隔flush_interval_ms
+    或攒满batch_size条时，把队列中的写入合并进一个事务：
+    - 相邻的同一SQL合并为一次executemany
+    - 整批只提交（fsync）一次
+    - 写入顺序与入队顺序一致（UPSERT后的UPDATE不会被提前）
+
+    关闭保证：close()（及进程退出时的atexit）会把剩余写入全部落盘。
+    """
+
+    def __init__(
+        self,
+        pool: SQLiteConnectionPool,
+        flush_interval_ms: int = 50,
+        batch_size: int = 500,
+        max_pending: int = 100000
+    ):
+        """
+        Args:
+            pool: SQLite连接池
+            flush_interval_ms: 最长攒批时间（毫秒）
+            batch_size: 单批最大条数（攒满立即提交）
+            max_pending: 队列上限（超过时enqueue阻塞，形成背压）
+        """
+        self.pool = pool
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        self._enqueued_seq = 0    # 已入队写入的序号
+        self._committed_seq = 0   # 已处理（提交或确认失败）写入的序号
+        self._stopping = False
+        self._flush_requested = False
+
+        # 统计信息
+        self.stats = {
+            "batches": 0,
+            "rows": 0,
+            "errors": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0
+        }
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="sqlite-write-behind",
+            daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, sql: str, params: tuple):
+        """写入入队（立即返回；队列满时阻塞等待）"""
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("写入器已关闭")
+
+            while len(self._pending) >= self.max_pending:
+                self._cond.wait()
+
+            self._pending.append((sql, params))
+            self._enqueued_seq += 1
+
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待当前已入队的写入全部提交
+
+        Returns:
+            是否在超时前完成
+        """
+        with self._cond:
+            target = self._enqueued_seq
+            if self._committed_seq >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: self._committed_seq >= target,
+                timeout=timeout
+            )
+
+    def pending_count(self) -> int:
+        """待提交写入数"""
+        with self._cond:
+            return len(self._pending)
+
+    def close(self):
+        """停止后台线程（剩余写入全部落盘后返回）"""
+        with self._cond:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        """后台提交循环"""
+        while True:
+            with self._cond:
+                # 等到有数据
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+
+                if not self._pending and self._stopping:
+                    return
+
+                # 攒批：满batch_size、到期或关闭时立即提交
+                deadline = time.monotonic() + self.flush_interval
+                while (len(self._pending) < self.batch_size
+                       and not self._stopping
+                       and not self._flush_requested):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popleft())
+                if not self._pending:
+                    self._flush_requested = False
+
+                # 队列腾出空间，唤醒被背压阻塞的enqueue
+                self._cond.notify_all()
+
+            self._write_batch(batch)
+
+            with self._cond:
+                self._committed_seq += len(batch)
+                self._cond.notify_all()
+
+    def _write_batch(self, batch: list[tuple[str, tuple]]):
+        """单事务写入一批（相邻同SQL合并为executemany）"""
+        start = time.perf_counter()
+
+        try:
+            with self.pool.transaction() as conn:
+                for sql, params_list in _group_by_sql(batch):
+                    conn.executemany(sql, params_list)
+
+            self.stats["batches"] += 1
+            self.stats["rows"] += len(batch)
+        except Exception as e:
+            print(f"[L3-SQLite] 批量提交失败，逐条重试: {e}")
+            self._write_one_by_one(batch)
+
+        self.stats["last_batch_size"] = len(batch)
+        self.stats["last_flush_ms"] = (time.perf_counter() - start) * 1000
+
+    def _write_one_by_one(self, batch: list[tuple[str, tuple]]):
+        """批量失败时逐条写入，避免一条坏数据拖垮整批"""
+        for sql, params in batch:
+            try:
+                with self.pool.transaction() as conn:
+                    conn.execute(sql, params)
+                self.stats["rows"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[L3-SQLite] 写入失败（已丢弃）: {e}")
+
+
+def _group_by_sql(batch: list[tuple[str, tuple]]) -> list[tuple[str, list[tuple]]]:
+    """相邻的同一SQL归为一组（保持整体顺序）"""
+    groups: list[tuple[str, list[tuple]]] = []
+    for sql, params in batch:
+        if groups and groups[-1][0] == sql:
+            groups[-1][1].append(params)
+        else:
+            groups.append((sql, [params]))
+    return groups
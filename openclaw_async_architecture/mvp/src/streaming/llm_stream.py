@@ -314,6 +314,10 @@ class StreamChatService:
 
         except Exception as e:
             logger.error(f"流式聊天失败 ({provider}): {e}")
+            if monitor:
+                # 失败计入该模型的错误率
+                monitor.__exit__(type(e), e, e.__traceback__)
+                monitor = None
             raise
         finally:
             if monitor:
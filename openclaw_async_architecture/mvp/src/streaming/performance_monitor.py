@@ -7,6 +7,12 @@ import logging
 from typing import Dict, Optional
 from dataclasses import dataclass, asdict
 
+try:
+    from ..common.model_router import get_model_router
+except ImportError:
+    # 作为顶层streaming包导入时（如tests/test_streaming.py）不记录路由统计
+    get_model_router = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -148,11 +154,12 @@ class PerformanceMonitor:
 
 # 上下文管理器（方便使用）
 class PerformanceMonitorContext:
-    """性能监控上下文管理器"""
+    """性能监控上下文管理器（退出时把首字延迟、总耗时与成败记入ModelRouter）"""
 
-    def __init__(self, provider: str, is_first_call: bool = True):
+    def __init__(self, provider: str, is_first_call: bool = True, router=None):
         self.provider = provider
         self.is_first_call = is_first_call
+        self.router = router or (get_model_router() if get_model_router else None)
         self.metrics: Optional[PerformanceMetrics] = None
         self.chunk_count = 0
         self.total_chars = 0
@@ -162,6 +169,7 @@ class PerformanceMonitorContext:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self._record_routing(exc_type is None)
         if self.metrics and self.metrics.t_first_byte > 0:
             PerformanceMonitor.mark_complete(
                 self.metrics,
@@ -175,6 +183,16 @@ class PerformanceMonitorContext:
             )
         return False
 
+    def _record_routing(self, success: bool):
+        """向路由记录本次流式调用（失败只计错误率；成功但没有任何输出的调用不记录延迟）"""
+        if not self.metrics or not self.router:
+            return
+        if not success:
+            self.router.record(self.provider, time.time() - self.metrics.t_start, success=False)
+        elif self.metrics.t_first_byte > 0:
+            self.router.record_ttft(self.provider, self.metrics.get_first_byte_time())
+            self.router.record(self.provider, time.time() - self.metrics.t_start)
+
     def record_chunk(self, chunk: str):
         """记录一个chunk"""
         if self.metrics and self.metrics.t_first_byte == 0:
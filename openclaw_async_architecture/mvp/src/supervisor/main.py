@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""进程管理器 - 启动Gateway与Worker进程，就绪检查、崩溃重启、按队列积压伸缩Worker
+
+- Gateway：一个uvicorn进程，--workers settings.supervisor_gateway_workers
+  （已安装uvloop / httptools时启用，Windows下uvloop不可用自动回退asyncio）
+- Worker：settings.supervisor_min_workers ~ supervisor_max_workers个src.worker.main进程
+- 就绪：Gateway以GET /health返回200为准；Worker以其首次上报的指标键
+  （openclaw:worker_metrics:{主机名}-{pid}，见worker.consumer）出现为准，不再固定sleep
+- 子进程意外退出时按指数退避重启（稳定运行一段时间后退避清零）
+- 每settings.supervisor_scale_interval秒按队列长度计算所需Worker数：
+  积压增加立即扩容；积压持续低于所需supervisor_scale_down_delay秒才缩容，每次退役一个
+  （Worker收到停止信号后停止拉取，排空在途任务再退出）
+- 停止信号：POSIX为SIGTERM；Windows的terminate()是TerminateProcess（强杀，不排空），
+  因此子进程在独立进程组中启动，改发CTRL_BREAK_EVENT（子进程内为SIGBREAK）
+
+用法：
+    python -m src.supervisor.main
+    python -m src.supervisor.main --gateway-workers 4 --min-workers 2 --max-workers 8
+"""
+import argparse
+import importlib.util
+import math
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+import requests
+from ..common.config import settings
+from ..common.connection_pool import redis_pool
+from ..queue.factory import create_task_queue
+from ..worker.consumer import METRICS_KEY_PREFIX
+
+
+MVP_ROOT = Path(__file__).resolve().parents[2]
+
+# 崩溃重启退避：首次等待、上限（秒）；持续运行超过STABLE_SECONDS后退避清零
+RESTART_BASE_DELAY = 1.0
+RESTART_MAX_DELAY = 60.0
+STABLE_SECONDS = 60.0
+
+
+def gateway_command(workers: int, host: Optional[str] = None, port: Optional[int] = None) -> list[str]:
+    """Gateway启动命令（uvicorn多进程，按可用性选择uvloop / httptools）"""
+    loop = "uvloop" if sys.platform != "win32" and importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return [
+        sys.executable, "-m", "uvicorn", "src.gateway.main:app",
+        "--host", host or settings.gateway_host,
+        "--port", str(port or settings.gateway_port),
+        "--workers", str(workers),
+        "--loop", loop,
+        "--http", http
+    ]
+
+
+def worker_command() -> list[str]:
+    """Worker启动命令"""
+    return [sys.executable, "-m", "src.worker.main"]
+
+
+def gateway_ready(url: Optional[str] = None) -> Callable[["ManagedProcess"], bool]:
+    """Gateway就绪检查：/health返回200"""
+    url = url or f"http://{settings.gateway_host}:{settings.gateway_port}/health"
+
+    def check(_child: "ManagedProcess") -> bool:
+        try:
+            return requests.get(url, timeout=1).status_code == 200
+        except requests.RequestException:
+            return False
+
+    return check
+
+
+def worker_ready(child: "ManagedProcess") -> bool:
+    """Worker就绪检查：消费循环已启动并上报了指标"""
+    try:
+        return bool(redis_pool.client.exists(f"{METRICS_KEY_PREFIX}{socket.gethostname()}-{child.pid}"))
+    except Exception:
+        return False
+
+
+class ManagedProcess:
+    """受管子进程（记录启动时间与重启次数）"""
+
+    def __init__(
+        self,
+        name: str,
+        command: list[str],
+        ready_check: Optional[Callable[["ManagedProcess"], bool]] = None,
+        cwd: Optional[Path] = None
+    ):
+        self.name = name
+        self.command = command
+        self.ready_check = ready_check
+        self.cwd = cwd or MVP_ROOT
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.restart_at = 0.0  # 退避结束时间（0为未在等待重启）
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        # Windows：独立进程组，才能单独向该子进程发送CTRL_BREAK_EVENT
+        creationflags = subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == "win32" else 0
+        self.process = subprocess.Popen(self.command, cwd=str(self.cwd), creationflags=creationflags)
+        self.started_at = time.monotonic()
+        self.restart_at = 0.0
+        print(f"[Supervisor] 启动 {self.name} (PID {self.pid})")
+
+    def wait_ready(self, timeout: float) -> bool:
+        """等待就绪（进程退出或超时返回False；未配置检查时视为就绪）"""
+        if self.ready_check is None:
+            return self.alive
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.alive:
+                return False
+            if self.ready_check(self):
+                return True
+            time.sleep(0.2)
+        return False
+
+    def restart_delay(self, now: float) -> float:
+        """本次崩溃后的重启等待（运行足够久视为恢复稳定，退避清零）"""
+        if now - self.started_at >= STABLE_SECONDS:
+            self.restarts = 0
+        delay = min(RESTART_MAX_DELAY, RESTART_BASE_DELAY * (2 ** self.restarts))
+        self.restarts += 1
+        return delay
+
+    def terminate(self):
+        """请求退出（Worker排空在途任务，uvicorn优雅关闭）
+
+        POSIX发送SIGTERM；Windows发送CTRL_BREAK_EVENT（Popen.terminate在Windows上是强杀）。
+        """
+        if not self.alive:
+            return
+        if sys.platform == "win32":
+            self.process.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            self.process.terminate()
+
+    def wait(self, timeout: float):
+        """等待退出，超时强制结束"""
+        if self.process is None:
+            return
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            print(f"[Supervisor] {self.name} 未在 {timeout:.0f}s 内退出，强制结束")
+            self.process.kill()
+            self.process.wait()
+
+
+class Supervisor:
+    """Gateway + Worker进程管理器"""
+
+    def __init__(
+        self,
+        gateway_workers: Optional[int] = None,
+        min_workers: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        tasks_per_worker: Optional[int] = None,
+        scale_interval: Optional[float] = None,
+        scale_down_delay: Optional[float] = None,
+        ready_timeout: Optional[float] = None,
+        queue=None,
+        run_gateway: bool = True
+    ):
+        """初始化
+
+        Args:
+            gateway_workers: uvicorn worker数（默认settings.supervisor_gateway_workers）
+            min_workers / max_workers: Worker进程数范围
+            tasks_per_worker: 每个Worker进程承担的积压任务数（按此计算所需进程数）
+            scale_interval: 伸缩检查间隔（秒）
+            scale_down_delay: 积压持续偏低多少秒后才缩容
+            ready_timeout: 等待就绪的最长时间（秒）
+            queue: 同步任务队列（提供get_queue_length，默认按settings.queue_backend创建）
+            run_gateway: 是否启动Gateway（多机部署时Worker机器可关闭）
+        """
+        self.gateway_workers = gateway_workers or settings.supervisor_gateway_workers
+        self.min_workers = settings.supervisor_min_workers if min_workers is None else min_workers
+        self.max_workers = max(self.min_workers, max_workers or settings.supervisor_max_workers)
+        self.tasks_per_worker = tasks_per_worker or settings.supervisor_tasks_per_worker
+        self.scale_interval = scale_interval or settings.supervisor_scale_interval
+        self.scale_down_delay = settings.supervisor_scale_down_delay if scale_down_delay is None else scale_down_delay
+        self.ready_timeout = ready_timeout or settings.supervisor_ready_timeout
+        self.queue = queue
+        self.run_gateway = run_gateway
+
+        self.gateway: Optional[ManagedProcess] = None
+        self.workers: list[ManagedProcess] = []
+        self._retiring: list[ManagedProcess] = []
+        self._worker_seq = 0
+        self._low_since: Optional[float] = None
+        self._stopping = False
+
+    def desired_workers(self, queue_length: int) -> int:
+        """按积压计算所需Worker进程数（限定在[min, max]）"""
+        needed = math.ceil(queue_length / self.tasks_per_worker) if self.tasks_per_worker > 0 else self.min_workers
+        return max(self.min_workers, min(self.max_workers, needed))
+
+    def start(self):
+        """启动Gateway并等待就绪，再启动最少数量的Worker"""
+        if self.run_gateway:
+            self.gateway = ManagedProcess("gateway", gateway_command(self.gateway_workers), gateway_ready())
+            self.gateway.start()
+            if self.gateway.wait_ready(self.ready_timeout):
+                print(f"[Supervisor] Gateway已就绪 ({self.gateway_workers} 个uvicorn worker)")
+            else:
+                print(f"[Supervisor] [!] Gateway未在 {self.ready_timeout:.0f}s 内就绪")
+
+        started = [self._spawn_worker() for _ in range(self.min_workers)]
+        ready = sum(1 for child in started if child.wait_ready(self.ready_timeout))
+        print(f"[Supervisor] Worker已就绪: {ready}/{len(started)}")
+
+    def run(self):
+        """启动并进入管理循环，stop()后停止全部子进程"""
+        self.start()
+        last_scale = time.monotonic()
+        try:
+            while not self._stopping:
+                now = time.monotonic()
+                self.check_children(now)
+                if now - last_scale >= self.scale_interval:
+                    last_scale = now
+                    self.autoscale(now)
+                time.sleep(0.5)
+        finally:
+            self.shutdown()
+
+    def stop(self, *_args):
+        """停止管理循环（可作为信号处理器）"""
+        self._stopping = True
+
+    def check_children(self, now: float):
+        """重启意外退出的子进程（指数退避），回收已退役的Worker"""
+        for child in ([self.gateway] if self.gateway else []) + self.workers:
+            if child.alive:
+                continue
+            if not child.restart_at:
+                delay = child.restart_delay(now)
+                child.restart_at = now + delay
+                print(f"[Supervisor] [X] {child.name} 退出 (code {child.process.returncode})，{delay:.0f}s 后重启")
+            elif now >= child.restart_at:
+                child.start()
+
+        self._retiring = [child for child in self._retiring if child.alive]
+
+    def autoscale(self, now: float) -> int:
+        """按队列积压伸缩Worker，返回伸缩后的Worker数"""
+        try:
+            queue_length = self._get_queue().get_queue_length()
+        except Exception as e:
+            print(f"[Supervisor] 读取队列长度失败: {e}")
+            return len(self.workers)
+
+        desired = self.desired_workers(queue_length)
+        current = len(self.workers)
+        if desired > current:
+            self._low_since = None
+            print(f"[Supervisor] 积压 {queue_length}，扩容 {current} → {desired}")
+            for _ in range(desired - current):
+                self._spawn_worker()
+        elif desired < current:
+            if self._low_since is None:
+                self._low_since = now
+            elif now - self._low_since >= self.scale_down_delay:
+                self._low_since = now
+                child = self.workers.pop()
+                print(f"[Supervisor] 积压 {queue_length}，缩容 {current} → {current - 1}（退役 {child.name}）")
+                child.terminate()
+                self._retiring.append(child)
+        else:
+            self._low_since = None
+        return len(self.workers)
+
+    def shutdown(self):
+        """停止全部子进程：先Worker（排空在途任务）后Gateway"""
+        print(f"\n[Supervisor] 停止 {len(self.workers) + len(self._retiring)} 个Worker...")
+        workers = self.workers + self._retiring
+        for child in workers:
+            child.terminate()
+        for child in workers:
+            child.wait(settings.worker_drain_timeout + 5)
+        self.workers, self._retiring = [], []
+
+        if self.gateway:
+            self.gateway.terminate()
+            self.gateway.wait(15)
+        print("[Supervisor] 已停止")
+
+    def get_stats(self) -> dict:
+        return {
+            "gateway": {"pid": self.gateway.pid, "restarts": self.gateway.restarts} if self.gateway else None,
+            "workers": [{"name": child.name, "pid": child.pid, "restarts": child.restarts} for child in self.workers],
+            "retiring": len(self._retiring)
+        }
+
+    def _spawn_worker(self) -> ManagedProcess:
+        self._worker_seq += 1
+        child = ManagedProcess(f"worker-{self._worker_seq}", worker_command(), worker_ready)
+        child.start()
+        self.workers.append(child)
+        return child
+
+    def _get_queue(self):
+        if self.queue is None:
+            self.queue = create_task_queue()
+        return self.queue
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="OpenClaw V2 进程管理器（Gateway + Worker）")
+    parser.add_argument("--gateway-workers", type=int, help="uvicorn worker数")
+    parser.add_argument("--min-workers", type=int, help="最少Worker进程数")
+    parser.add_argument("--max-workers", type=int, help="最多Worker进程数")
+    parser.add_argument("--no-gateway", action="store_true", help="只管理Worker进程")
+    args = parser.parse_args(argv)
+
+    supervisor = Supervisor(
+        gateway_workers=args.gateway_workers,
+        min_workers=args.min_workers,
+        max_workers=args.max_workers,
+        run_gateway=not args.no_gateway
+    )
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, supervisor.stop)
+
+    print(f"\n{'='*60}")
+    print(f"OpenClaw V2 Supervisor (PID {os.getpid()})")
+    print(f"  Gateway: {supervisor.gateway_workers if supervisor.run_gateway else 0} 个uvicorn worker")
+    print(f"  Worker: {supervisor.min_workers} ~ {supervisor.max_workers} 个进程"
+          f"（每 {supervisor.tasks_per_worker} 个积压任务一个）")
+    print(f"{'='*60}\n")
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
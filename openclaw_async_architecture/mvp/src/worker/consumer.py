@@ -0,0 +1,333 @@
+"""
+队列消费者 - 有界并发执行
+核心目标：长任务（LLM/exec）执行期间继续从队列拉取新任务
+"""
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from ..common.config import settings
+from ..common.connection_pool import redis_pool
+from ..common.model_router import ROUTING_KEY_PREFIX, get_model_router
+from ..common.models import Task
+from ..queue.scheduler import is_transient_error
+
+
+METRICS_KEY_PREFIX = "openclaw:worker_metrics:"
+
+
+class WorkerMetrics:
+    """Worker运行指标（在途数、排队等待时间、完成/失败数）"""
+
+    def __init__(self):
+        self.inflight = 0
+        self.running_by_type: dict[str, int] = {}
+        self.completed = 0
+        self.failed = 0
+        # 失败后安排重试 / 重试用尽进入死信队列的次数
+        self.retried = 0
+        self.dead_lettered = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        # 按优先级车道的排队等待：lane → [次数, 总时长, 最大值]
+        self.wait_by_lane: dict[str, list] = {}
+        self.started_at = time.time()
+
+    def record_wait(self, seconds: float, lane: Optional[str] = None):
+        """记录一次排队等待时间（入队 → 开始执行）"""
+        self.wait_count += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        if lane:
+            lane_wait = self.wait_by_lane.setdefault(lane, [0, 0.0, 0.0])
+            lane_wait[0] += 1
+            lane_wait[1] += seconds
+            lane_wait[2] = max(lane_wait[2], seconds)
+
+    def to_dict(self) -> dict:
+        """转换为字典"""
+        wait_avg = self.wait_total / self.wait_count if self.wait_count else 0.0
+        return {
+            "inflight": self.inflight,
+            "running_by_type": dict(self.running_by_type),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "queue_wait_avg_ms": round(wait_avg * 1000, 1),
+            "queue_wait_max_ms": round(self.wait_max * 1000, 1),
+            "queue_wait_by_lane": {
+                lane: {
+                    "count": count,
+                    "avg_ms": round(total / count * 1000, 1),
+                    "max_ms": round(longest * 1000, 1)
+                }
+                for lane, (count, total, longest) in self.wait_by_lane.items()
+            },
+            "uptime": round(time.time() - self.started_at, 1)
+        }
+
+
+class QueueConsumer:
+    """
+    有界并发队列消费者
+
+    - 最多max_inflight个任务同时在途，有空位就继续拉取（批量）
+    - 按任务类型的信号量限制各类任务并发（如command最多2个）
+    - stop()后不再拉取新任务，等待在途任务完成（最长drain_timeout秒）
+    - 定期把指标写入Redis（openclaw:worker_metrics:{name}），供Gateway汇总
+    - 同时写入本进程的模型路由统计（openclaw:routing_stats:{name}），供Gateway的/routing/stats汇总
+    - 配置scheduler时：暂时性失败按退避重试、用尽进入死信队列，并定期把到期的延迟/重试任务移回队列
+    """
+
+    def __init__(
+        self,
+        worker,
+        queue,
+        store,
+        max_inflight: Optional[int] = None,
+        type_limits: Optional[dict[str, int]] = None,
+        batch_size: Optional[int] = None,
+        poll_timeout: int = 2,
+        name: Optional[str] = None,
+        scheduler=None
+    ):
+        """
+        Args:
+            worker: 任务执行器（需提供async execute_task(task)）
+            queue: 同步任务队列（RedisTaskQueue / RedisStreamTaskQueue）
+            store: 同步任务存储（HybridTaskStore）
+            max_inflight: 最大在途任务数
+            type_limits: 各任务类型并发上限
+            batch_size: 每次最多拉取的任务数
+            poll_timeout: 单次阻塞拉取超时（秒，决定停止响应速度）
+            name: Worker名称（指标键）
+            scheduler: 重试调度器（TaskScheduler，None为失败不重试）
+        """
+        self.worker = worker
+        self.queue = queue
+        self.store = store
+        self.scheduler = scheduler
+        self.max_inflight = max_inflight or settings.worker_max_inflight
+        self.batch_size = batch_size or settings.worker_batch_size
+        self.poll_timeout = poll_timeout
+        self.name = name or getattr(queue, "consumer_name", None) or f"{socket.gethostname()}-{os.getpid()}"
+
+        limits = settings.worker_type_limits if type_limits is None else type_limits
+        self._type_semaphores = {
+            task_type: asyncio.Semaphore(limit)
+            for task_type, limit in limits.items()
+        }
+
+        self.metrics = WorkerMetrics()
+        self._running: set[asyncio.Task] = set()
+        self._slot_cond = asyncio.Condition()
+        self._stopping = False
+
+    def stop(self):
+        """停止拉取新任务（可在信号处理器中调用）"""
+        if self._stopping:
+            return
+        print(f"\n[Worker] 收到停止信号，停止拉取，等待 {self.metrics.inflight} 个在途任务完成...")
+        self._stopping = True
+        asyncio.ensure_future(self._notify_slots())
+
+    async def run(self):
+        """消费循环（stop()后排空在途任务再返回）"""
+        last_reclaim = 0.0
+        last_metrics = 0.0
+        last_promote = 0.0
+
+        while not self._stopping:
+            try:
+                free = await self._wait_for_free_slots()
+                if self._stopping:
+                    break
+
+                task_batch = []
+
+                # 到期的延迟/重试任务移回队列（多Worker并发执行时由Lua脚本保证不重复）
+                if self.scheduler and time.time() - last_promote >= settings.scheduler_poll_interval:
+                    last_promote = time.time()
+                    await asyncio.to_thread(self.scheduler.promote_due, self.queue)
+
+                # 定期接管失联Worker的未确认任务（仅Streams队列）
+                if time.time() - last_reclaim >= settings.stream_reclaim_interval:
+                    last_reclaim = time.time()
+                    task_batch = await asyncio.to_thread(self.queue.reclaim_pending, None, free)
+
+                if not task_batch:
+                    task_batch = await asyncio.to_thread(
+                        self.queue.get_tasks_batch,
+                        min(free, self.batch_size),
+                        self.poll_timeout
+                    )
+
+                for task_data in task_batch:
+                    self._spawn(task_data)
+
+                if time.time() - last_metrics >= settings.worker_metrics_interval:
+                    last_metrics = time.time()
+                    await self.publish_metrics()
+
+            except Exception as e:
+                print(f"\n[Worker] [X] 错误: {e}")
+                await asyncio.sleep(1)
+
+        await self._drain()
+
+    def get_stats(self) -> dict:
+        """获取运行指标"""
+        return self.metrics.to_dict()
+
+    async def publish_metrics(self):
+        """写入Redis指标哈希（过期时间为3个上报周期，进程退出后自动消失）"""
+        key = f"{METRICS_KEY_PREFIX}{self.name}"
+        stats = self.metrics.to_dict()
+        mapping = {k: str(v) for k, v in stats.items() if not isinstance(v, dict)}
+        for task_type, count in stats["running_by_type"].items():
+            mapping[f"running:{task_type}"] = str(count)
+        for lane, lane_wait in stats["queue_wait_by_lane"].items():
+            mapping[f"wait_avg_ms:{lane}"] = str(lane_wait["avg_ms"])
+            mapping[f"wait_max_ms:{lane}"] = str(lane_wait["max_ms"])
+        routing_key = f"{ROUTING_KEY_PREFIX}{self.name}"
+        routing = get_model_router().to_redis_mapping()
+
+        def _write():
+            client = redis_pool.client
+            pipeline = client.pipeline(transaction=False)
+            pipeline.delete(key)
+            pipeline.hset(key, mapping=mapping)
+            pipeline.expire(key, settings.worker_metrics_interval * 3)
+            if routing:
+                pipeline.delete(routing_key)
+                pipeline.hset(routing_key, mapping=routing)
+                pipeline.expire(routing_key, settings.worker_metrics_interval * 3)
+            pipeline.execute()
+
+        try:
+            await asyncio.to_thread(_write)
+        except Exception as e:
+            print(f"[Worker] 指标上报失败: {e}")
+
+    async def _wait_for_free_slots(self) -> int:
+        """等待至少一个空位，返回当前空位数"""
+        async with self._slot_cond:
+            await self._slot_cond.wait_for(
+                lambda: self.metrics.inflight < self.max_inflight or self._stopping
+            )
+            return self.max_inflight - self.metrics.inflight
+
+    async def _notify_slots(self):
+        async with self._slot_cond:
+            self._slot_cond.notify_all()
+
+    def _spawn(self, task_data: dict):
+        """启动任务协程（立即占用在途名额）"""
+        self.metrics.inflight += 1
+        running = asyncio.create_task(self._handle(task_data))
+        self._running.add(running)
+        running.add_done_callback(self._running.discard)
+
+    async def _handle(self, task_data: dict):
+        """按任务类型限流后执行，结束时释放名额"""
+        task_type = task_data.get("task_type") or "v1"
+        semaphore = self._type_semaphores.get(task_type)
+
+        try:
+            if semaphore:
+                async with semaphore:
+                    await self._execute(task_data, task_type)
+            else:
+                await self._execute(task_data, task_type)
+        finally:
+            self.metrics.inflight -= 1
+            await self._notify_slots()
+
+    async def _execute(self, task_data: dict, task_type: str):
+        """执行单个任务、保存结果并确认"""
+        task_id = task_data["task_id"]
+        enqueued_at = task_data.get("enqueued_at") or 0
+        if enqueued_at:
+            self.metrics.record_wait(max(0.0, time.time() - enqueued_at), task_data.get("lane"))
+
+        self.metrics.running_by_type[task_type] = self.metrics.running_by_type.get(task_type, 0) + 1
+        try:
+            task = Task(id=task_id, content=task_data["task_data"], metadata={"task_type": task_type})
+            attempt = int(task_data.get("attempt") or 0)
+            if attempt:
+                task.metadata["attempt"] = attempt
+
+            # 执行任务
+            task = await self.worker.execute_task(task)
+
+            # 暂时性失败：安排重试（任务保持pending）或进入死信队列
+            if task.status == "failed" and self.scheduler:
+                await self._handle_failure(task_data, task)
+
+            # 保存结果（同步存储放到线程池，不阻塞其他在途任务）
+            await asyncio.to_thread(self.store.save_task, task)
+
+            # 确认（Streams队列：结果落库后才移出PEL，崩溃可被接管）
+            await asyncio.to_thread(self.queue.ack, task_data)
+
+            if task.status == "completed":
+                self.metrics.completed += 1
+            elif task.status == "failed":
+                self.metrics.failed += 1
+
+            print(f"\n[Worker] [OK] 任务 {task_id} 完成: {task.status} (在途: {self.metrics.inflight})")
+        except Exception as e:
+            self.metrics.failed += 1
+            print(f"\n[Worker] [X] 任务 {task_id} 处理异常: {e}")
+            # 未配置重试时不ack：Streams队列下该任务会被重新接管；
+            # 配置重试时计入重试次数后ack，反复异常的任务最终进入死信队列，不会无限接管
+            if self.scheduler:
+                try:
+                    outcome, _run_at = await asyncio.to_thread(
+                        self.scheduler.handle_failure, task_data, f"处理异常: {e}", True
+                    )
+                    self._count_outcome(outcome)
+                    await asyncio.to_thread(self.queue.ack, task_data)
+                except Exception as retry_error:
+                    print(f"[Worker] [X] 任务 {task_id} 安排重试失败: {retry_error}")
+        finally:
+            self.metrics.running_by_type[task_type] -= 1
+
+    async def _handle_failure(self, task_data: dict, task: Task):
+        """失败任务交给调度器：安排重试时状态改回pending并记录下次执行时间"""
+        outcome, run_at = await asyncio.to_thread(
+            self.scheduler.handle_failure, task_data, task.error, is_transient_error(task.error)
+        )
+        self._count_outcome(outcome)
+        if outcome == "retry":
+            task.status = "pending"
+            task.metadata["attempt"] = int(task_data.get("attempt") or 0) + 1
+            task.metadata["retry_at"] = datetime.fromtimestamp(run_at, timezone.utc).isoformat()
+        elif outcome == "dead_letter":
+            task.metadata["dead_letter"] = True
+
+    def _count_outcome(self, outcome: str):
+        if outcome == "retry":
+            self.metrics.retried += 1
+        elif outcome == "dead_letter":
+            self.metrics.dead_lettered += 1
+
+    async def _drain(self):
+        """等待在途任务完成，超时后取消剩余任务"""
+        if self._running:
+            done, pending = await asyncio.wait(
+                set(self._running),
+                timeout=settings.worker_drain_timeout
+            )
+            if pending:
+                print(f"[Worker] 排空超时，取消 {len(pending)} 个任务（Streams队列下将被其他Worker接管）")
+                for running in pending:
+                    running.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        await self.publish_metrics()
+        print(f"[Worker] 已排空: {self.metrics.to_dict()}")
@@ -24,8 +24,19 @@ except ImportError:
     # 直接导入
     from common.models import Task
 
+# 导入大结果压缩
+try:
+    from ..common.compression import compress_text
+except ImportError:
+    # 直接导入
+    from common.compression import compress_text
+
 # 导入自主exec工具（本地路径）
-from tools.exec_self import execute
+try:
+    from ..tools.exec_self import execute
+except ImportError:
+    # 直接导入
+    from tools.exec_self import execute
 
 
 class EnhancedV2Worker:
@@ -258,7 +269,7 @@ class EnhancedV2Worker:
                 self.worker_id,
                 task.metadata.get("task_type", "v1") if task.metadata else "v1",
                 task.status,
-                task.result,
+                compress_text(task.result),  # 超过阈值的大结果存为压缩BLOB
                 task.error
             ))
 
@@ -275,6 +286,17 @@ class EnhancedV2Worker:
             self.sqlite_conn.close()
 
 
+# 全局实例
+enhanced_worker_instance = None
+
+def get_enhanced_worker(worker_id: str = "worker-1") -> EnhancedV2Worker:
+    """获取增强版Worker实例"""
+    global enhanced_worker_instance
+    if enhanced_worker_instance is None:
+        enhanced_worker_instance = EnhancedV2Worker(worker_id=worker_id)
+    return enhanced_worker_instance
+
+
 # 便捷函数
 async def execute_with_enhanced_worker(
     content: str,
@@ -1,7 +1,10 @@
 """Worker主进程 - 使用LoadBalancer增强版"""
 import asyncio
+import signal
 from ..worker.enhanced_worker import get_enhanced_worker
-from ..queue.redis_queue import RedisTaskQueue
+from ..worker.consumer import QueueConsumer
+from ..queue.factory import create_task_queue
+from ..queue.scheduler import TaskScheduler
 from ..store.hybrid_store import HybridTaskStore
 from ..common.config import settings
 from ..common.models import Task
@@ -15,7 +18,7 @@ async def run_worker():
 
     # 初始化组件
     worker = get_enhanced_worker()
-    queue = RedisTaskQueue()
+    queue = create_task_queue()
     store = HybridTaskStore()
 
     # 测试连接
@@ -25,46 +28,35 @@ async def run_worker():
 
     # 测试存储连接
     storage_status = store.test_connection()
-    print(f"\n[OK] Redis队列连接成功")
+    print(f"\n[OK] Redis队列连接成功 (后端: {settings.queue_backend})")
     print(f"[OK] 存储模式: {storage_status['storage_mode']}")
 
     print(f"\n[*] Worker开始监听Redis队列...")
     print(f"[路由] 5模型智能路由已就绪")
     print(f"{'='*60}\n")
 
-    # 任务循环
-    while True:
+    # 有界并发消费者（长任务执行期间继续拉取；暂时性失败按退避重试，用尽进入死信队列）
+    consumer = QueueConsumer(worker, queue, store, scheduler=TaskScheduler())
+    print(f"[并发] 最大在途: {consumer.max_inflight}  类型限额: {settings.worker_type_limits}")
+    print(f"[重试] 最多执行 {settings.retry_max_attempts} 次  退避: {settings.retry_base_delay}s ~ {settings.retry_max_delay}s")
+
+    # SIGTERM/SIGINT（Windows下Supervisor发送CTRL_BREAK_EVENT，即SIGBREAK）：停止拉取并排空在途任务
+    loop = asyncio.get_running_loop()
+    stop_signals = [signal.SIGTERM, signal.SIGINT]
+    if hasattr(signal, "SIGBREAK"):
+        stop_signals.append(signal.SIGBREAK)
+    for sig in stop_signals:
         try:
-            # 从队列获取任务（阻塞5秒）
-            task_data = queue.get_task(timeout=5)
+            loop.add_signal_handler(sig, consumer.stop)
+        except (NotImplementedError, RuntimeError):
+            # Windows不支持add_signal_handler
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(consumer.stop))
 
-            if task_data:
-                task_id = task_data["task_id"]
-                content = task_data["task_data"]
-
-                # 创建任务对象
-                task = Task(id=task_id, content=content)
-
-                # 执行任务（使用LoadBalancer）
-                task = await worker.execute_task(task)
-
-                # 保存结果
-                store.save_task(task)
-
-                print(f"\n[Worker] [OK] 任务 {task_id} 完成: {task.status}")
-            else:
-                # 队列为空，继续等待
-                pass
-
-        except KeyboardInterrupt:
-            print(f"\n\n[Worker] 收到停止信号，退出...")
-            break
-        except Exception as e:
-            print(f"\n[Worker] [X] 错误: {e}")
-            await asyncio.sleep(1)
+    await consumer.run()
 
     # 清理资源
     await worker.close()
+    store.close()
     print(f"[Worker] Worker已停止\n")
 
 
@@ -3,8 +3,7 @@ Worker Pool - 多Worker并发执行器
 核心目标：长任务不阻塞
 """
 import asyncio
-import time
-from typing import List, Optional
+from typing import AsyncIterator, Dict, Iterable, List, Optional
 from ..common.models import Task
 from .worker import V2Worker
 
@@ -18,12 +17,14 @@ class WorkerPool:
     - ✅ 任务队列（先进先出）
     - ✅ 长任务不阻塞（异步执行）
     - ✅ Worker复用（减少资源消耗）
+    - ✅ 完成事件驱动（每个任务一个Future，无轮询延迟）
     """
 
     def __init__(
         self,
         num_workers: int = 3,
-        max_queue_size: int = 100
+        max_queue_size: int = 100,
+        max_finished: int = 1000
     ):
         """
         初始化Worker Pool
@@ -31,6 +32,7 @@ class WorkerPool:
         Args:
             num_workers: Worker数量（并发能力）
             max_queue_size: 队列最大长度
+            max_finished: 留给wait_for_all_tasks的已完成任务上限（超出丢弃最早的）
         """
         self.num_workers = num_workers
         self.max_queue_size = max_queue_size
@@ -41,6 +43,13 @@ class WorkerPool:
         # Worker列表
         self.workers: List[V2Worker] = []
 
+        # 完成通知：task_id → Future（由_worker_loop在任务结束时resolve）
+        self._futures: Dict[str, asyncio.Future] = {}
+
+        # 上次wait_for_all_tasks之后完成、且未被wait_for_task/as_completed取走的任务（task_id → Task）
+        self._finished: Dict[str, Task] = {}
+        self.max_finished = max_finished
+
         # 运行状态
         self.running = False
 
@@ -117,6 +126,7 @@ class WorkerPool:
         task = Task(content=content, metadata={"task_type": task_type, **metadata})
 
         # 提交到队列（异步，不阻塞）
+        self._register(task)
         await self.task_queue.put(task)
 
         # 更新统计
@@ -150,9 +160,11 @@ class WorkerPool:
         task = Task(content=content, metadata={"task_type": task_type, **metadata})
 
         # 提交到队列（非阻塞）
+        self._register(task)
         try:
             self.task_queue.put_nowait(task)
         except asyncio.QueueFull:
+            self._futures.pop(task.id, None)
             raise RuntimeError("任务队列已满")
 
         # 更新统计
@@ -164,7 +176,7 @@ class WorkerPool:
 
     async def wait_for_task(self, task: Task, timeout: float = 300.0) -> Task:
         """
-        等待特定任务完成
+        等待特定任务完成（事件驱动，任务结束即返回）
 
         Args:
             task: 任务对象
@@ -173,44 +185,79 @@ class WorkerPool:
         Returns:
             完成的Task对象
         """
-        # 轮询检查任务状态
-        start_time = time.time()
+        future = self._futures.get(task.id)
 
-        while True:
-            if task.status in ["completed", "failed"]:
-                return task
+        # 已完成（或不是本Pool提交的任务）
+        if future is None:
+            self._finished.pop(task.id, None)
+            return task
+
+        try:
+            # shield：超时不会取消任务本身的完成通知
+            result = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"任务超时: {task.id}")
+        self._finished.pop(result.id, None)
+        return result
+
+    async def as_completed(
+        self,
+        tasks: Optional[Iterable[Task]] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Task]:
+        """
+        按完成顺序逐个产出任务
+
+        Args:
+            tasks: 要等待的任务（默认：当前所有未完成任务）
+            timeout: 总超时时间
 
-            if time.time() - start_time > timeout:
-                raise TimeoutError(f"任务超时: {task.id}")
+        Yields:
+            完成的Task对象
+
+        用法：
+            async for task in pool.as_completed(tasks):
+                print(task.result)
+        """
+        if tasks is None:
+            futures = list(self._futures.values())
+        else:
+            futures = []
+            for task in tasks:
+                future = self._futures.get(task.id)
+                if future is None:
+                    self._finished.pop(task.id, None)
+                    yield task  # 已完成
+                else:
+                    futures.append(future)
 
-            await asyncio.sleep(0.5)
+        try:
+            for next_done in asyncio.as_completed(futures, timeout=timeout):
+                task = await next_done
+                self._finished.pop(task.id, None)
+                yield task
+        except asyncio.TimeoutError:
+            raise TimeoutError("等待任务完成超时")
 
     async def wait_for_all_tasks(self, timeout: float = 3600.0) -> List[Task]:
         """
-        等待所有任务完成
+        等待所有任务完成（queue.join()语义：所有已提交任务都处理完）
 
         Args:
             timeout: 超时时间
 
         Returns:
-            完成的任务列表
+            完成的任务列表（自上次调用以来完成、且未被wait_for_task/as_completed取走的任务）
         """
-        # 等待队列为空
-        start_time = time.time()
-
-        while True:
-            if self.task_queue.empty():
-                # 等待所有Worker空闲
-                await asyncio.sleep(1)
-                print(f"[WorkerPool] 等待所有任务完成... (队列: {self.task_queue.qsize()})")
-                break
-
-            if time.time() - start_time > timeout:
-                raise TimeoutError("所有任务超时")
-
-            await asyncio.sleep(1)
+        try:
+            await asyncio.wait_for(self.task_queue.join(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("所有任务超时")
 
-        return []
+        finished = list(self._finished.values())
+        self._finished.clear()
+        print(f"[WorkerPool] 所有任务已完成 ({len(finished)} 个)")
+        return finished
 
     def get_stats(self) -> dict:
         """获取统计信息"""
@@ -257,12 +304,30 @@ class WorkerPool:
                 self.stats["tasks_failed"] += 1
 
             finally:
+                # 通知等待方（先于task_done，保证join返回时结果已就绪）
+                self._resolve(task)
+
                 # 标记任务完成
                 self.task_queue.task_done()
 
         print(f"[{worker_name}] Worker停止")
 
 
+    def _register(self, task: Task):
+        """为任务创建完成Future"""
+        self._futures[task.id] = asyncio.get_running_loop().create_future()
+
+    def _resolve(self, task: Task):
+        """任务结束：resolve Future并记录"""
+        self._finished[task.id] = task
+        if len(self._finished) > self.max_finished:
+            # 无人收取时丢弃最早完成的任务，避免长期运行时无限增长
+            self._finished.pop(next(iter(self._finished)))
+        future = self._futures.pop(task.id, None)
+        if future is not None and not future.done():
+            future.set_result(task)
+
+
 # 便捷函数
 async def create_worker_pool(num_workers: int = 3) -> WorkerPool:
     """创建并启动Worker Pool"""
@@ -0,0 +1,87 @@
+"""测试缓存清空不阻塞队列 - 100万个键时清空工具缓存，同时测量队列操作延迟
+
+需要本地Redis；不可用时跳过。键数可用OPENCLAW_TEST_KEYS调整（默认1000000）。
+"""
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.connection_pool import redis_pool
+from src.common.tool_cache import ToolResultCache
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+NUM_KEYS = int(os.getenv("OPENCLAW_TEST_KEYS", "1000000"))
+TEST_PREFIX = "test:tools:result:"
+TEST_QUEUE_KEY = "test:openclaw_tasks_queue"
+
+
+def _redis_available() -> bool:
+    try:
+        return redis_pool.client.ping()
+    except Exception:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _redis_available(), reason="需要本地Redis")
+
+
+def _populate(client, count: int):
+    pipeline = client.pipeline(transaction=False)
+    for i in range(count):
+        pipeline.setex(f"{TEST_PREFIX}bench:{i}", 3600, "{}")
+        if i % 10000 == 9999:
+            pipeline.execute()
+    pipeline.execute()
+
+
+def test_clear_does_not_stall_queue():
+    """清空100万个缓存键期间，队列LPUSH+RPOP的最大延迟保持在毫秒级"""
+    client = redis_pool.client
+    cache = ToolResultCache()
+    cache.prefix = TEST_PREFIX
+    _populate(client, NUM_KEYS)
+
+    latencies = []
+    clearing = threading.Event()
+    done = threading.Event()
+
+    def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            client.lpush(TEST_QUEUE_KEY, "probe")
+            client.rpop(TEST_QUEUE_KEY)
+            if clearing.is_set():
+                latencies.append(time.perf_counter() - start)
+            time.sleep(0.001)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    try:
+        clearing.set()
+        start = time.perf_counter()
+        assert cache.clear()
+        elapsed = time.perf_counter() - start
+    finally:
+        done.set()
+        prober.join()
+        client.delete(TEST_QUEUE_KEY)
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"\n清空 {NUM_KEYS} 个键耗时 {elapsed:.1f}s，队列探测 {len(latencies)} 次，"
+          f"p99 {p99 * 1000:.2f}ms，最大 {latencies[-1] * 1000:.2f}ms")
+
+    assert cache.get_stats()["total_keys"] == 0
+    assert latencies[-1] < 0.05
@@ -0,0 +1,59 @@
+"""测试序列化编解码 - 各编码器往返一致、兼容旧版JSON"""
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common import codec
+from src.common.models import Task
+from src.queue.redis_queue import build_task_message
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def _task() -> Task:
+    return Task(
+        content="分析日志",
+        status="completed",
+        result="完成",
+        metadata={"provider": "zhipu", "tokens": 12},
+        created_at=datetime(2025, 1, 1, 12, 0, 0)
+    )
+
+
+def test_round_trip_all_available_codecs():
+    """队列消息与任务模型经每个可用编码器往返后不变"""
+    message = build_task_message("t-1", "今天天气", "v1", "realtime")
+    task = _task()
+
+    for name in codec.available_codecs():
+        encoder = codec.get_codec(name)
+        assert codec.loads(encoder.dumps(message)) == message
+        assert codec.loads_task(encoder.dump_model(task)) == task
+
+
+def test_reads_legacy_json():
+    """升级前写入的JSON字符串（decode后的str或原始bytes）仍可读取"""
+    message = build_task_message("t-1", "今天天气")
+    legacy = json.dumps(message)
+    assert codec.loads(legacy) == message
+    assert codec.loads(legacy.encode("utf-8")) == message
+
+    task = _task()
+    assert codec.loads_task(task.model_dump_json()) == task
+
+
+def test_json_output_has_no_header_and_unknown_codec_falls_back():
+    """JSON编码器输出可被标准库直接解析；未知编码器回退为json"""
+    message = build_task_message("t-1", "今天天气")
+    for name in ("json", "orjson"):
+        if name in codec.available_codecs():
+            assert json.loads(codec.get_codec(name).dumps(message)) == message
+
+    assert codec.get_codec("不存在").name == "json"
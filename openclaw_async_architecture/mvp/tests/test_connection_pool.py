@@ -0,0 +1,79 @@
+"""测试Redis连接池 - 池满等待、超时计数与借还指标（不依赖Redis服务）"""
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import redis
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.connection_pool import AsyncMeteredBlockingConnectionPool, MeteredBlockingConnectionPool
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+class _OfflineConnection(redis.Connection):
+    """不建立socket的连接（只测试池的借还逻辑）"""
+
+    def connect(self):
+        pass
+
+
+class _RefusedConnection(redis.asyncio.Connection):
+    """建立连接总是失败（模拟Redis不可用）"""
+
+    async def connect(self):
+        raise redis.ConnectionError("refused")
+
+
+def test_blocking_pool_waits_then_times_out():
+    """池满时等待归还；超过timeout计入timeouts"""
+    pool = MeteredBlockingConnectionPool(max_connections=1, timeout=0.2, connection_class=_OfflineConnection)
+
+    connection = pool.get_connection("PING")
+    threading.Timer(0.05, pool.release, args=(connection,)).start()
+
+    start = time.perf_counter()
+    connection = pool.get_connection("PING")
+    assert time.perf_counter() - start >= 0.04
+    assert pool.metrics.in_use == 1
+
+    try:
+        pool.get_connection("PING")
+        assert False, "应等待超时"
+    except redis.ConnectionError:
+        pass
+
+    pool.release(connection)
+    stats = pool.metrics.to_dict()
+    assert stats["acquired"] == 2
+    assert stats["in_use"] == 0
+    assert stats["timeouts"] == 1
+    assert stats["wait_max_ms"] >= 40
+
+
+def test_async_pool_releases_on_connect_failure():
+    """asyncio池建立连接失败时立即报错并归还名额，不卡满timeout"""
+
+    async def scenario():
+        pool = AsyncMeteredBlockingConnectionPool(
+            max_connections=1, timeout=2, connection_class=_RefusedConnection
+        )
+        start = time.perf_counter()
+        for _ in range(3):
+            try:
+                await pool.get_connection("PING")
+                assert False, "应连接失败"
+            except redis.ConnectionError as e:
+                assert "refused" in str(e)
+        assert time.perf_counter() - start < 1
+        assert pool.metrics.in_use == 0
+        assert pool.metrics.timeouts == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,214 @@
+"""测试分布式限流 - 多进程共享RPM令牌桶与并发租约、租约过期、Redis不可用时退回进程内限制
+
+跨进程用例需要本地Redis；不可用时跳过。
+"""
+import json
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+import redis
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.connection_pool import redis_pool
+from src.common.distributed_limiter import DistributedLimiter, bucket_shape
+from src.common.multi_model_limiter import MultiModelRateLimiter
+from src.common.redis_keys import unlink_matching
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def _redis_available() -> bool:
+    try:
+        return redis_pool.client.ping()
+    except Exception:
+        return False
+
+
+requires_redis = pytest.mark.skipif(not _redis_available(), reason="需要本地Redis")
+
+# 子进程：到start_at后持续取RPM令牌、获取并发租约（持有20ms），输出放行数与持有租约的时间段
+CHILD = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+from src.common.distributed_limiter import DistributedLimiter
+limiter = DistributedLimiter(key_prefix=sys.argv[2])
+start_at, duration = float(sys.argv[3]), float(sys.argv[4])
+while time.time() < start_at:
+    time.sleep(0.001)
+granted, held = 0, []
+while time.time() < start_at + duration:
+    if limiter.take("nvidia1", 40)[0]:
+        granted += 1
+    lease_id = limiter.acquire_lease("nvidia1", 5)
+    if lease_id:
+        acquired = time.time()
+        time.sleep(0.02)
+        held.append((acquired, time.time()))
+        limiter.release_lease("nvidia1", lease_id)
+    time.sleep(0.005)
+print(json.dumps({"granted": granted, "held": held}))
+"""
+
+
+def _max_overlap(intervals: list) -> int:
+    events = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+@pytest.fixture
+def key_prefix():
+    prefix = f"openclaw:test_limiter:{uuid.uuid4().hex[:8]}:"
+    yield prefix
+    if _redis_available():
+        unlink_matching(redis_pool.client, f"{prefix}*")
+
+
+def test_bucket_shape_never_exceeds_rpm_per_minute():
+    """容量 + 60秒补充量 = RPM"""
+    for rpm in (5, 40, 600):
+        capacity, rate = bucket_shape(rpm, 0.1)
+        assert capacity >= 1
+        assert capacity + rate * 60 == pytest.approx(rpm)
+
+
+@requires_redis
+def test_quota_holds_across_8_processes(key_prefix):
+    """8个进程同时抢NVIDIA 40 RPM / 5并发：总放行数不超过令牌桶上限，同时持有的租约不超过5"""
+    duration = 3.0
+    start_at = time.time() + 2.0
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", CHILD, str(mvp_root), key_prefix, str(start_at), str(duration)],
+            stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(8)
+    ]
+    results = [json.loads(process.communicate(timeout=60)[0].strip().splitlines()[-1]) for process in processes]
+
+    capacity, rate = bucket_shape(40)
+    granted = sum(result["granted"] for result in results)
+    # 进程内限流时每个进程都能放行40个（共320个）
+    assert capacity <= granted <= capacity + rate * duration + 1
+    held = [interval for result in results for interval in result["held"]]
+    assert held
+    assert _max_overlap(held) <= 5
+
+
+@requires_redis
+def test_leases_shared_between_limiters_and_expire(key_prefix):
+    """两个进程内限流器共享并发上限；未归还的租约到期自动释放"""
+    limit = 5
+    first = MultiModelRateLimiter(DistributedLimiter(key_prefix=key_prefix))
+    second = MultiModelRateLimiter(DistributedLimiter(key_prefix=key_prefix))
+    assert first.backend == "redis"
+
+    for _ in range(limit):
+        assert first.acquire_concurrency("nvidia1")
+    assert not second.acquire_concurrency("nvidia1")
+    first.release_concurrency("nvidia1")
+    assert second.acquire_concurrency("nvidia1")
+    assert second.get_status()["nvidia1"]["shared"]["leases"] == limit
+    for _ in range(limit - 1):
+        first.release_concurrency("nvidia1")
+    second.release_concurrency("nvidia1")
+
+    # 模拟进程崩溃：取得租约后不归还
+    crashed = DistributedLimiter(key_prefix=key_prefix, lease_ttl=0.2)
+    assert all(crashed.acquire_lease("nvidia2", limit) for _ in range(limit))
+    assert crashed.acquire_lease("nvidia2", limit) is None
+    time.sleep(0.3)
+    assert crashed.acquire_lease("nvidia2", limit) is not None
+
+
+def test_falls_back_to_local_limits_without_redis(monkeypatch):
+    """Redis不可用时退回进程内限制，并发名额照常归还"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    unreachable = redis.Redis(host="127.0.0.1", port=port, socket_connect_timeout=0.2, decode_responses=True)
+    limiter = MultiModelRateLimiter(DistributedLimiter(client=unreachable))
+
+    limit = limiter.concurrency_limits["nvidia1"]
+    for _ in range(limit):
+        assert limiter.acquire_concurrency("nvidia1")
+    assert not limiter.acquire_concurrency("nvidia1")
+    assert limiter.backend == "local" and limiter.fallbacks == 1
+    for _ in range(limit):
+        limiter.release_concurrency("nvidia1")
+    assert limiter.current_concurrency["nvidia1"] == 0
+    assert limiter.acquire_concurrency("nvidia1")
+    limiter.release_concurrency("nvidia1")
+
+    # 重试间隔过后再次尝试Redis（仍不可用则继续进程内限制）
+    monkeypatch.setattr(limiter, "_redis_retry_at", 0.0)
+    assert limiter.check_rpm_limit("nvidia1")
+    assert limiter.fallbacks == 2
+
+
+class SlowDistributedLimiter:
+    """每次调用耗时0.2秒的跨进程限制器（模拟到Redis的网络往返）"""
+
+    def __init__(self):
+        self.leases = set()
+
+    def acquire_lease(self, model, limit):
+        time.sleep(0.2)
+        lease_id = uuid.uuid4().hex
+        self.leases.add(lease_id)
+        return lease_id
+
+    def release_lease(self, model, lease_id):
+        time.sleep(0.2)
+        self.leases.discard(lease_id)
+
+    def take(self, model, rpm):
+        time.sleep(0.2)
+        return True, 0.0
+
+
+def test_async_methods_do_not_block_event_loop():
+    """异步方法的Redis往返在线程池执行：期间事件循环照常调度；调用方取消时名额不泄漏"""
+    import asyncio
+
+    distributed = SlowDistributedLimiter()
+    limiter = MultiModelRateLimiter(distributed)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        assert all(await asyncio.gather(*(limiter.acquire_concurrency_async("nvidia1") for _ in range(3))))
+        assert await limiter.check_rpm_limit_async("nvidia1")
+        await asyncio.gather(*(limiter.release_concurrency_async("nvidia1") for _ in range(3)))
+        ticking.cancel()
+        assert ticks >= 30
+
+        # 获取中途被取消：线程完成后自动归还
+        acquiring = asyncio.create_task(limiter.acquire_concurrency_async("nvidia1"))
+        await asyncio.sleep(0.05)
+        acquiring.cancel()
+        await asyncio.sleep(0.6)
+
+    asyncio.run(run())
+    assert limiter.current_concurrency["nvidia1"] == 0
+    assert not distributed.leases
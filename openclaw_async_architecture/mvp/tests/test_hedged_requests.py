@@ -0,0 +1,126 @@
+"""测试对冲请求 - 首选模型超过p95未返回时请求下一个模型、取消落败请求、遵守并发名额"""
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.config import settings
+from src.common.load_balancer import LoadBalancer
+from src.common.model_stats import ModelStats
+from src.common.provider_clients import ProviderClientPool
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+class MockProvider(ThreadingHTTPServer):
+    """/slow休眠1秒后返回，/fast立即返回"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MockHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def handle_error(self, request, client_address):
+        # 被取消的对冲请求断开连接，忽略写入失败
+        pass
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/slow":
+            time.sleep(1)
+        body = json.dumps({"choices": [{"message": {"content": self.path}}], "usage": {}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _balancer(server: MockProvider) -> LoadBalancer:
+    def config(path: str) -> dict:
+        return {"provider": "tencent", "url": server.url(path), "api_key": "k", "model": path, "max_concurrent": 5}
+
+    balancer = LoadBalancer({"hunyuan": config("/slow"), "nvidia1": config("/fast")}, ProviderClientPool(http2=False))
+    balancer.model_stats = ModelStats()
+    return balancer
+
+
+def _call(balancer: LoadBalancer, hedge: bool) -> tuple[dict, float]:
+    async def run():
+        start = time.perf_counter()
+        result = await balancer.call_api_async("你好", ["hunyuan", "nvidia1"], hedge=hedge)
+        elapsed = time.perf_counter() - start
+        await balancer.close()
+        return result, elapsed
+
+    return asyncio.run(run())
+
+
+def test_model_stats_percentiles():
+    stats = ModelStats(min_samples=10)
+    for i in range(1, 10):
+        stats.record("m", i / 10)
+    assert stats.p95("m") is None
+    stats.record("m", 1.0)
+    stats.record("m", 9.9, success=False)
+    assert stats.p95("m") == 1.0
+    assert stats.percentile("m", 50) == 0.5
+    assert stats.get_stats()["m"]["failure"] == 1
+
+
+def test_slow_primary_is_hedged_and_cancelled(monkeypatch):
+    """首选模型超过等待时间未返回：下一个模型先返回，首选请求被取消并归还名额"""
+    monkeypatch.setattr(settings, "hedge_default_delay", 0.1)
+    monkeypatch.setattr(settings, "hedge_min_delay", 0.05)
+    server = MockProvider()
+    balancer = _balancer(server)
+
+    result, elapsed = _call(balancer, hedge=True)
+    assert result["success"] and result["model"] == "/fast"
+    assert elapsed < 0.8
+    assert balancer.request_stats["hedged"] == 1
+    assert balancer.request_stats["hedge_wins"] == 1
+    assert balancer.limiter.current_concurrency["hunyuan"] == 0
+    assert balancer.limiter.current_concurrency["nvidia1"] == 0
+
+    result, elapsed = _call(balancer, hedge=False)
+    assert result["model"] == "/slow" and elapsed >= 1
+    server.shutdown()
+
+
+def test_hedge_respects_concurrency_budget(monkeypatch):
+    """下一个模型没有并发名额时不发对冲请求，等待首选模型返回"""
+    monkeypatch.setattr(settings, "hedge_default_delay", 0.1)
+    monkeypatch.setattr(settings, "hedge_min_delay", 0.05)
+    server = MockProvider()
+    balancer = _balancer(server)
+    limit = balancer.limiter.concurrency_limits["nvidia1"]
+    for _ in range(limit):
+        assert balancer.limiter.acquire_concurrency("nvidia1")
+    try:
+        result, _elapsed = _call(balancer, hedge=True)
+        assert result["model"] == "/slow"
+        assert balancer.request_stats["hedged"] == 0
+    finally:
+        for _ in range(limit):
+            balancer.limiter.release_concurrency("nvidia1")
+    server.shutdown()
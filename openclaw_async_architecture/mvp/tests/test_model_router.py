@@ -0,0 +1,104 @@
+"""测试自适应模型路由 - EWMA延迟/错误率重排候选模型、探索、流式首字延迟记录、多进程汇总"""
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.model_router import ModelRouter, merge_snapshots
+from src.common.task_classifier import TaskClassifier
+from src.streaming.performance_monitor import PerformanceMonitorContext
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def _router(**kwargs) -> ModelRouter:
+    return ModelRouter(alpha=0.5, min_samples=3, exploration=kwargs.pop("exploration", 0), **kwargs)
+
+
+def test_slow_model_is_demoted_and_unmeasured_keep_position():
+    """首选模型变慢后排到后面；样本不足的模型保持原位置"""
+    router = _router()
+    prior = ["zhipu", "hunyuan", "nvidia2", "nvidia1"]
+    assert router.rank(prior) == prior
+
+    for _ in range(3):
+        router.record("zhipu", 1.0)
+        router.record("nvidia2", 0.8)
+    assert router.rank(prior) == ["nvidia2", "hunyuan", "zhipu", "nvidia1"]
+
+    # 智谱恢复后回到前面（EWMA追随最近的调用）
+    for _ in range(4):
+        router.record("zhipu", 0.2)
+    assert router.rank(prior) == prior
+
+
+def test_error_rate_penalizes_fast_but_failing_model():
+    """错误率高的模型按期望耗时（含重试）排到后面"""
+    router = _router()
+    for _ in range(3):
+        router.record("a", 0.5)
+        router.record("b", 0.3)
+    assert router.rank(["a", "b"]) == ["b", "a"]
+    for _ in range(3):
+        router.record("b", 0, success=False)
+    assert router.rank(["a", "b"]) == ["a", "b"]
+    assert router.snapshot()["b"]["error_rate"] > 0.8
+
+
+def test_exploration_moves_other_model_to_front():
+    router = _router(exploration=0.5, rng=random.Random(7))
+    orders = [router.rank(["a", "b", "c"])[0] for _ in range(200)]
+    assert 60 < orders.count("a") < 140
+    assert router.explored == 200 - orders.count("a")
+
+
+def test_classifier_keeps_thinking_rule():
+    """复杂推理仍只在NVIDIA之间重排，混元兜底；用户指定模型仍在最前"""
+    router = _router()
+    classifier = TaskClassifier(router=router)
+    for _ in range(3):
+        router.record("hunyuan", 0.1)
+        router.record("nvidia1", 2.0)
+        router.record("nvidia2", 1.0)
+
+    assert classifier.recommend_model("深度分析这个问题") == ["nvidia2", "nvidia1", "hunyuan"]
+    assert classifier.recommend_model("你好") == ["hunyuan", "nvidia2", "nvidia1", "zhipu"]
+    assert classifier.recommend_model("你好", ["zhipu"])[0] == "zhipu"
+
+
+def test_stream_monitor_records_ttft_and_failures():
+    """流式调用记录首字延迟；realtime任务有首字样本时按首字延迟排序"""
+    router = _router()
+    for _ in range(3):
+        with PerformanceMonitorContext("zhipu", router=router) as monitor:
+            monitor.metrics.t_start -= 0.5
+            monitor.record_chunk("你")
+        router.record("hunyuan", 0.2)
+        router.record_ttft("hunyuan", 0.1)
+
+    stats = router.snapshot()["zhipu"]
+    assert stats["ttft_samples"] == 3 and stats["ttft"] >= 0.5
+    assert router.rank(["zhipu", "hunyuan"], "realtime") == ["hunyuan", "zhipu"]
+
+    with pytest.raises(RuntimeError):
+        with PerformanceMonitorContext("zhipu", router=router):
+            raise RuntimeError("断开")
+    assert router.snapshot()["zhipu"]["error_rate"] == 0.5
+
+
+def test_merge_snapshots_weights_by_samples():
+    merged = merge_snapshots([
+        {"zhipu": {"latency": 1.0, "ttft": None, "error_rate": 0.0, "samples": 3, "ttft_samples": 0}},
+        {"zhipu": {"latency": 2.0, "ttft": 0.4, "error_rate": 0.4, "samples": 1, "ttft_samples": 2}}
+    ])["zhipu"]
+    assert merged["latency"] == 1.25
+    assert merged["ttft"] == 0.4
+    assert merged["error_rate"] == 0.1
+    assert merged["samples"] == 4
@@ -0,0 +1,61 @@
+"""测试优先级队列 - 车道判定、加权分配与老化（不依赖Redis服务）"""
+import sys
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.queue.priority_queue import LANES, RedisPriorityTaskQueue, classify_lane, resolve_lane
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def _stats(depths: dict, waits: dict = None) -> dict:
+    waits = waits or {}
+    return {
+        lane: {"depth": depths.get(lane, 0), "oldest_wait_ms": waits.get(lane, 0.0)}
+        for lane in LANES
+    }
+
+
+def test_classify_lane():
+    """按TaskClassifier的类型与紧急度分车道"""
+    assert classify_lane("现在马上告诉我时间") == "realtime"
+    assert classify_lane("批量翻译这些文章") == "bulk"
+    assert classify_lane("深入分析人工智能对社会的影响") == "complex"
+    assert classify_lane("你好") == "simple"
+    assert resolve_lane("你好", "bulk") == "bulk"
+
+
+def test_weighted_allocation_follows_weights():
+    """各车道都有积压时，分配比例符合权重，且低优先级车道不会分不到"""
+    queue = RedisPriorityTaskQueue(weights={"realtime": 8, "simple": 4, "complex": 2, "bulk": 1}, max_wait=60)
+    stats = _stats({lane: 1000 for lane in LANES})
+
+    totals = {lane: 0 for lane in LANES}
+    for _ in range(150):
+        for lane, n in queue.plan(1, stats).items():
+            totals[lane] += n
+
+    assert totals == {"realtime": 80, "simple": 40, "complex": 20, "bulk": 10}
+
+
+def test_allocation_skips_empty_lanes_and_caps_by_depth():
+    """空车道不分配，名额不超过车道深度"""
+    queue = RedisPriorityTaskQueue(max_wait=60)
+    allocation = queue.plan(10, _stats({"realtime": 2, "bulk": 3}))
+
+    assert allocation == {"realtime": 2, "bulk": 3}
+
+
+def test_aged_lane_is_served_first():
+    """队头等待超过max_wait的车道，本批先分得名额"""
+    queue = RedisPriorityTaskQueue(weights={"realtime": 100, "simple": 1, "complex": 1, "bulk": 1}, max_wait=60)
+    stats = _stats({"realtime": 1000, "bulk": 5}, waits={"bulk": 61_000})
+
+    allocation = queue.plan(1, stats)
+
+    assert allocation == {"bulk": 1}
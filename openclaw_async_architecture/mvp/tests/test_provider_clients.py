@@ -0,0 +1,92 @@
+"""测试LoadBalancer连接池调用 - 连接复用、并发名额释放、失败切换下一个模型"""
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.load_balancer import LoadBalancer
+from src.common.provider_clients import ProviderClientPool
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+class MockProvider(ThreadingHTTPServer):
+    """/ok返回聊天结果，/down返回503；记录新建连接数"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MockHandler)
+        self.connections = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status = 200 if self.path == "/ok" else 503
+        body = json.dumps({"choices": [{"message": {"content": "ok"}}], "usage": {}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _config(url: str) -> dict:
+    return {"provider": "tencent", "url": url, "api_key": "k", "model": "mock", "max_concurrent": 5}
+
+
+def test_calls_reuse_connections_and_release_concurrency():
+    """同步与异步调用都复用连接；成功后归还并发名额"""
+    server = MockProvider()
+    balancer = LoadBalancer({"hunyuan": _config(server.url("/ok"))}, ProviderClientPool(http2=False))
+
+    for _ in range(5):
+        assert balancer.call_api("你好", ["hunyuan"])["success"]
+    assert server.connections == 1
+
+    async def run():
+        results = [await balancer.call_api_async("你好", ["hunyuan"]) for _ in range(5)]
+        await balancer.close()
+        return results
+
+    assert all(result["success"] for result in asyncio.run(run()))
+    assert server.connections == 2
+    assert balancer.limiter.current_concurrency["hunyuan"] == 0
+    server.shutdown()
+
+
+def test_failed_model_falls_through_to_next():
+    """首选模型返回503时尝试下一个模型；未配置的模型跳过"""
+    server = MockProvider()
+    balancer = LoadBalancer(
+        {"hunyuan": _config(server.url("/down")), "nvidia1": _config(server.url("/ok"))},
+        ProviderClientPool(http2=False)
+    )
+
+    result = balancer.call_api("你好", ["hunyuan", "nvidia1"])
+    assert result["success"]
+    assert balancer.request_stats["failures"] == 1
+    assert balancer.request_stats["by_model"]["nvidia1"] == 1
+    assert balancer.limiter.current_concurrency["hunyuan"] == 0
+    server.shutdown()
@@ -0,0 +1,136 @@
+"""测试队列消费者 - 验证长任务执行期间继续拉取、并发上限与停止排空"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.worker.consumer import QueueConsumer
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+class MemoryQueue:
+    """内存队列（接口与RedisTaskQueue一致）"""
+
+    def __init__(self, items: list[dict]):
+        self.items = list(items)
+        self.acked = []
+
+    def get_tasks_batch(self, count: int = 10, timeout: int = 5) -> list[dict]:
+        if not self.items:
+            time.sleep(0.05)
+            return []
+        batch, self.items = self.items[:count], self.items[count:]
+        return batch
+
+    def reclaim_pending(self, min_idle_ms=None, count: int = 100) -> list[dict]:
+        return []
+
+    def ack(self, task_data: dict) -> bool:
+        self.acked.append(task_data["task_id"])
+        return True
+
+
+class MemoryStore:
+    def __init__(self):
+        self.saved = {}
+
+    def save_task(self, task) -> bool:
+        self.saved[task.id] = task
+        return True
+
+
+class SleepWorker:
+    """按任务内容休眠的执行器，记录最大并发"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    async def execute_task(self, task):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(float(task.content))
+            task.status = "completed"
+            task.result = "ok"
+        finally:
+            self.running -= 1
+        return task
+
+
+def _tasks(durations: list[float], task_type: str = "v1") -> list[dict]:
+    return [
+        {"task_id": f"t{i}", "task_data": str(d), "task_type": task_type, "enqueued_at": time.time()}
+        for i, d in enumerate(durations)
+    ]
+
+
+async def _run_until_done(consumer: QueueConsumer, queue: MemoryQueue, total: int, timeout: float = 10):
+    runner = asyncio.create_task(consumer.run())
+    deadline = time.time() + timeout
+    while len(queue.acked) < total and time.time() < deadline:
+        await asyncio.sleep(0.02)
+    consumer.stop()
+    await runner
+
+
+def test_long_task_does_not_block_pulling():
+    """一个长任务在途时，短任务仍被拉取并完成"""
+    async def scenario():
+        queue = MemoryQueue(_tasks([1.0] + [0.05] * 5))
+        consumer = QueueConsumer(SleepWorker(), queue, MemoryStore(), max_inflight=4, type_limits={})
+        runner = asyncio.create_task(consumer.run())
+        await asyncio.sleep(0.6)
+        # 长任务尚未完成，短任务已全部完成
+        assert "t0" not in queue.acked
+        assert len(queue.acked) == 5
+        consumer.stop()
+        await runner
+        assert "t0" in queue.acked
+
+    asyncio.run(scenario())
+
+
+def test_inflight_and_type_limits():
+    """总在途数与类型并发均不超过上限"""
+    async def scenario():
+        worker = SleepWorker()
+        queue = MemoryQueue(_tasks([0.1] * 12, task_type="command"))
+        consumer = QueueConsumer(worker, queue, MemoryStore(), max_inflight=6, type_limits={"command": 2})
+        await _run_until_done(consumer, queue, 12)
+        assert len(queue.acked) == 12
+        assert worker.max_running <= 2
+        assert consumer.metrics.completed == 12
+        assert consumer.metrics.inflight == 0
+
+    asyncio.run(scenario())
+
+
+def test_stop_drains_inflight():
+    """stop()后等待在途任务完成再返回"""
+    async def scenario():
+        queue = MemoryQueue(_tasks([0.3] * 3))
+        store = MemoryStore()
+        consumer = QueueConsumer(SleepWorker(), queue, store, max_inflight=3, type_limits={})
+        runner = asyncio.create_task(consumer.run())
+        await asyncio.sleep(0.1)
+        consumer.stop()
+        await runner
+        assert len(store.saved) == 3
+        assert consumer.metrics.wait_count == 3
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_long_task_does_not_block_pulling()
+    test_inflight_and_type_limits()
+    test_stop_drains_inflight()
+    print("✓ 所有测试通过")
@@ -0,0 +1,76 @@
+"""测试大结果压缩 - 超过阈值压缩存储、读取透明解压"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common import codec
+from src.common.compression import compress, compress_text, decompress_text, is_compressed
+from src.common.config import settings
+from src.common.connection_pool import SQLiteConnectionPool
+from src.common.models import Task
+from src.store.hybrid_store import HybridTaskStore
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+LARGE_RESULT = "根据日志分析，排队时间主要来自SQLite写锁争用。\n" * 2000
+
+
+def _make_store() -> HybridTaskStore:
+    tmp_dir = tempfile.mkdtemp()
+    return HybridTaskStore(SQLiteConnectionPool(str(Path(tmp_dir) / "tasks.db")))
+
+
+def _stored_type(store: HybridTaskStore, task_id: str) -> str:
+    with store.sqlite_pool.read_connection() as conn:
+        return conn.execute("SELECT typeof(result) FROM tasks WHERE task_id = ?", (task_id,)).fetchone()[0]
+
+
+def test_large_results_stored_as_blob_and_read_back():
+    """大结果存为压缩BLOB，小结果保持TEXT；单条与列表读取均还原原文"""
+    store = _make_store()
+    large = Task(content="大结果", status="completed", result=LARGE_RESULT)
+    small = Task(content="小结果", status="completed", result="完成")
+    store._persist_tasks([large, small])
+
+    assert _stored_type(store, large.id) == "blob"
+    assert _stored_type(store, small.id) == "text"
+    assert store._load_from_sqlite(large.id).result == LARGE_RESULT
+    assert store._load_from_sqlite(small.id).result == "完成"
+
+    tasks, _ = store.list_tasks_page(status="completed")
+    assert {task.id: task.result for task in tasks} == {large.id: LARGE_RESULT, small.id: "完成"}
+
+    pending = Task(content="更新")
+    store._persist_task(pending)
+    store.update_task(pending.id, status="completed", result=LARGE_RESULT)
+    assert _stored_type(store, pending.id) == "blob"
+    assert store._load_from_sqlite(pending.id).result == LARGE_RESULT
+
+
+def test_cache_value_compressed_and_decoded_by_codec():
+    """任务缓存值超过阈值时整体压缩，codec.loads_task透明解压"""
+    task = Task(content="大结果", status="completed", result=LARGE_RESULT)
+    data = codec.dumps_task(task)
+
+    assert is_compressed(data)
+    assert len(data) < len(LARGE_RESULT.encode("utf-8")) / 10
+    assert codec.loads_task(data) == task
+
+
+def test_below_threshold_and_incompressible_left_unchanged():
+    """阈值以下与不可压缩的数据原样保留"""
+    assert compress_text("完成") == "完成"
+    assert decompress_text("完成") == "完成"
+    assert decompress_text(None) is None
+
+    # 随机数据压缩后不会更小，原样存储
+    noise = os.urandom(settings.result_compress_threshold + 1)
+    assert compress(noise) is noise
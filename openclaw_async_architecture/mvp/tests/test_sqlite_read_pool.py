@@ -0,0 +1,84 @@
+"""测试SQLite只读连接池 - 只读、与写事务并发、池大小上限"""
+import sqlite3
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.connection_pool import SQLiteConnectionPool
+from src.common.models import Task
+from src.store.hybrid_store import UPSERT_TASK_SQL, _task_params
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def _make_pool(read_pool_size: int = 2) -> SQLiteConnectionPool:
+    tmp_dir = tempfile.mkdtemp()
+    return SQLiteConnectionPool(str(Path(tmp_dir) / "tasks.db"), read_pool_size=read_pool_size)
+
+
+def test_read_connection_is_read_only():
+    """只读连接不能写入"""
+    pool = _make_pool()
+
+    with pool.read_connection() as conn:
+        try:
+            conn.execute(UPSERT_TASK_SQL, _task_params(Task(content="写入")))
+            assert False, "只读连接应拒绝写入"
+        except sqlite3.OperationalError:
+            pass
+
+    pool.close()
+
+
+def test_reads_do_not_wait_for_open_write_transaction():
+    """写事务进行中，只读连接仍能读到已提交数据（WAL）"""
+    pool = _make_pool()
+    with pool.transaction() as conn:
+        conn.execute(UPSERT_TASK_SQL, _task_params(Task(content="已提交")))
+
+    with pool.transaction() as conn:
+        conn.execute(UPSERT_TASK_SQL, _task_params(Task(content="未提交")))
+
+        counts = []
+        reader = threading.Thread(target=lambda: counts.append(_count(pool)))
+        reader.start()
+        reader.join(timeout=2)
+        assert counts == [1]
+
+    assert _count(pool) == 2
+    pool.close()
+
+
+def test_pool_reuses_at_most_size_connections():
+    """并发借用不超过池大小，连接被复用"""
+    pool = _make_pool(read_pool_size=2)
+    seen = set()
+    lock = threading.Lock()
+
+    def read():
+        for _ in range(50):
+            with pool.read_connection() as conn:
+                conn.execute("SELECT COUNT(*) FROM tasks").fetchone()
+                with lock:
+                    seen.add(id(conn))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(seen) <= 2
+    pool.close()
+
+
+def _count(pool: SQLiteConnectionPool) -> int:
+    with pool.read_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
@@ -0,0 +1,106 @@
+"""测试SQLite写后合并提交 - 验证合并、顺序与关闭落盘"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.connection_pool import SQLiteConnectionPool
+from src.common.models import Task
+from src.store.hybrid_store import UPSERT_TASK_SQL, _task_params
+from src.store.sqlite_writer import SQLiteWriteBehindWriter
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def _make_pool() -> SQLiteConnectionPool:
+    tmp_dir = tempfile.mkdtemp()
+    return SQLiteConnectionPool(str(Path(tmp_dir) / "tasks.db"))
+
+
+def _count(pool: SQLiteConnectionPool) -> int:
+    return pool.get_connection().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+
+def test_batches_are_coalesced():
+    """1000条写入应合并为少量事务"""
+    pool = _make_pool()
+    writer = SQLiteWriteBehindWriter(pool, flush_interval_ms=200, batch_size=500)
+
+    for i in range(1000):
+        writer.enqueue(UPSERT_TASK_SQL, _task_params(Task(content=f"任务{i}")))
+
+    assert writer.flush(timeout=10)
+    assert _count(pool) == 1000
+    assert writer.stats["rows"] == 1000
+    assert writer.stats["batches"] <= 4, writer.stats
+    writer.close()
+
+
+def test_order_is_preserved():
+    """UPSERT之后的UPDATE不能被提前执行"""
+    pool = _make_pool()
+    writer = SQLiteWriteBehindWriter(pool, flush_interval_ms=50, batch_size=100)
+
+    task = Task(content="顺序测试")
+    writer.enqueue(UPSERT_TASK_SQL, _task_params(task))
+    writer.enqueue("UPDATE tasks SET status = ? WHERE task_id = ?", ("running", task.id))
+    task.status = "completed"
+    writer.enqueue(UPSERT_TASK_SQL, _task_params(task))
+
+    assert writer.flush(timeout=10)
+    row = pool.get_connection().execute(
+        "SELECT status FROM tasks WHERE task_id = ?", (task.id,)
+    ).fetchone()
+    assert row["status"] == "completed"
+    writer.close()
+
+
+def test_close_flushes_pending():
+    """关闭时剩余写入必须全部落盘"""
+    pool = _make_pool()
+    writer = SQLiteWriteBehindWriter(pool, flush_interval_ms=60000, batch_size=100000)
+
+    for i in range(50):
+        writer.enqueue(UPSERT_TASK_SQL, _task_params(Task(content=f"任务{i}")))
+
+    start = time.time()
+    writer.close()
+    assert time.time() - start < 5
+    assert _count(pool) == 50
+
+
+def test_upsert_keeps_created_at():
+    """重复保存同一任务不应重置created_at"""
+    pool = _make_pool()
+    writer = SQLiteWriteBehindWriter(pool, flush_interval_ms=10)
+
+    task = Task(content="created_at测试")
+    writer.enqueue(UPSERT_TASK_SQL, _task_params(task))
+    writer.flush(timeout=10)
+    first = pool.get_connection().execute(
+        "SELECT created_at FROM tasks WHERE task_id = ?", (task.id,)
+    ).fetchone()[0]
+
+    task.status = "completed"
+    writer.enqueue(UPSERT_TASK_SQL, _task_params(task))
+    writer.flush(timeout=10)
+    second = pool.get_connection().execute(
+        "SELECT created_at FROM tasks WHERE task_id = ?", (task.id,)
+    ).fetchone()[0]
+
+    assert first == second
+    writer.close()
+
+
+if __name__ == "__main__":
+    test_batches_are_coalesced()
+    test_order_is_preserved()
+    test_close_flushes_pending()
+    test_upsert_keeps_created_at()
+    print("✓ 所有测试通过")
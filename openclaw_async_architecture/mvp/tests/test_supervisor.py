@@ -0,0 +1,110 @@
+"""测试进程管理器 - 按积压伸缩Worker、崩溃退避重启"""
+import sys
+import time
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.supervisor.main import ManagedProcess, Supervisor, RESTART_BASE_DELAY
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+SLEEP_COMMAND = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+
+class MemoryQueue:
+    """可调整长度的队列（接口与RedisTaskQueue一致）"""
+
+    def __init__(self, length: int = 0):
+        self.length = length
+
+    def get_queue_length(self) -> int:
+        return self.length
+
+
+def _supervisor(queue: MemoryQueue, monkeypatch) -> Supervisor:
+    supervisor = Supervisor(min_workers=1, max_workers=4, tasks_per_worker=100,
+                            scale_down_delay=30, queue=queue, run_gateway=False)
+
+    def spawn():
+        supervisor._worker_seq += 1
+        child = ManagedProcess(f"worker-{supervisor._worker_seq}", SLEEP_COMMAND)
+        child.start()
+        supervisor.workers.append(child)
+        return child
+
+    monkeypatch.setattr(supervisor, "_spawn_worker", spawn)
+    return supervisor
+
+
+def test_desired_workers_follows_queue_depth():
+    supervisor = Supervisor(min_workers=1, max_workers=4, tasks_per_worker=100, queue=MemoryQueue(), run_gateway=False)
+    assert supervisor.desired_workers(0) == 1
+    assert supervisor.desired_workers(250) == 3
+    assert supervisor.desired_workers(10000) == 4
+
+
+def test_scale_up_immediately_and_down_after_delay(monkeypatch):
+    """积压增加立即扩容；积压回落后持续scale_down_delay秒才逐个退役"""
+    queue = MemoryQueue()
+    supervisor = _supervisor(queue, monkeypatch)
+    try:
+        supervisor._spawn_worker()
+
+        queue.length = 350
+        assert supervisor.autoscale(now=0) == 4
+
+        queue.length = 0
+        assert supervisor.autoscale(now=10) == 4
+        assert supervisor.autoscale(now=20) == 4
+        assert supervisor.autoscale(now=41) == 3
+        assert len(supervisor._retiring) == 1
+        assert supervisor.autoscale(now=50) == 3
+        assert supervisor.autoscale(now=72) == 2
+    finally:
+        supervisor.shutdown()
+    assert not supervisor.workers
+
+
+def test_crashed_child_restarts_with_backoff():
+    """子进程退出后等待退避时间再重启，连续崩溃时退避翻倍"""
+    supervisor = Supervisor(min_workers=0, queue=MemoryQueue(), run_gateway=False)
+    child = ManagedProcess("worker-1", [sys.executable, "-c", "raise SystemExit(3)"])
+    supervisor.workers.append(child)
+    child.start()
+    child.process.wait()
+
+    now = time.monotonic()
+    supervisor.check_children(now)
+    assert child.restart_at == now + RESTART_BASE_DELAY
+    first_pid = child.pid
+
+    supervisor.check_children(now + RESTART_BASE_DELAY)
+    assert child.pid != first_pid
+    child.process.wait()
+
+    now = time.monotonic()
+    supervisor.check_children(now)
+    assert child.restart_at == now + RESTART_BASE_DELAY * 2
+    supervisor.workers.clear()
+
+
+def test_terminate_sends_catchable_stop_signal():
+    """terminate()发送可捕获的停止信号（Windows为CTRL_BREAK_EVENT），子进程得以排空后退出"""
+    child = ManagedProcess("worker-drain", [sys.executable, "-c", (
+        "import signal, sys, time\n"
+        "for name in ('SIGTERM', 'SIGBREAK'):\n"
+        "    if hasattr(signal, name):\n"
+        "        signal.signal(getattr(signal, name), lambda *_: sys.exit(3))\n"
+        "time.sleep(30)\n"
+    )])
+    child.start()
+    time.sleep(1)
+    child.terminate()
+    child.wait(10)
+    assert child.process.returncode == 3
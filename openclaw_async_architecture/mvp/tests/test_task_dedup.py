@@ -0,0 +1,66 @@
+"""测试重复提交去重 - Idempotency-Key、内容哈希窗口、失败释放
+
+占用与计数需要本地Redis；不可用时跳过。
+"""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.connection_pool import redis_pool
+from src.common.task_dedup import TaskDeduplicator, content_hash
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def _redis_available() -> bool:
+    try:
+        return redis_pool.client.ping()
+    except Exception:
+        return False
+
+
+requires_redis = pytest.mark.skipif(not _redis_available(), reason="需要本地Redis")
+
+
+def test_dedup_keys():
+    """内容哈希区分task_type；未开启窗口且无Idempotency-Key时不去重"""
+    assert content_hash("你好") == content_hash("你好", "v1")
+    assert content_hash("你好", "chat") != content_hash("你好", "v1")
+
+    assert TaskDeduplicator(window=0).keys_for("你好", "v1") == []
+    kinds = [kind for _key, _ttl, kind in TaskDeduplicator(window=60).keys_for("你好", "v1", "k")]
+    assert kinds == ["idempotency", "content"]
+
+
+@requires_redis
+def test_claim_returns_first_task_for_duplicates():
+    """同一Idempotency-Key / 同一内容重复占用时返回首次的task_id；释放后可重新占用"""
+    async def run():
+        dedup = TaskDeduplicator(idempotency_ttl=60, window=60)
+        content = f"去重测试 {uuid.uuid4()}"
+        key = str(uuid.uuid4())
+
+        first = dedup.keys_for(content, "v1", key)
+        assert await dedup.claim(first, "task-1") == (None, None)
+        assert await dedup.claim(dedup.keys_for(content, "v1", key), "task-2") == ("task-1", "idempotency")
+        # 不同的键、相同内容：内容哈希命中，新键改指向已存在的任务
+        other_key = str(uuid.uuid4())
+        assert await dedup.claim(dedup.keys_for(content, "v1", other_key), "task-3") == ("task-1", "content")
+        assert await dedup.claim(dedup.keys_for("无关", "v1", other_key), "task-4") == ("task-1", "idempotency")
+
+        await dedup.release(first, "task-1")
+        assert await dedup.claim(dedup.keys_for(content, "v1"), "task-5") == (None, None)
+        await dedup.release(dedup.keys_for(content, "v1"), "task-5")
+        await dedup.release(dedup.keys_for("无关", "v1", other_key), "task-1")
+        await redis_pool.close_async()
+
+    asyncio.run(run())
@@ -0,0 +1,88 @@
+"""测试任务列表游标分页 - 完整遍历、同一时间戳、索引命中"""
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.connection_pool import SQLiteConnectionPool
+from src.common.models import Task
+from src.store.hybrid_store import HybridTaskStore, decode_cursor
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def _make_store() -> HybridTaskStore:
+    tmp_dir = tempfile.mkdtemp()
+    return HybridTaskStore(SQLiteConnectionPool(str(Path(tmp_dir) / "tasks.db")))
+
+
+def test_pages_cover_all_rows_once_with_same_timestamp():
+    """同一created_at的任务按task_id排序，翻页不重复不遗漏"""
+    store = _make_store()
+    same_time = datetime(2025, 1, 1, 12, 0, 0)
+    tasks = [
+        Task(content=f"任务{i}", status="completed" if i % 3 else "failed", created_at=same_time)
+        for i in range(25)
+    ]
+    store._persist_tasks(tasks)
+
+    seen = []
+    after = None
+    while True:
+        page, after = store.list_tasks_page(status="completed", after=after, limit=4)
+        seen.extend(task.id for task in page)
+        if after is None:
+            break
+
+    expected = sorted((t.id for t in tasks if t.status == "completed"), reverse=True)
+    assert seen == expected
+
+
+def test_invalid_cursor_raises_value_error():
+    store = _make_store()
+    try:
+        store.list_tasks_page(after="不是游标")
+        assert False, "应抛出ValueError"
+    except ValueError:
+        pass
+    try:
+        decode_cursor("WzFd")  # [1]
+        assert False, "应抛出ValueError"
+    except ValueError:
+        pass
+
+
+def test_listing_uses_status_index():
+    """迁移建立的索引被列表查询使用"""
+    store = _make_store()
+    conn = store.sqlite_pool.get_connection()
+    plan = conn.execute('''
+        EXPLAIN QUERY PLAN
+        SELECT task_id FROM tasks WHERE status = ? AND (created_at, task_id) < (?, ?)
+        ORDER BY created_at DESC, task_id DESC LIMIT 10
+    ''', ("completed", "2025-01-01", "x")).fetchall()
+
+    assert "idx_tasks_status_created" in " ".join(row[3] for row in plan)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] >= 1
+
+
+def test_created_at_is_stored_as_utc():
+    """带时区的created_at换算为UTC写入，与CURRENT_TIMESTAMP写入的updated_at同一时区，排序一致"""
+    store = _make_store()
+    beijing = timezone(timedelta(hours=8))
+    earlier = Task(content="北京时间写入", created_at=datetime(2025, 1, 1, 18, 0, tzinfo=beijing))
+    later = Task(content="UTC写入", created_at=datetime(2025, 1, 1, 11, 0))
+    store._persist_tasks([earlier, later])
+
+    with store.sqlite_pool.read_connection() as conn:
+        stored = dict(conn.execute("SELECT task_id, created_at FROM tasks").fetchall())
+    assert stored[earlier.id] == "2025-01-01 10:00:00"
+
+    page, _ = store.list_tasks_page(limit=10)
+    assert [task.id for task in page] == [later.id, earlier.id]
@@ -0,0 +1,129 @@
+"""测试任务保留与归档 - 按状态超期归档、归档后可查、空间回收"""
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.connection_pool import SQLiteConnectionPool
+from src.common.models import Task
+from src.store.hybrid_store import HybridTaskStore
+from src.store.retention import TaskRetention
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+NOW = datetime(2025, 6, 15)
+
+
+def _make_store() -> HybridTaskStore:
+    tmp_dir = tempfile.mkdtemp()
+    store = HybridTaskStore(SQLiteConnectionPool(str(Path(tmp_dir) / "tasks.db")))
+    store.retention = TaskRetention(
+        store.sqlite_pool,
+        retention_days={"completed": 30, "failed": 90},
+        batch_size=7
+    )
+    return store
+
+
+def _hot_ids(store: HybridTaskStore) -> set:
+    with store.sqlite_pool.read_connection() as conn:
+        return {row[0] for row in conn.execute("SELECT task_id FROM tasks")}
+
+
+def test_expired_tasks_move_to_monthly_archives():
+    """按状态超期的任务移入月度归档库，未超期/未配置状态保留；归档后get_task仍可查到"""
+    store = _make_store()
+    old_completed = [
+        Task(content=f"旧任务{i}", status="completed", result="结果" * 5000, created_at=datetime(2025, 1 + i % 3, 10))
+        for i in range(20)
+    ]
+    recent_completed = Task(content="近期", status="completed", created_at=datetime(2025, 6, 1))
+    failed_within_ttl = Task(content="失败", status="failed", created_at=datetime(2025, 4, 1))
+    old_pending = Task(content="未完成", status="pending", created_at=datetime(2024, 1, 1))
+    store._persist_tasks(old_completed + [recent_completed, failed_within_ttl, old_pending])
+
+    assert store.retention.run_once(now=NOW) == {"completed": 20}
+
+    assert _hot_ids(store) == {recent_completed.id, failed_within_ttl.id, old_pending.id}
+    assert sorted(p.name for p in store.retention.archive_dir.iterdir()) == [
+        "tasks_2025_01.db", "tasks_2025_02.db", "tasks_2025_03.db"
+    ]
+    assert store.get_statistics()["completed"] == 1
+
+    archived = store._load_from_sqlite(old_completed[4].id)
+    assert archived.content == "旧任务4"
+    assert archived.result == "结果" * 5000
+
+    assert store.retention.delete_archived(old_completed[4].id)
+    assert store._load_from_sqlite(old_completed[4].id) is None
+    assert store.retention.run_once(now=NOW) == {}
+
+
+def test_archiving_reclaims_space():
+    """新建库为增量auto_vacuum，归档后释放空闲页"""
+    store = _make_store()
+    conn = store.sqlite_pool.get_connection()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+    store._persist_tasks([
+        Task(content=f"任务{i}", status="completed", result="x" * 4000, created_at=datetime(2025, 1, 1))
+        for i in range(200)
+    ])
+    pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+
+    store.retention.run_once(now=NOW)
+
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert conn.execute("PRAGMA page_count").fetchone()[0] < pages_before / 2
+
+
+def test_task_changed_during_archive_is_kept(monkeypatch):
+    """读出后状态被改回pending的任务不删除，也不留归档副本与索引"""
+    store = _make_store()
+    tasks = [Task(content=f"任务{i}", status="completed", created_at=datetime(2025, 1, 1)) for i in range(3)]
+    store._persist_tasks(tasks)
+
+    open_archive = store.retention._open_archive
+
+    def requeue_then_open(month):
+        tasks[0].status = "pending"
+        store._persist_task(tasks[0])
+        return open_archive(month)
+
+    monkeypatch.setattr(store.retention, "_open_archive", requeue_then_open)
+    assert store.retention.run_once(now=NOW) == {"completed": 2}
+    monkeypatch.undo()
+
+    assert _hot_ids(store) == {tasks[0].id}
+    assert store.retention.load_archived(tasks[0].id) is None
+    assert store.retention.load_archived(tasks[1].id) is not None
+    assert not store.retention.delete_archived(tasks[0].id)
+
+
+def test_retention_does_not_block_task_writes(monkeypatch):
+    """Gateway端归档在单独线程执行，期间保存任务不排在归档之后"""
+    import asyncio
+    import time
+    from src.store.async_store import AsyncHybridTaskStore
+
+    store = _make_store()
+    monkeypatch.setattr(store, "run_retention", lambda: time.sleep(1) or {})
+    async_store = AsyncHybridTaskStore(store)
+
+    async def run():
+        retention = asyncio.create_task(async_store.run_retention())
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await async_store.save_task(Task(content="新任务"))
+        elapsed = time.perf_counter() - start
+        await retention
+        return elapsed
+
+    assert asyncio.run(run()) < 0.5
@@ -0,0 +1,210 @@
+"""测试失败重试与死信队列 - 退避抖动、暂时性错误判定、消费者重试流程
+
+调度器读写需要本地Redis；不可用时跳过。
+"""
+import asyncio
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.config import settings
+from src.common.connection_pool import redis_pool
+from src.queue.scheduler import (
+    AsyncTaskScheduler, TaskScheduler, DLQ_KEY, DLQ_ENTRIES_KEY,
+    is_transient_error, retry_delay
+)
+from src.worker.consumer import QueueConsumer
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def _redis_available() -> bool:
+    try:
+        return redis_pool.client.ping()
+    except Exception:
+        return False
+
+
+requires_redis = pytest.mark.skipif(not _redis_available(), reason="需要本地Redis")
+
+
+class MemoryQueue:
+    """内存队列（接口与RedisTaskQueue一致）"""
+
+    def __init__(self, items: list[dict]):
+        self.items = list(items)
+        self.acked = []
+        self.submitted = []
+
+    def get_tasks_batch(self, count: int = 10, timeout: int = 5) -> list[dict]:
+        if not self.items:
+            time.sleep(0.05)
+            return []
+        batch, self.items = self.items[:count], self.items[count:]
+        return batch
+
+    def reclaim_pending(self, min_idle_ms=None, count: int = 100) -> list[dict]:
+        return []
+
+    def submit(self, task_id, task_data, task_type="v1", lane=None, attempt=0) -> bool:
+        self.submitted.append(task_id)
+        self.items.append({"task_id": task_id, "task_data": task_data, "task_type": task_type, "attempt": attempt})
+        return True
+
+    def ack(self, task_data: dict) -> bool:
+        self.acked.append(task_data["task_id"])
+        return True
+
+
+class MemoryStore:
+    def __init__(self):
+        self.saved = {}
+
+    def save_task(self, task) -> bool:
+        self.saved[task.id] = task.model_copy(deep=True)
+        return True
+
+
+class MemoryScheduler:
+    """立即到期的调度器（接口与TaskScheduler一致）"""
+
+    def __init__(self, max_attempts: int):
+        self.max_attempts = max_attempts
+        self.due = []
+        self.dead = []
+
+    def handle_failure(self, task_data, error, transient):
+        if not transient:
+            return "failed", None
+        attempts = int(task_data.get("attempt") or 0) + 1
+        if attempts >= self.max_attempts:
+            self.dead.append(task_data["task_id"])
+            return "dead_letter", None
+        self.due.append(dict(task_data, attempt=attempts))
+        return "retry", time.time()
+
+    def promote_due(self, queue, now=None, limit=100) -> int:
+        due, self.due = self.due, []
+        for message in due:
+            queue.submit(message["task_id"], message["task_data"], message["task_type"], attempt=message["attempt"])
+        return len(due)
+
+
+class FlakyWorker:
+    """前fail_times次返回HTTP 503，之后成功；content为"bad"时返回不可重试的错误"""
+
+    def __init__(self, fail_times: int):
+        self.fail_times = fail_times
+        self.calls = 0
+
+    async def execute_task(self, task):
+        self.calls += 1
+        if task.content == "bad":
+            task.status, task.error = "failed", "HTTP 400: 参数错误"
+        elif self.calls <= self.fail_times:
+            task.status, task.error = "failed", "HTTP 503: Service Unavailable"
+        else:
+            task.status, task.result = "completed", "ok"
+        return task
+
+
+async def _run(consumer: QueueConsumer, until, timeout: float = 5):
+    runner = asyncio.create_task(consumer.run())
+    deadline = time.time() + timeout
+    while not until() and time.time() < deadline:
+        await asyncio.sleep(0.02)
+    consumer.stop()
+    await runner
+
+
+def test_backoff_and_transient_errors():
+    """退避按次数翻倍、不超过上限，抖动落在[d/2, d]；只重试429/5xx/超时/连接错误"""
+    rng = random.Random(7)
+    delays = [retry_delay(attempt, 2, 30, rng) for attempt in range(1, 7)]
+    for attempt, delay in enumerate(delays, start=1):
+        full = min(30, 2 * 2 ** (attempt - 1))
+        assert full / 2 <= delay <= full
+
+    assert is_transient_error("HTTP 503: Service Unavailable")
+    assert is_transient_error("HTTP 429: Too Many Requests")
+    assert is_transient_error("ReadTimeout: timed out")
+    assert is_transient_error("ConnectError: [Errno 111] Connection refused")
+    assert not is_transient_error("HTTP 400: 参数错误")
+    assert not is_transient_error(None)
+
+
+def test_consumer_retries_then_completes_or_dead_letters(monkeypatch):
+    """暂时性失败保持pending并重试直到成功；次数用尽进入死信；不可重试的错误直接failed"""
+    monkeypatch.setattr(settings, "scheduler_poll_interval", 0)
+
+    async def scenario(fail_times: int, content: str = "hi"):
+        queue = MemoryQueue([{"task_id": "t1", "task_data": content, "task_type": "v1"}])
+        scheduler = MemoryScheduler(max_attempts=3)
+        store = MemoryStore()
+        consumer = QueueConsumer(FlakyWorker(fail_times), queue, store, type_limits={}, scheduler=scheduler)
+        await _run(consumer, lambda: store.saved.get("t1") and store.saved["t1"].status != "pending"
+                   and not queue.items)
+        return queue, scheduler, store, consumer
+
+    queue, scheduler, store, consumer = asyncio.run(scenario(fail_times=2))
+    assert store.saved["t1"].status == "completed"
+    assert consumer.metrics.retried == 2 and consumer.metrics.failed == 0
+    assert queue.acked == ["t1"] * 3
+
+    queue, scheduler, store, consumer = asyncio.run(scenario(fail_times=10))
+    assert store.saved["t1"].status == "failed"
+    assert store.saved["t1"].metadata["dead_letter"] is True
+    assert scheduler.dead == ["t1"]
+    assert consumer.metrics.dead_lettered == 1 and consumer.metrics.retried == 2
+
+    queue, scheduler, store, consumer = asyncio.run(scenario(fail_times=0, content="bad"))
+    assert store.saved["t1"].status == "failed"
+    assert consumer.metrics.retried == 0 and scheduler.dead == []
+
+
+@requires_redis
+def test_scheduler_promotes_due_tasks_and_requeues_dead_letters():
+    """到期任务回队并带上attempt；死信可查看与重新入队"""
+    scheduler = TaskScheduler(max_attempts=2, base_delay=0, max_delay=0)
+    task_id = f"retry-{uuid.uuid4()}"
+    message = {"task_id": task_id, "task_data": "hi", "task_type": "v1"}
+
+    assert scheduler.handle_failure(message, "HTTP 502", True)[0] == "retry"
+    queue = MemoryQueue([])
+    assert scheduler.promote_due(queue, now=time.time() + 1) >= 1
+    retried = next(item for item in queue.items if item["task_id"] == task_id)
+    assert retried["attempt"] == 1
+
+    assert scheduler.handle_failure(retried, "HTTP 502", True) == ("dead_letter", None)
+
+    async def inspect():
+        dlq = AsyncTaskScheduler()
+        entry = await dlq.get_dead(task_id)
+        assert entry["attempts"] == 2 and entry["error"] == "HTTP 502"
+
+        class AsyncQueue:
+            submitted = []
+
+            async def submit(self, *args):
+                self.submitted.append(args)
+                return True
+
+        async_queue = AsyncQueue()
+        assert (await dlq.requeue_dead(task_id, async_queue))["task_id"] == task_id
+        assert async_queue.submitted[0][:2] == (task_id, "hi")
+        assert await dlq.get_dead(task_id) is None
+        await redis_pool.close_async()
+
+    asyncio.run(inspect())
+    redis_pool.binary_client.zrem(DLQ_KEY, task_id)
+    redis_pool.binary_client.hdel(DLQ_ENTRIES_KEY, task_id)
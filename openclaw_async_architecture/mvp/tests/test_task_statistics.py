@@ -0,0 +1,58 @@
+"""测试状态计数 - 触发器随状态变更维护、校正兜底"""
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.common.connection_pool import SQLiteConnectionPool
+from src.common.models import Task
+from src.store.hybrid_store import HybridTaskStore
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+def _make_store() -> HybridTaskStore:
+    tmp_dir = tempfile.mkdtemp()
+    return HybridTaskStore(SQLiteConnectionPool(str(Path(tmp_dir) / "tasks.db")))
+
+
+def _group_by(store: HybridTaskStore) -> dict:
+    with store.sqlite_pool.read_connection() as conn:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+
+def test_counters_follow_state_transitions():
+    """保存、重复保存、状态更新、删除后计数与GROUP BY一致"""
+    store = _make_store()
+    tasks = [Task(content=f"任务{i}") for i in range(5)]
+    store._persist_tasks(tasks)
+
+    tasks[0].status = "running"
+    store._persist_task(tasks[0])
+    store._persist_task(tasks[0])  # 状态未变，计数不变
+    store.update_task(tasks[1].id, status="completed", result="完成")
+    store.update_task(tasks[2].id, status="failed", error="错误")
+    store.update_task(tasks[2].id, result="仅更新结果")
+    store.delete_task(tasks[3].id)
+
+    stats = store.get_statistics()
+    assert stats == {"total": 4, "pending": 1, "running": 1, "completed": 1, "failed": 1}
+    assert {k: v for k, v in stats.items() if k != "total" and v} == _group_by(store)
+
+
+def test_reconcile_fixes_drift():
+    """计数表被破坏后，校正恢复为实际值"""
+    store = _make_store()
+    store._persist_tasks([Task(content=f"任务{i}") for i in range(3)])
+
+    with store.sqlite_pool.transaction() as conn:
+        conn.execute("UPDATE task_status_counts SET count = 100 WHERE status = 'pending'")
+
+    assert store.reconcile_statistics() == {"pending": -97}
+    assert store.get_statistics()["pending"] == 3
+    assert store.reconcile_statistics() == {}
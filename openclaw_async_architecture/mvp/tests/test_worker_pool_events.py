@@ -0,0 +1,136 @@
+"""测试Worker Pool完成事件 - 验证无轮询等待、as_completed顺序与wait_for_all_tasks返回值"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加路径
+mvp_root = Path(__file__).parent.parent
+sys.path.insert(0, str(mvp_root))
+
+from src.worker import worker_pool
+from src.worker.worker_pool import WorkerPool
+
+# Windows编码
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+
+class SleepWorker:
+    """按任务内容休眠的Worker（替代调用V1的V2Worker）"""
+
+    async def execute_task(self, task):
+        await asyncio.sleep(float(task.content))
+        task.status = "completed"
+        task.result = f"done {task.content}"
+        return task
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def sleep_worker(monkeypatch):
+    """用本地Worker替换V2Worker，避免依赖V1 Gateway"""
+    monkeypatch.setattr(worker_pool, "V2Worker", SleepWorker)
+
+
+def test_wait_for_task_has_no_polling_delay():
+    """任务完成后立即返回（旧实现最多多等0.5秒）"""
+    async def scenario():
+        pool = WorkerPool(num_workers=2)
+        await pool.start()
+        task = pool.submit_task_sync("0.05")
+
+        start = time.perf_counter()
+        result = await pool.wait_for_task(task, timeout=5)
+        elapsed = time.perf_counter() - start
+
+        assert result.status == "completed"
+        assert elapsed < 0.2, elapsed
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_as_completed_yields_in_finish_order():
+    async def scenario():
+        pool = WorkerPool(num_workers=3)
+        await pool.start()
+        tasks = [pool.submit_task_sync(d) for d in ("0.3", "0.1", "0.2")]
+
+        order = [task.content async for task in pool.as_completed(tasks, timeout=5)]
+
+        assert order == ["0.1", "0.2", "0.3"]
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_wait_for_all_tasks_returns_finished():
+    async def scenario():
+        pool = WorkerPool(num_workers=2)
+        await pool.start()
+        tasks = [pool.submit_task_sync("0.05") for _ in range(5)]
+
+        finished = await pool.wait_for_all_tasks(timeout=5)
+
+        assert {t.id for t in finished} == {t.id for t in tasks}
+        assert all(t.status == "completed" for t in finished)
+        # 再次调用只返回新完成的任务
+        assert await pool.wait_for_all_tasks(timeout=5) == []
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_collected_tasks_are_not_kept():
+    """as_completed/wait_for_task取走的任务不再留给wait_for_all_tasks；无人收取时按上限丢弃最早的"""
+    async def scenario():
+        pool = WorkerPool(num_workers=2, max_finished=3)
+        await pool.start()
+        collected = [pool.submit_task_sync("0.01") for _ in range(3)]
+        waited = pool.submit_task_sync("0.01")
+        assert len([task async for task in pool.as_completed(collected, timeout=5)]) == 3
+        await pool.wait_for_task(waited, timeout=5)
+        assert await pool.wait_for_all_tasks(timeout=5) == []
+
+        uncollected = [pool.submit_task_sync("0.01") for _ in range(5)]
+        finished = await pool.wait_for_all_tasks(timeout=5)
+        assert len(finished) == 3
+        assert {t.id for t in finished} <= {t.id for t in uncollected}
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_wait_for_task_timeout():
+    async def scenario():
+        pool = WorkerPool(num_workers=1)
+        await pool.start()
+        task = pool.submit_task_sync("0.5")
+
+        try:
+            await pool.wait_for_task(task, timeout=0.05)
+            assert False, "应该超时"
+        except TimeoutError:
+            pass
+
+        # 超时不影响任务继续完成
+        result = await pool.wait_for_task(task, timeout=5)
+        assert result.status == "completed"
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    worker_pool.V2Worker = SleepWorker
+    test_wait_for_task_has_no_polling_delay()
+    test_as_completed_yields_in_finish_order()
+    test_wait_for_all_tasks_returns_finished()
+    test_collected_tasks_are_not_kept()
+    test_wait_for_task_timeout()
+    print("✓ 所有测试通过")
@@ -93,6 +93,49 @@ class ConcurrentBatchSubmitter:
 
         return results
 
+    def submit_batch_bulk(self, tasks: List[str]) -> List[Tuple[str, str]]:
+        """
+        一次请求批量提交（POST /tasks/batch）
+
+        Args:
+            tasks: 任务列表
+
+        Returns:
+            [(任务ID, 任务内容), ...] 列表；接口不可用时返回空列表
+        """
+        print("="*70)
+        print("🚀 批量任务提交（单次请求）")
+        print("="*70)
+        print(f"总任务数: {len(tasks)}")
+        print()
+
+        start_time = time.time()
+
+        try:
+            response = requests.post(
+                f"{GATEWAY_URL}/tasks/batch",
+                json={"tasks": [{"content": task} for task in tasks]},
+                timeout=60
+            )
+
+            if response.status_code != 200:
+                print(f"❌ 批量提交失败: HTTP {response.status_code}")
+                return []
+
+            task_ids = response.json()['task_ids']
+        except Exception as e:
+            print(f"❌ 批量提交失败: {e}")
+            return []
+
+        elapsed = time.time() - start_time
+        print(f"✅ 成功: {len(task_ids)}/{len(tasks)}")
+        print(f"⏱️  总耗时: {elapsed:.2f}秒")
+        print("="*70)
+
+        results = list(zip(task_ids, tasks))
+        self.submitted_tasks.extend(results)
+        return results
+
     def wait_and_show_results(self, task_ids: List[str], task_contents: List[str]):
         """等待并显示结果"""
         print()
@@ -107,25 +150,25 @@ class ConcurrentBatchSubmitter:
         for task_id, content in zip(task_ids, task_contents):
             print(f"⏳ 等待任务: {content[:30]}...")
 
-            # 轮询等待完成
-            waited = 0
-            max_wait = 60
-            while waited < max_wait:
+            # 长轮询等待完成（Gateway在任务完成时立即返回，无需每秒轮询）
+            deadline = time.time() + 60
+            while time.time() < deadline:
+                wait = min(30, max(1, int(deadline - time.time())))
                 try:
                     response = requests.get(
                         f"{GATEWAY_URL}/tasks/{task_id}",
-                        timeout=5
+                        params={"wait": wait},
+                        timeout=wait + 5
                     )
 
                     if response.status_code == 200:
                         task = response.json()
                         if task['status'] in ['completed', 'failed']:
                             break
+                    else:
+                        time.sleep(1)
                 except:
-                    pass
-
-                time.sleep(1)
-                waited += 1
+                    time.sleep(1)
 
             # 显示结果
             completed += 1
@@ -153,8 +196,10 @@ def main():
     # 创建提交器（5并发）
     submitter = ConcurrentBatchSubmitter(max_workers=5)
 
-    # 并发提交
-    results = submitter.submit_batch_concurrent(tasks)
+    # 批量提交（旧版Gateway无/tasks/batch时回退为并发逐个提交）
+    results = submitter.submit_batch_bulk(tasks)
+    if not results:
+        results = submitter.submit_batch_concurrent(tasks)
 
     if not results:
         print("❌ 没有任务提交成功")
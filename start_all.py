@@ -1,7 +1,11 @@
-"""启动Gateway和Worker"""
-import subprocess
+"""启动Gateway和Worker（进程管理器：就绪检查、崩溃重启、按积压伸缩Worker）
+
+    python start_all.py
+    python start_all.py --gateway-workers 4 --min-workers 2 --max-workers 8
+
+参数与配置见openclaw_async_architecture/mvp/src/supervisor/main.py。
+"""
 import sys
-import time
 import os
 
 # 编码
@@ -10,37 +14,11 @@ if sys.platform == 'win32':
     sys.stderr.reconfigure(encoding='utf-8', errors='replace')
 
 # 切换目录
-mvp_dir = os.path.join(os.path.dirname(__file__), 'openclaw_async_architecture', 'mvp')
+mvp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'openclaw_async_architecture', 'mvp')
 os.chdir(mvp_dir)
+sys.path.insert(0, mvp_dir)
 
-print("[1] 启动Gateway...")
-gateway = subprocess.Popen([
-    sys.executable, "-m", "uvicorn", "src.gateway.main:app",
-    "--host", "127.0.0.1", "--port", "8000"
-])
-
-print("[2] 等待Gateway启动...")
-time.sleep(3)
-
-print("[3] 启动Worker...")
-worker = subprocess.Popen([
-    sys.executable, "src/worker/main.py"
-])
-
-print("[4] 等待Worker启动...")
-time.sleep(5)
+from src.supervisor.main import main
 
-print("[完成] Gateway和Worker已启动")
-print(f"  Gateway PID: {gateway.pid}")
-print(f"  Worker PID: {worker.pid}")
-print("\n按Ctrl+C停止...")
-try:
-    gateway.wait()
-    worker.wait()
-except KeyboardInterrupt:
-    print("\n停止服务...")
-    gateway.terminate()
-    worker.terminate()
-    gateway.wait()
-    worker.wait()
-    print("已停止")
+if __name__ == "__main__":
+    main()